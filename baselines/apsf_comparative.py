@@ -174,14 +174,18 @@ def run_apsf_vs_manual_fewshot(
     
     # Evaluate manual prompt
     worker_llm = get_llm("worker")
-    manual_predictions = []
+    formatted_prompts = []
     
     for item in test_data:
         input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
         question = item.get(input_key, '')
         formatted_prompt = manual_prompt.format(input=question) if "{input}" in manual_prompt else f"{manual_prompt}\n\n{question}"
-        prediction = worker_llm.generate(formatted_prompt)
-        manual_predictions.append(prediction)
+        formatted_prompts.append(formatted_prompt)
+    
+    # Send the whole test split in one batched call
+    manual_predictions = worker_llm.batch_generate(
+        formatted_prompts, max_concurrency=dataset_config.get("max_concurrency")
+    )
     
     manual_results = evaluator.evaluate(manual_predictions, test_data)
     manual_score = manual_results.get(dataset_config.get("metric", "accuracy"), 0.0)
@@ -0,0 +1,73 @@
+"""
+Cold-start benchmark: wall time of `python -m <package>.run_experiments --help`.
+
+Runs the command several times in fresh interpreters and reports min/median wall time, plus the
+heaviest imports from `-X importtime` and whether provider SDKs (torch, transformers,
+google-generativeai, openai) were imported. Use it to catch regressions in startup cost, which
+matters when launching many short per-task jobs.
+
+Usage (from anywhere):
+    python benchmarks/cold_start.py [--runs 10] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+PARENT_DIR = os.path.dirname(REPO_ROOT)
+HEAVY_MODULES = ["torch", "transformers", "google.generativeai", "openai", "httpx", "pandas", "pyarrow"]
+
+
+def time_help(runs: int) -> list:
+    """Wall time of each `--help` run, in seconds"""
+    cmd = [sys.executable, "-m", f"{PACKAGE_NAME}.run_experiments", "--help"]
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=PARENT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            print(f"Command failed:\n{result.stderr[-2000:]}")
+            sys.exit(1)
+    return timings
+
+
+def import_profile(top: int):
+    """Top cumulative imports and heavy modules loaded during `--help`"""
+    cmd = [sys.executable, "-X", "importtime", "-m", f"{PACKAGE_NAME}.run_experiments", "--help"]
+    result = subprocess.run(cmd, cwd=PARENT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$', line)
+        if match:
+            entries.append((int(match.group(2)), match.group(3).strip()))
+    loaded = {name for _, name in entries}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+    return sorted(entries, reverse=True)[:top], heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for run_experiments --help")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    timings = time_help(args.runs)
+    print(f"{PACKAGE_NAME}.run_experiments --help over {args.runs} runs:")
+    print(f"   min {min(timings) * 1000:.0f} ms | median {statistics.median(timings) * 1000:.0f} ms "
+          f"| max {max(timings) * 1000:.0f} ms")
+
+    slowest, heavy = import_profile(args.top)
+    print(f"\nHeavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+    print(f"\nSlowest imports (cumulative):")
+    for cumulative_us, name in slowest:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+CPU inference benchmark: Llama_API generation speed and memory per CPU execution mode.
+
+Modes (MODELS "cpu" settings): float32, bfloat16 and float32 + dynamic int8 quantization of the Linear layers.
+Each mode runs in its own process (peak RSS is per process) with --threads intra-op threads and generates
+exactly --max-new-tokens tokens for each of --items prompts through batch_generate.
+Without --model, a small randomly initialised Llama checkpoint (see local_batching.py) is written to a temporary
+directory; pass --model with a local checkpoint path for realistic numbers.
+
+Usage (from anywhere):
+    python benchmarks/cpu_inference.py [--model PATH] [--items 16] [--max-new-tokens 32] [--threads 4]
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_batching import build_tiny_checkpoint, make_prompts  # noqa: E402
+
+MODES = {
+    "float32": {"dtype": "float32", "int8": False},
+    "bfloat16": {"dtype": "bfloat16", "int8": False},
+    "int8": {"dtype": "float32", "int8": True},
+}
+
+
+def run_mode(args) -> dict:
+    """Load the model in one mode and time generation (runs in a child process)"""
+    config = importlib.import_module(f"{PACKAGE_NAME}.config")
+    config.RESPONSE_CACHE_CONFIG["enabled"] = False
+    llama_api = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.llama_api")
+
+    start = time.perf_counter()
+    llm = llama_api.Llama_API(model_name=args.model, temperature=0.0, device="cpu",
+                              cpu={**MODES[args.run_mode], "num_threads": args.threads},
+                              prefix_cache={"enabled": False})
+    load_seconds = time.perf_counter() - start
+    prompts = make_prompts(args.items, args.seed)
+    llm.batch_generate(prompts[:2], max_new_tokens=4, min_new_tokens=4)  # warm-up
+    completion_before = llm.get_token_stats()["completion_tokens"]
+
+    start = time.perf_counter()
+    llm.batch_generate(prompts, max_new_tokens=args.max_new_tokens, min_new_tokens=args.max_new_tokens)
+    elapsed = time.perf_counter() - start
+    completion_tokens = llm.get_token_stats()["completion_tokens"] - completion_before
+    return {
+        "tokens_per_second": completion_tokens / elapsed,
+        "items_per_second": args.items / elapsed,
+        "load_seconds": load_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Llama_API CPU modes: tokens/second and peak RSS")
+    parser.add_argument("--model", default=None, help="Local checkpoint path (default: small random Llama)")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--items", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-mode", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model is None:
+            args.model = os.path.join(tmp, "tiny-llama")
+            build_tiny_checkpoint(args.model, args.hidden_size, args.layers)
+        print(f"{args.items} prompts x {args.max_new_tokens} new tokens, {args.threads} threads")
+        print(f"{'mode':<10} {'tokens/s':>9} {'items/s':>8} {'load':>7} {'peak RSS':>10}")
+        for mode in args.modes.split(","):
+            command = [sys.executable, os.path.abspath(__file__), "--run-mode", mode, "--model", args.model,
+                       "--items", str(args.items), "--max-new-tokens", str(args.max_new_tokens),
+                       "--threads", str(args.threads), "--seed", str(args.seed)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{mode:<10} failed: {completed.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{mode:<10} {r['tokens_per_second']:9.1f} {r['items_per_second']:8.2f} "
+                  f"{r['load_seconds']:6.1f}s {r['peak_rss_mb']:8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
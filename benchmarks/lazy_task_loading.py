@@ -0,0 +1,93 @@
+"""
+Lazy per-task loading benchmark for BBHAllTasksLoader / MMLUAllSubjectsLoader.
+
+Writes synthetic sources (see loader_startup.py) and measures, with dataset snapshots disabled:
+    startup      constructing the loader (task index only)
+    eager        startup followed by loading every task up front, as the loaders did before lazy loading
+    sequential   peak traced memory while visiting the tasks one at a time and releasing each one afterwards,
+                 as run_bbh_all_tasks_evaluation / run_mmlu_all_subjects_evaluation do
+    resume       time to the first task's data when only the last task is left
+Peak memory is measured with tracemalloc (Python allocations only).
+
+Usage (from anywhere):
+    python benchmarks/lazy_task_loading.py [--rows 250]
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loader_startup import write_sources  # noqa: E402
+
+LOADERS = {
+    "BBHAllTasksLoader": ("get_all_task_names", "get_task_data", "release_task"),
+    "MMLUAllSubjectsLoader": ("get_all_subject_names", "get_subject_data", "release_subject"),
+}
+
+
+def measure(run):
+    """(seconds, peak traced MB) of run()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and peak memory of lazy per-task loading")
+    parser.add_argument("--rows", type=int, default=250, help="Examples per MMLU subject / BBH task")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = importlib.import_module(f"{PACKAGE_NAME}.config")
+    data_loader = importlib.import_module(f"{PACKAGE_NAME}.data_loader")
+    config.DATASET_SNAPSHOT_CONFIG["enabled"] = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = write_sources(os.path.join(tmp, "data"), config, args.rows, args.seed)
+        print(f"{'loader':<22} {'startup':>9} {'eager':>9} {'eager peak':>11} {'sequential peak':>16} {'resume':>8}")
+        for name, (names_method, data_method, release_method) in LOADERS.items():
+            loader_class = data_loader.LOADER_MAPPING[name]
+            path = sources[name]
+
+            startup, _ = measure(lambda: loader_class(path=path))
+
+            def eager():
+                loader = loader_class(path=path)
+                for task in getattr(loader, names_method)():
+                    getattr(loader, data_method)(task, "all")
+
+            def sequential():
+                loader = loader_class(path=path)
+                for task in getattr(loader, names_method)():
+                    getattr(loader, data_method)(task, "validation")
+                    getattr(loader, data_method)(task, "test")
+                    getattr(loader, release_method)(task)
+
+            def resume():
+                loader = loader_class(path=path)
+                getattr(loader, data_method)(getattr(loader, names_method)()[-1], "validation")
+
+            eager_time, eager_peak = measure(eager)
+            _, sequential_peak = measure(sequential)
+            resume_time, _ = measure(resume)
+            print(f"{name:<22} {startup * 1000:7.0f}ms {eager_time * 1000:7.0f}ms {eager_peak:9.1f}MB "
+                  f"{sequential_peak:14.1f}MB {resume_time * 1000:6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
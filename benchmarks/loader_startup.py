@@ -0,0 +1,110 @@
+"""
+Dataset loader startup benchmark: parsing raw sources vs loading the binary snapshot (DATASET_SNAPSHOT_CONFIG).
+
+Writes synthetic sources in the layout the loaders expect to a temporary directory:
+    MMLU-all   57 subject CSVs (--rows per subject)        MMLUAllSubjectsLoader
+    BBH-all    27 task JSON files (--rows per task)         BBHAllTasksLoader
+    GSM8K      gsm_train.tsv / gsm_test.tsv (pandas)        GSM8KLoader
+and times each loader with snapshots disabled (cold parse), on the first snapshot run (parse + write),
+on the next run (snapshot load) and after touching one source file (invalidated, parse + write again).
+The snapshot load must give the same data and leave the RNG in the same state as the cold parse.
+
+Usage (from anywhere):
+    python benchmarks/loader_startup.py [--rows 250]
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+
+WORDS = ("what is the value of the total number given that each train travels at speed for hours "
+         "and the price of apples rises by percent compute the result").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def write_sources(root: str, config, rows: int, seed: int):
+    """Synthetic MMLU / BBH / GSM8K sources, returns {dataset: path}"""
+    rng = random.Random(seed)
+    mmlu = os.path.join(root, "mmlu")
+    os.makedirs(os.path.join(mmlu, "test"))
+    for subject in config.MMLU_ALL_SUBJECTS:
+        with open(os.path.join(mmlu, "test", f"{subject}_test.csv"), "w", encoding="utf-8") as f:
+            for _ in range(rows):
+                options = [sentence(rng, 4) for _ in range(4)]
+                f.write(",".join([f'"{sentence(rng, 25)}"'] + options + [rng.choice("ABCD")]) + "\n")
+
+    bbh = os.path.join(root, "bbh")
+    os.makedirs(bbh)
+    for task in config.BBH_ALL_TASKS:
+        examples = [{"input": sentence(rng, 60), "target": rng.choice(["True", "False", "(A)", "(B)"])}
+                    for _ in range(rows)]
+        with open(os.path.join(bbh, f"{task}.json"), "w", encoding="utf-8") as f:
+            json.dump({"examples": examples}, f)
+
+    gsm8k = os.path.join(root, "gsm8k")
+    os.makedirs(gsm8k)
+    for name, count in (("gsm_train.tsv", rows * 30), ("gsm_test.tsv", rows * 5)):
+        with open(os.path.join(gsm8k, name), "w", encoding="utf-8") as f:
+            for _ in range(count):
+                f.write(f"{sentence(rng, 40)}\t{rng.randint(1, 999)}\tb'{sentence(rng, 50)}'\n")
+    return {"MMLUAllSubjectsLoader": mmlu, "BBHAllTasksLoader": bbh, "GSM8KLoader": gsm8k}
+
+
+def timed_load(loader_class, path: str, seed: int):
+    """Construct a loader from a freshly seeded RNG, returns (seconds, loader, RNG state afterwards)"""
+    random.seed(seed)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = loader_class(path=path)
+    return time.perf_counter() - start, loader, random.getstate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader startup time with and without dataset snapshots")
+    parser.add_argument("--rows", type=int, default=250, help="Examples per MMLU subject / BBH task")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = importlib.import_module(f"{PACKAGE_NAME}.config")
+    data_loader = importlib.import_module(f"{PACKAGE_NAME}.data_loader")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = write_sources(os.path.join(tmp, "data"), config, args.rows, args.seed)
+        config.DATASET_SNAPSHOT_CONFIG["dir"] = os.path.join(tmp, "snapshots")
+        print(f"{'loader':<22} {'cold parse':>11} {'first run':>10} {'snapshot':>9} {'speedup':>8} "
+              f"{'after touch':>12} {'identical':>10}")
+        for name, path in sources.items():
+            loader_class = data_loader.LOADER_MAPPING[name]
+
+            config.DATASET_SNAPSHOT_CONFIG["enabled"] = False
+            cold, cold_loader, cold_rng = timed_load(loader_class, path, args.seed)
+            config.DATASET_SNAPSHOT_CONFIG["enabled"] = True
+            first, _, _ = timed_load(loader_class, path, args.seed)
+            warm, warm_loader, warm_rng = timed_load(loader_class, path, args.seed)
+            identical = warm_loader.data == cold_loader.data and warm_rng == cold_rng
+
+            # Touching a source file must invalidate the snapshot
+            source_file = next(os.path.join(root, f) for root, _, files in os.walk(path) for f in sorted(files))
+            stat = os.stat(source_file)
+            os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            touched, _, _ = timed_load(loader_class, path, args.seed)
+
+            print(f"{name:<22} {cold * 1000:9.0f}ms {first * 1000:8.0f}ms {warm * 1000:7.0f}ms {cold / warm:7.1f}x "
+                  f"{touched * 1000:10.0f}ms {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
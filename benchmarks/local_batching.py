@@ -0,0 +1,100 @@
+"""
+Local inference benchmark: Llama_API throughput with the dynamic batcher at different batch sizes.
+
+Runs on CPU by default. Without --model, a tiny randomly initialised Llama checkpoint (word-level tokenizer,
+--hidden-size / --layers) is written to a temporary directory, so nothing is downloaded; pass --model with a
+local checkpoint path (e.g. a small instruct model) for realistic numbers.
+Each batch size runs the same --items prompts through batch_generate with greedy decoding and reports
+items/second, the average batch actually formed, and how many outputs match the unbatched (batch size 1) run.
+
+Usage (from anywhere):
+    python benchmarks/local_batching.py [--model PATH] [--items 64] [--batch-sizes 1,4,8,16] [--max-new-tokens 16]
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+
+WORDS = ("step problem answer carefully reason number total each first then compute check final "
+         "result value given question identify break down verify units explain clearly apples "
+         "train speed hours cost price sum difference product ratio percent").split()
+
+
+def build_tiny_checkpoint(path: str, hidden_size: int, layers: int):
+    """Random Llama weights plus a word-level tokenizer over WORDS"""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    vocab = {token: i for i, token in enumerate(["<unk>", "<s>", "</s>", "<pad>"] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="<unk>", bos_token="<s>", eos_token="</s>",
+                            pad_token="<pad>").save_pretrained(path)
+    config = LlamaConfig(vocab_size=len(vocab), hidden_size=hidden_size, intermediate_size=hidden_size * 4,
+                         num_hidden_layers=layers, num_attention_heads=max(1, hidden_size // 64),
+                         num_key_value_heads=max(1, hidden_size // 64), max_position_embeddings=2048,
+                         bos_token_id=1, eos_token_id=2, pad_token_id=3)
+    LlamaForCausalLM(config).save_pretrained(path)
+
+
+def make_prompts(items: int, seed: int):
+    rng = random.Random(seed)
+    template = " ".join(rng.choice(WORDS) for _ in range(60))
+    return [f"{template} question {' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))} answer"
+            for _ in range(items)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Llama_API throughput with dynamic batching")
+    parser.add_argument("--model", default=None, help="Local checkpoint path (default: tiny random Llama)")
+    parser.add_argument("--items", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--max-batch-tokens", type=int, default=65536)
+    parser.add_argument("--max-new-tokens", type=int, default=16)
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = importlib.import_module(f"{PACKAGE_NAME}.config")
+    config.RESPONSE_CACHE_CONFIG["enabled"] = False
+    llama_api = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.llama_api")
+    local_batcher = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.local_batcher")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if model_path is None:
+            model_path = os.path.join(tmp, "tiny-llama")
+            build_tiny_checkpoint(model_path, args.hidden_size, args.layers)
+        llm = llama_api.Llama_API(model_name=model_path, temperature=0.0, batching={"enabled": False})
+        prompts = make_prompts(args.items, args.seed)
+        print(f"{args.items} prompts, {args.max_new_tokens} new tokens each, device {llm.device}")
+        print(f"{'batch size':>10} {'items/s':>9} {'avg batch':>10} {'padding eff':>12} {'same as bs=1':>13}")
+
+        reference = None
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            llm.batcher = local_batcher.DynamicBatcher(f"bench-{batch_size}", llm._run_batch,
+                                                       max_batch_size=batch_size,
+                                                       max_batch_tokens=args.max_batch_tokens, max_wait_ms=5)
+            llm.batch_generate(prompts[:batch_size], max_new_tokens=args.max_new_tokens)  # warm-up
+            llm.batcher.stats = {key: 0 for key in llm.batcher.stats}
+            start = time.perf_counter()
+            outputs = llm.batch_generate(prompts, max_new_tokens=args.max_new_tokens)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = outputs
+            same = sum(a == b for a, b in zip(outputs, reference))
+            stats = llm.batcher.get_stats()
+            print(f"{batch_size:>10} {args.items / elapsed:9.2f} {stats['avg_batch_size']:10.1f} "
+                  f"{stats['padding_efficiency'] * 100:11.1f}% {same:>8}/{args.items}")
+
+
+if __name__ == "__main__":
+    main()
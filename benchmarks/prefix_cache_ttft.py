@@ -0,0 +1,199 @@
+"""
+Prefix-cache benchmark: time-to-first-token of worker requests with and without the prefix-friendly layout.
+
+Starts a local stand-in for an OpenAI-compatible vLLM server that simulates automatic prefix caching:
+the rendered chat prompt is split into blocks of --block-size pseudo-tokens, hashed as a chain (like
+vLLM), kept in an LRU of --cache-blocks blocks, and only uncached tokens pay the prefill cost before
+the first streamed token. A block becomes reusable once the request that computed it finished prefill.
+
+The workload is --templates fusion prompts x --questions questions, submitted question-major with the
+templates interleaved. The default (one prompt over a validation split) is the common optimizer batch;
+use e.g. --templates 8 --questions 24 for candidate racing. Each combination of
+    layout: "inline" (one user message) / "system" (fusion prompt as a leading system message)
+    order:  "interleaved" (submission order) / "grouped" (prefix_grouped_order) /
+            "warmup" (grouped after one max_tokens=1 request per prefix, as GPT_API with prefix_warmup)
+is run against a fresh server, reporting TTFT percentiles and the simulated prefix-cache hit rate.
+
+Usage (from anywhere):
+    python benchmarks/prefix_cache_ttft.py [--templates 1] [--questions 128] [--concurrency 16]
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+
+WORDS = ("step problem answer carefully reason number total each first then compute check final "
+         "result value given question identify break down verify units explain clearly").split()
+
+
+class PrefixCacheSim:
+    """Block-hash LRU prefix cache with a per-token prefill cost"""
+
+    def __init__(self, block_size: int, capacity_blocks: int, prefill_ms_per_token: float):
+        self.block_size = block_size
+        self.capacity = capacity_blocks
+        self.prefill_s = prefill_ms_per_token / 1000.0
+        self.blocks = OrderedDict()
+        self.lock = threading.Lock()
+        self.cached_tokens = 0
+        self.total_tokens = 0
+
+    def render(self, messages) -> list:
+        text = "".join(f"<|{m['role']}|>\n{m['content']}<|end|>\n" for m in messages) + "<|assistant|>\n"
+        return re.findall(r"\w+|[^\w\s]|\s+", text)
+
+    def block_hashes(self, tokens) -> list:
+        hashes, parent = [], ""
+        for start in range(0, len(tokens) - self.block_size + 1, self.block_size):
+            parent = hashlib.md5((parent + "\x00".join(tokens[start:start + self.block_size])).encode()).hexdigest()
+            hashes.append(parent)
+        return hashes
+
+    def prefill(self, messages):
+        """Sleep for the uncached part of the prompt, then cache its full blocks"""
+        tokens = self.render(messages)
+        hashes = self.block_hashes(tokens)
+        with self.lock:
+            hit_blocks = 0
+            for h in hashes:
+                if h not in self.blocks:
+                    break
+                self.blocks.move_to_end(h)
+                hit_blocks += 1
+            cached = hit_blocks * self.block_size
+            self.cached_tokens += cached
+            self.total_tokens += len(tokens)
+        time.sleep((len(tokens) - cached) * self.prefill_s)
+        with self.lock:
+            for h in hashes:
+                self.blocks[h] = True
+                self.blocks.move_to_end(h)
+            while len(self.blocks) > self.capacity:
+                self.blocks.popitem(last=False)
+
+
+def start_server(sim: PrefixCacheSim, decode_tokens: int, decode_ms: float):
+    """Streaming /v1/chat/completions stand-in on a free local port"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            sim.prefill(body["messages"])
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i in range(min(decode_tokens, body.get("max_tokens") or decode_tokens)):
+                chunk = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": f" t{i}"}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(decode_ms / 1000.0)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_workload(templates: int, questions: int, template_words: int, question_words: int, seed: int):
+    rng = random.Random(seed)
+    prompts = [" ".join(rng.choice(WORDS) for _ in range(template_words)) + f" (variant {t})" for t in range(templates)]
+    items = [" ".join(rng.choice(WORDS) for _ in range(question_words)) + f" {rng.randint(1, 999)}?"
+             for _ in range(questions)]
+    return prompts, items
+
+
+def run_case(layout_mod, args, layout: str, order_mode: str, prompts, items) -> dict:
+    import openai
+
+    sim = PrefixCacheSim(args.block_size, args.cache_blocks, args.prefill_ms)
+    server = start_server(sim, args.decode_tokens, args.decode_ms)
+    client = openai.OpenAI(api_key="N/A", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+    # Question-major submission (candidate racing interleaves its templates like this)
+    requests = [layout_mod.PrefixedPrompt(p, q) for q in items for p in prompts]
+    order = layout_mod.prefix_grouped_order(requests) if order_mode != "interleaved" else list(range(len(requests)))
+
+    def first_token_latency(index: int, prompt=None, **kwargs) -> float:
+        start = time.perf_counter()
+        stream = client.chat.completions.create(
+            model="stand-in", messages=layout_mod.build_messages(prompt or requests[index], layout),
+            stream=True, **kwargs
+        )
+        ttft = None
+        for _ in stream:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if order_mode == "warmup":
+            # Same as GPT_API prefix_warmup: one max_tokens=1 request per shared prefix first
+            list(executor.map(lambda p: first_token_latency(0, layout_mod.PrefixedPrompt(p, ""), max_tokens=1), prompts))
+        ttfts = list(executor.map(first_token_latency, order))
+    wall = time.perf_counter() - wall_start
+    server.shutdown()
+
+    ttfts.sort()
+    return {
+        "p50": statistics.median(ttfts) * 1000,
+        "p90": ttfts[int(0.9 * (len(ttfts) - 1))] * 1000,
+        "mean": statistics.mean(ttfts) * 1000,
+        "hit_rate": sim.cached_tokens / sim.total_tokens if sim.total_tokens else 0.0,
+        "wall": wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTFT with and without the prefix-cache-friendly request layout")
+    parser.add_argument("--templates", type=int, default=1, help="Distinct fusion prompts (racing candidates)")
+    parser.add_argument("--questions", type=int, default=128)
+    parser.add_argument("--template-words", type=int, default=300)
+    parser.add_argument("--question-words", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--block-size", type=int, default=16)
+    parser.add_argument("--cache-blocks", type=int, default=512, help="Simulated KV cache capacity in blocks")
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="Prefill cost per uncached token (ms)")
+    parser.add_argument("--decode-tokens", type=int, default=4)
+    parser.add_argument("--decode-ms", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout_mod = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.prompt_layout")
+    prompts, items = make_workload(args.templates, args.questions, args.template_words, args.question_words, args.seed)
+    print(f"{args.templates} fusion prompts x {args.questions} questions = {args.templates * args.questions} requests, "
+          f"concurrency {args.concurrency}, cache {args.cache_blocks} blocks of {args.block_size}")
+    print(f"{'layout':<8} {'order':<12} {'TTFT p50':>9} {'p90':>9} {'mean':>9} {'prefix hit':>11} {'wall':>8}")
+    for layout in ("inline", "system"):
+        for order_mode in ("interleaved", "grouped", "warmup"):
+            r = run_case(layout_mod, args, layout, order_mode, prompts, items)
+            print(f"{layout:<8} {order_mode:<12} {r['p50']:7.1f}ms {r['p90']:7.1f}ms "
+                  f"{r['mean']:7.1f}ms {r['hit_rate'] * 100:10.1f}% {r['wall']:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
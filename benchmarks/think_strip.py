@@ -0,0 +1,129 @@
+"""
+Think-stripping micro-benchmark: the multi-regex extraction formerly in GPT_API._extract_content_after_think
+against the single-scan think_parser.ThinkStripper, on long synthetic reasoning traces.
+
+Trace shapes (each --words words of reasoning, wrapped in the given way):
+    closed      "<think> ... </think>" followed by the answer (the common case)
+    colon       "Thinking: ..." with the answer after it
+    unclosed    "<think> ..." cut off by max_tokens, so every rule is tried and the line scan decides
+    many_open   repeated "<think>" openings without a close (worst case for the lazy ".*?" patterns)
+    plain       no think markers at all
+Both implementations must return the same text; the table reports the mean time per call.
+A ThinkStream pass over the same traces in 8-character deltas shows the per-chunk streaming cost.
+
+Usage (from anywhere):
+    python benchmarks/think_strip.py [--words 4000] [--repeat 20]
+"""
+import argparse
+import importlib
+import os
+import random
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(REPO_ROOT)
+sys.path.insert(0, os.path.dirname(REPO_ROOT))
+
+WORDS = ("first compute the total then check each step carefully so the number of apples is given "
+         "by the question we add subtract multiply and verify units before the final result").split()
+
+
+def legacy_extract(content: str) -> str:
+    """The previous regex-per-rule implementation (GPT_API keywords), kept here as the baseline"""
+    for pattern in [r'[<＜]think[>＞].*?[<＜]/think[>＞]\s*(.*?)$',
+                    r'[<＜]thinking[>＞].*?[<＜]/thinking[>＞]\s*(.*?)$',
+                    r'[<＜]thought[>＞].*?[<＜]/thought[>＞]\s*(.*?)$',
+                    r'(?:Think)[:]\s*(.*?)$',
+                    r'(?:Thinking)[:]\s*(.*?)$',
+                    r'[<＜]/think[>＞]\s*(.*?)$',
+                    r'[<＜]/thinking[>＞]\s*(.*?)$',
+                    r'[<＜]/thought[>＞]\s*(.*?)$',
+                    r'(?:end\s+think|think\s+end)\s*(.*?)$']:
+        match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
+        if match:
+            extracted = match.group(1).strip()
+            if extracted:
+                return extracted
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        line_lower = line.lower().strip()
+        if any(end_word in line_lower for end_word in [
+            'end think', 'think end', 'now i will', 'let me', 'based on', 'therefore',
+        ]):
+            if i < len(lines) - 1:
+                remaining_content = '\n'.join(lines[i + 1:]).strip()
+                if remaining_content:
+                    return remaining_content
+            break
+    return content
+
+
+def make_reasoning(words: int, rng: random.Random) -> str:
+    lines, line = [], []
+    for _ in range(words):
+        line.append(rng.choice(WORDS))
+        if len(line) >= rng.randint(8, 20):
+            lines.append(" ".join(line) + ".")
+            line = []
+    lines.append(" ".join(line))
+    return "\n".join(lines)
+
+
+def make_traces(words: int, seed: int):
+    rng = random.Random(seed)
+    answer = "The answer is \\boxed{42}."
+    reasoning = make_reasoning(words, rng)
+    chunks = reasoning.split("\n")
+    return {
+        "closed": f"<think>\n{reasoning}\n</think>\n\n{answer}",
+        "colon": f"Thinking: {reasoning}\n{answer}",
+        "unclosed": f"<think>\n{reasoning}",
+        "many_open": "\n".join(f"<think> {chunk}" for chunk in chunks),
+        "plain": f"{reasoning}\n{answer}",
+    }
+
+
+def time_call(fn, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Think-block stripping speed on long reasoning traces")
+    parser.add_argument("--words", type=int, default=4000, help="Reasoning words per trace")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    think_parser = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.think_parser")
+    gpt_api = importlib.import_module(f"{PACKAGE_NAME}.llm_apis.gpt_api")
+    stripper = gpt_api._THINK_STRIPPER
+
+    def new_extract(content: str) -> str:
+        extracted = stripper.extract(content)
+        return content if extracted is None else extracted
+
+    def stream_pass(content: str):
+        stream = think_parser.ThinkStream()
+        for i in range(0, len(content), 8):
+            stream.feed(content[i:i + 8])
+
+    traces = make_traces(args.words, args.seed)
+    print(f"{args.words} reasoning words per trace, {args.repeat} calls each")
+    print(f"{'trace':<10} {'chars':>8} {'legacy':>10} {'single-scan':>12} {'speedup':>8} {'stream/chunk':>13}")
+    for name, text in traces.items():
+        if legacy_extract(text) != new_extract(text):
+            raise SystemExit(f"Output mismatch on trace '{name}'")
+        legacy = time_call(legacy_extract, text, args.repeat)
+        new = time_call(new_extract, text, args.repeat)
+        per_chunk = time_call(stream_pass, text, max(1, args.repeat // 4)) / max(1, len(text) // 8)
+        print(f"{name:<10} {len(text):>8} {legacy * 1e3:8.2f}ms {new * 1e3:10.2f}ms {legacy / new:7.1f}x "
+              f"{per_chunk * 1e6:10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,47 @@ USE_LLM_ANSWER_COMPARISON = True
 # "architect": Use architect model for extraction (potentially better)
 ANSWER_EXTRACTOR_LLM = "architect"  # Default: use architect
 
+# Rule-first answer extraction cascade (GSM8K, MultiArith, AQuA, CompetitionMath)
+# Regex extractors run first with a confidence score; the LLM extractor/judge is only called below the threshold.
+EXTRACTION_CASCADE_CONFIG = {
+    "enabled": True,
+    "confidence_threshold": 0.85,   # Rule answers below this confidence fall back to the LLM
+    "audit_rate": 0.0,              # Fraction of rule hits re-checked by the LLM to measure agreement (e.g. 0.05)
+}
+
+# Early stop for worker calls: stream the completion and cancel it once the final answer (\boxed{},
+# "The answer is X", "#### X", an answer choice line) has been emitted and stayed unchanged for
+# `grace_tokens` streamed chunks. Detectors per evaluator are defined in evaluation/stop_detectors.py;
+# override with e.g. "detectors": {"GSM8KEvaluator": ["boxed"]}. OpenAI-compatible workers only.
+EARLY_STOP_CONFIG = {
+    "enabled": False,
+    "grace_tokens": 8,
+    "detectors": {},
+}
+
+# Adaptive max_tokens for worker calls: completion lengths are profiled per (dataset, model) from the
+# API `usage`, and later calls get max_tokens = percentile x margin (never above the model's max_tokens).
+# A completion cut off by that budget is retried with a doubled budget (up to max_retries times) unless it
+# already contains a final answer found by the evaluator's stop detectors. OpenAI-compatible workers only.
+# Off by default: keeping such a truncated completion (e.g. an intermediate "the answer is 5" in a cut-off
+# chain of thought) can change accuracy compared with unbudgeted runs.
+LENGTH_BUDGET_CONFIG = {
+    "enabled": False,
+    "percentile": 0.95,
+    "margin": 1.25,
+    "min_samples": 30,      # Observed completions before budgets are applied
+    "floor": 256,           # Never budget below this many tokens
+    "window": 500,          # Most recent completions kept in the profile
+    "max_retries": 2,
+}
+
+# Batched LLM judging: number of (response, gold answer) pairs packed into one judge prompt per evaluator.
+# 1 disables batching (one judge call per prediction).
+LLM_JUDGE_BATCH_SIZE = {
+    "GSM8KEvaluator": 8,
+    "CompetitionMathEvaluator": 4,
+}
+
 # --- LLM API Configurations ---
 # It's recommended to use environment variables for API keys for security.
 # For example: os.getenv("OPENAI_API_KEY")
@@ -38,9 +79,20 @@ API_BASE_URLS = {
     "agentify": "https://api.agentify.top/v1",  # Agentify API endpoint
 }
 
+# Client-side rate limits per API_BASE_URLS key: requests per minute / tokens per minute.
+# Shared by all models on the same endpoint; set to your account tier (None disables a bucket).
+RATE_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 6000},
+    "siliconflow": {"rpm": 1000, "tpm": 50000},
+    "dashscope": {"rpm": 600, "tpm": 1000000},
+    "openrouter": {"rpm": 200, "tpm": None},
+}
+
 # --- Model Definitions for Experiments ---
 # Configure the architect (structure discovery & optimization) and worker (task execution) LLMs.
 # Supports any OpenAI-compatible endpoint (vLLM, Ollama, cloud APIs, etc.)
+# "api_base_id" may also be a list of API_BASE_URLS keys serving the same model (replicas), e.g.
+# ["local_llm", "qwen3_vllm"]; requests are then load-balanced across them (see REPLICA_BALANCER_CONFIG).
 MODELS = {
     "architect": {
         "provider": "openai",
@@ -59,14 +111,71 @@ MODELS = {
         "temperature": 0.0,
         "max_tokens": 8192,
         "top_p": 1.0,
+        "max_concurrency": 16,            # Max in-flight requests (and pooled connections) for batch_generate
+        "prompt_layout": "inline",        # "system": send the fusion prompt as a leading system message (prefix-cache friendly)
+        "prefix_warmup": False,           # Local servers: prefill each shared fusion prompt once (max_tokens=1), then send its requests back to back
     },
     "generalization_test_model": {
         "provider": "llama_local",
         "model_name": "meta-llama/Llama-3-8B-Instruct",
         "temperature": 0.0,
+        # Dynamic batching of concurrent requests: up to max_batch_size prompts and max_batch_tokens padded tokens
+        # per model.generate, waiting max_wait_ms for requests to join; "enabled": False generates one prompt at a time
+        "batching": {"max_batch_size": 16, "max_batch_tokens": 16384, "max_wait_ms": 10},
+        # Reuse the past_key_values of a shared prompt prefix (the fusion prompt) across questions:
+        # LRU of max_entries prefixes, only for shared prefixes of at least min_prefix_tokens tokens
+        "prefix_cache": {"max_entries": 8, "min_prefix_tokens": 32},
+        "device": "auto",                 # "auto" (GPU if available, else CPU), "cuda" or "cpu"
+        # CPU execution: weight dtype "float32"/"bfloat16", dynamic int8 quantization of Linear layers (loads float32),
+        # intra-op threads (None: torch default, usually the number of physical cores)
+        "cpu": {"dtype": "float32", "int8": False, "num_threads": None},
     },
 }
 
+# --- LLM Response Cache ---
+# Persistent on-disk cache of LLM responses shared across runs.
+# Key: hash(model_name, endpoint, merged model_kwargs, prompt). Only successful responses are stored.
+# Off by default: cache hits use no tokens, so token statistics of cached reruns are not comparable.
+RESPONSE_CACHE_CONFIG = {
+    "enabled": False,
+    "path": "cache/llm_responses.sqlite",
+    "max_entries": 200000,          # LRU eviction beyond this many entries
+    "cache_sampled_calls": False,   # False: bypass cache for temperature>0 calls (e.g. architect sampling)
+}
+
+# --- LLM Call Resilience ---
+# Retries apply to transient errors only (429, 408/409, 5xx, timeouts, connection errors).
+LLM_RETRY_CONFIG = {
+    "max_retries": 4,
+    "base_delay": 1.0,                  # Seconds, doubled per attempt with full jitter (Retry-After honoured)
+    "max_delay": 30.0,
+    "circuit_failure_threshold": 5,     # Consecutive transient failures that open an endpoint's circuit
+    "circuit_reset_seconds": 30.0,      # Fail fast this long before letting a probe request through
+}
+
+# Load balancing for models whose api_base_id lists several replica endpoints.
+# Requests go to the healthy replica with the fewest in-flight requests.
+REPLICA_BALANCER_CONFIG = {
+    "failure_threshold": 3,         # Consecutive transient failures that eject a replica
+    "slow_factor": 3.0,             # Eject a replica whose latency EWMA exceeds this x the median of the others
+    "min_samples": 20,              # Completed requests before a replica can be judged slow
+    "eject_seconds": 60.0,          # Minimum ejection time before a replica is health-checked for readmission
+    "health_check_interval": 15.0,  # Seconds between health checks (GET /models) of ejected replicas
+}
+
+# Hedged requests: when a temperature-0 call of one of `models` is still running after the `percentile`
+# latency of recent calls (at least `min_delay` seconds), a duplicate is sent (to another replica when
+# api_base_id lists several) and the first successful result is used. Hedges are capped at
+# `max_extra_fraction` of requests; the slower duplicate still runs to completion and its tokens are counted.
+HEDGING_CONFIG = {
+    "enabled": False,
+    "models": ["worker"],
+    "percentile": 0.95,
+    "min_samples": 20,          # Latencies observed before hedging starts
+    "min_delay": 2.0,
+    "max_extra_fraction": 0.1,
+}
+
 # --- Dataset Configurations ---
 # Dataset paths (assuming a 'data' folder in project root)
 DATA_PATHS = {
@@ -99,6 +208,15 @@ DATA_SPLIT_CONFIG = {
     "split_strategy": "no_overlap",  # Ensure no overlap between train and test sets
     "shuffle_before_split": True,  # Shuffle data before splitting
 }
+
+# --- Dataset Snapshots ---
+# Loaded datasets (after parsing, shuffling and splitting) are stored as binary snapshots and loaded back
+# on the next run. A snapshot is only reused while the source files (size/mtime), loader code and settings,
+# DATA_SPLIT_CONFIG and the RNG state are unchanged; otherwise the sources are parsed again.
+DATASET_SNAPSHOT_CONFIG = {
+    "enabled": True,
+    "dir": "cache/dataset_snapshots",
+}
 # Dataset specific configurations
 DATASET_CONFIG = {
     "gsm8k": {
@@ -491,6 +609,10 @@ OPTIMIZATION_PARAMS = {
     "semantic_filtering_enabled": False,
     "top_k_after_filtering": 2,
     "acceptance_threshold": 1,
+    # Racing evaluation of step-3 candidates: evaluate in interleaved mini-batches and drop candidates
+    # that can no longer clear acceptance_threshold (or beat the leader). Exact, never changes the accepted candidate.
+    "racing_enabled": True,
+    "racing_batch_size": 10,
 
     "verbose_output": True,
     "show_all_qa_pairs": True,
@@ -504,6 +626,20 @@ OPTIMIZATION_PARAMS = {
     "reflection_error_threshold": 0.0,
     "reflection_max_errors": 10,
 
+    # Evaluation concurrency
+    # Number of validation samples sent to the worker LLM at the same time (1 = sequential)
+    "max_concurrency": 8,
+    # Reuse scores/predictions of an already evaluated prompt within a run (only when worker temperature is 0)
+    "prompt_memo_enabled": True,
+    # Step-level error analysis on the architect LLM
+    "error_analysis_max_concurrency": 4,       # Error analyses run at the same time (1 = sequential)
+    "error_analysis_max_samples": None,        # Analyze at most this many errors per step (None = all)
+    "error_analysis_sampling": "stratified",   # "stratified" (round-robin over item type) or "first"
+    "error_analysis_cache_enabled": True,      # Reuse analyses of samples whose output and factor names are unchanged across steps
+    # Worker calls that still fail after client-side retries are re-sent instead of being scored as wrong
+    "failed_item_requeue_rounds": 3,
+    "failed_item_requeue_wait": 10.0,          # Seconds before the first re-queue round (grows linearly)
+
     # Initial prompt configuration
     # If set to None, aPSF will generate prompt from scratch
     # If set to a string (e.g., "Let's think step by step"), aPSF will optimize from that prompt
@@ -1,10 +1,18 @@
+import hashlib
+import inspect
+import random
+import time
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
+from .snapshot import load_snapshot, save_snapshot, snapshot_file, source_fingerprint
+from ..config import DATA_SPLIT_CONFIG, DATASET_SNAPSHOT_CONFIG
 
 class BaseLoader(ABC):
     """
     Abstract base class for all dataset loaders.
     It defines a standard interface for loading, splitting, and sampling data.
+    The loaded state (self.data after shuffling and splitting) is kept as a binary snapshot
+    (DATASET_SNAPSHOT_CONFIG) and reused while the sources, loader settings and DATA_SPLIT_CONFIG are unchanged.
     """
     def __init__(self, path: Optional[str] = None):
         """
@@ -15,7 +23,62 @@ class BaseLoader(ABC):
         """
         self.path = path
         self.data = None
+        self._load_with_snapshot()
+
+    def _snapshot_sources(self) -> List[str]:
+        """Files / directories the loaded data is read from (their sizes and mtimes version the snapshot)"""
+        return [self.path] if self.path else []
+
+    def _snapshot_key_extra(self) -> Any:
+        """Settings outside the loader attributes that change the loaded data (e.g. task lists from config)"""
+        return None
+
+    def _load_with_snapshot(self):
+        """_load_data, or restore its result from the snapshot of an identical earlier load"""
+        if not DATASET_SNAPSHOT_CONFIG.get("enabled", False):
+            self._load_data()
+            return
+        try:
+            sources = source_fingerprint(self._snapshot_sources())
+            if not sources:
+                # Remote (Hub) or missing sources cannot be versioned
+                self._load_data()
+                return
+            loader_modules = [inspect.getsourcefile(cls) for cls in type(self).__mro__ if cls.__module__.startswith(__package__ or "")]
+            settings = {
+                "loader": f"{type(self).__module__}.{type(self).__qualname__}",
+                "params": {k: v for k, v in vars(self).items() if isinstance(v, (str, int, float, bool, type(None)))},
+                "split": DATA_SPLIT_CONFIG,
+                "extra": self._snapshot_key_extra(),
+                # Loaders that shuffle without reseeding depend on the RNG state they start from
+                "rng": hashlib.sha1(repr(random.getstate()).encode("utf-8")).hexdigest(),
+            }
+            version = {"sources": sources, "code": source_fingerprint([path for path in loader_modules if path])}
+            path = snapshot_file(DATASET_SNAPSHOT_CONFIG.get("dir", "cache/dataset_snapshots"),
+                                 type(self).__name__, settings, version)
+        except Exception as e:
+            print(f" Dataset snapshot disabled for {type(self).__name__}: {e}")
+            self._load_data()
+            return
+
+        start = time.perf_counter()
+        try:
+            state = load_snapshot(path)
+        except Exception as e:
+            print(f" Could not read dataset snapshot {path}: {e}")
+            state = None
+        if state is not None:
+            self.__dict__.update(state["attributes"])
+            # Leave the RNG exactly where a fresh load would have left it
+            random.setstate(state["rng_state"])
+            print(f" Loaded {type(self).__name__} from snapshot in {(time.perf_counter() - start) * 1000:.0f}ms ({path})")
+            return
+
         self._load_data()
+        try:
+            save_snapshot(path, {"attributes": dict(vars(self)), "rng_state": random.getstate()})
+        except Exception as e:
+            print(f" Could not write dataset snapshot {path}: {e}")
 
     @abstractmethod
     def _load_data(self):
@@ -20,22 +20,28 @@ class BBHAllTasksLoader(BaseLoader):
         if path is None:
             path = DATA_PATHS.get("bbh_all", "data/BIG-Bench-Hard-data")
         
-        self.task_data = {}  # Store data for each task
+        self.task_index = {}  # Task name -> file, size, split sizes and shuffle RNG state
+        self.task_data = {}  # Store data for each loaded task
         super().__init__(path)  # Pass path to parent class
     
+    def _snapshot_key_extra(self):
+        return BBH_ALL_TASKS
+
     def _load_data(self):
-        """Load all BBH task data, store separately by task"""
+        """Index all BBH tasks (file, size, split sizes, shuffle RNG state); task data is loaded on first access"""
         if not os.path.exists(self.path):
             raise FileNotFoundError(f"BBH data path does not exist: {self.path}")
         
-        print(f" Starting to load all BBH task data...")
+        print(f" Starting to index all BBH task data...")
         print(f" Data path: {self.path}")
         
         # Set random seed for reproducibility
         random.seed(DATA_SPLIT_CONFIG['random_seed'])
         
-        self.task_data = {}
-        successful_tasks = 0
+        self.task_index = {}
+        self.task_data = {}  # Loaded tasks, filled by get_task_data and emptied by release_task
+        total_validation = 0
+        total_test = 0
         
         for task_name in BBH_ALL_TASKS:
             json_file = os.path.join(self.path, f"{task_name}.json")
@@ -45,73 +51,100 @@ class BBHAllTasksLoader(BaseLoader):
                 continue
             
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    task_data = json.load(f)
-                
-                if 'examples' not in task_data:
-                    print(f" Task {task_name} data format error: missing examples field")
-                    continue
-                
-                # Convert data format
-                examples = []
-                for example in task_data['examples']:
-                    processed_example = {
-                        'input': example.get('input', ''),
-                        'target': example.get('target', ''),
-                        'task': task_name
-                    }
-                    examples.append(processed_example)
-                
-                # Shuffle data
-                if DATA_SPLIT_CONFIG['shuffle_before_split']:
-                    random.shuffle(examples)
-                
-                # Adaptive data split: validation set fixed at 50, test set is the rest
-                val_size = 50
-                total_available = len(examples)
-                
-                if total_available < val_size:
-                    print(f" Task {task_name} insufficient samples: {len(examples)} < {val_size}")
-                    # If total samples less than 50, adjust split ratio
-                    val_size = max(1, total_available // 2)  # Keep at least 1 validation sample
-                    test_size = total_available - val_size
-                else:
-                    # Normal case: validation set 50, test set is the rest
-                    test_size = total_available - val_size
-                
-                validation_data = examples[:val_size]
-                test_data = examples[val_size:val_size + test_size]
-                
-                self.task_data[task_name] = {
-                    'validation': validation_data,
-                    'test': test_data,
-                    'all': examples
-                }
-                
-                successful_tasks += 1
-                print(f"{task_name}: validation {len(validation_data)} samples, test {len(test_data)} samples (total {total_available})")
-                
+                total_available = len(self._read_examples(json_file))
             except Exception as e:
                 print(f" Error loading task {task_name}: {e}")
                 continue
-        
-        print(f" Successfully loaded {successful_tasks}/{len(BBH_ALL_TASKS)} BBH tasks")
-        
-        # Create a comprehensive data dict for compatibility with existing interface
-        all_validation = []
-        all_test = []
-        
-        for task_name, task_data in self.task_data.items():
-            all_validation.extend(task_data['validation'])
-            all_test.extend(task_data['test'])
+            
+            # Record the RNG state the task's shuffle starts from and advance the RNG exactly as shuffling
+            # the task would, so lazily loaded splits match loading every task in order
+            rng_state = None
+            if DATA_SPLIT_CONFIG['shuffle_before_split']:
+                rng_state = random.getstate()
+                random.shuffle(list(range(total_available)))
+            
+            val_size, test_size = self._split_sizes(total_available)
+            if total_available < 50:
+                print(f" Task {task_name} insufficient samples: {total_available} < 50")
+            
+            self.task_index[task_name] = {
+                'file': json_file,
+                'size': total_available,
+                'validation': val_size,
+                'test': test_size,
+                'rng_state': rng_state
+            }
+            total_validation += val_size
+            total_test += test_size
+            print(f"{task_name}: validation {val_size} samples, test {test_size} samples (total {total_available})")
+        
+        print(f" Successfully indexed {len(self.task_index)}/{len(BBH_ALL_TASKS)} BBH tasks")
         
         self.data = {
-            'validation': all_validation,
-            'test': all_test,
-            'task_data': self.task_data  # Keep data grouped by task
+            'task_index': self.task_index,
+            'task_data': self.task_data  # Loaded tasks grouped by task
         }
         
-        print(f" Total: validation {len(all_validation)} samples, test {len(all_test)} samples")
+        print(f" Total: validation {total_validation} samples, test {total_test} samples")
+    
+    @staticmethod
+    def _read_examples(json_file: str) -> List[Dict[str, Any]]:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            task_data = json.load(f)
+        if 'examples' not in task_data:
+            raise ValueError("data format error: missing examples field")
+        return task_data['examples']
+    
+    @staticmethod
+    def _split_sizes(total_available: int):
+        """Adaptive data split: validation set fixed at 50, test set is the rest"""
+        val_size = 50
+        if total_available < val_size:
+            # If total samples less than 50, keep at least 1 validation sample
+            val_size = max(1, total_available // 2)
+        return val_size, total_available - val_size
+    
+    def _load_task(self, task_name: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Read, shuffle and split one indexed task"""
+        entry = self.task_index[task_name]
+        
+        # Convert data format
+        examples = []
+        for example in self._read_examples(entry['file']):
+            processed_example = {
+                'input': example.get('input', ''),
+                'target': example.get('target', ''),
+                'task': task_name
+            }
+            examples.append(processed_example)
+        
+        if len(examples) != entry['size']:
+            print(f" Task {task_name} changed since indexing: {len(examples)} samples, indexed {entry['size']}")
+        
+        # Shuffle data from the RNG state recorded for this task (the global RNG is left untouched)
+        if entry['rng_state'] is not None:
+            rng = random.Random()
+            rng.setstate(entry['rng_state'])
+            rng.shuffle(examples)
+        
+        val_size, test_size = self._split_sizes(len(examples))
+        return {
+            'validation': examples[:val_size],
+            'test': examples[val_size:val_size + test_size],
+            'all': examples
+        }
+    
+    def _task_splits(self, task_name: str, keep: bool) -> Dict[str, List[Dict[str, Any]]]:
+        if task_name in self.task_data:
+            return self.task_data[task_name]
+        try:
+            splits = self._load_task(task_name)
+        except Exception as e:
+            print(f" Error loading task {task_name}: {e}")
+            return {}
+        if keep:
+            self.task_data[task_name] = splits
+        return splits
     
     def get_split(self, split_name: str, num_samples: int = None, offset: int = 0) -> List[Dict[str, Any]]:
         """Get data for specified split
@@ -124,10 +157,11 @@ class BBHAllTasksLoader(BaseLoader):
         if self.data is None:
             self._load_data()
         
+        data = []
         if split_name in ['validation', 'test']:
-            data = self.data.get(split_name, [])
-        else:
-            data = []
+            # Concatenation over all tasks; tasks not loaded yet are read without being kept
+            for task_name in self.task_index:
+                data.extend(self._task_splits(task_name, keep=False).get(split_name, []))
         
         # Apply offset and num_samples
         if offset > 0:
@@ -139,18 +173,22 @@ class BBHAllTasksLoader(BaseLoader):
         return data
     
     def get_task_data(self, task_name: str, split_name: str) -> List[Dict[str, Any]]:
-        """Get data for specific task"""
+        """Get data for specific task, loading the task on first access"""
         if self.data is None:
             self._load_data()
         
-        if task_name not in self.task_data:
+        if task_name not in self.task_index:
             return []
         
-        return self.task_data[task_name].get(split_name, [])
+        return self._task_splits(task_name, keep=True).get(split_name, [])
+    
+    def release_task(self, task_name: str):
+        """Drop a loaded task from memory (it is loaded again, identically, on the next access)"""
+        self.task_data.pop(task_name, None)
     
     def get_all_task_names(self) -> List[str]:
-        """Get all successfully loaded task names"""
+        """Get all successfully indexed task names"""
         if self.data is None:
             self._load_data()
         
-        return list(self.task_data.keys()) 
\ No newline at end of file
+        return list(self.task_index.keys())
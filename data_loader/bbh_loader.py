@@ -7,6 +7,10 @@ from ..config import DATA_PATHS
 
 class BBHLoader(BaseLoader):
     """Load Big-Bench Hard (BBH) dataset."""
+    def _snapshot_sources(self):
+        # Data is read from the configured BBH directory, not from self.path
+        return [DATA_PATHS.get("bbh_hard", "aPSF/data/BIG-Bench-Hard-data")]
+
     def _load_data(self):
         # Load all JSON files from local BBH data directory
         bbh_data_path = DATA_PATHS.get("bbh_hard", "aPSF/data/BIG-Bench-Hard-data")
@@ -1,6 +1,5 @@
 import os
 import re
-import pyarrow.parquet as pq
 from .base_loader import BaseLoader
 import random
 
@@ -33,7 +32,8 @@ class CompetitionMathLoader(BaseLoader):
             raise FileNotFoundError(f"Data file not found: {parquet_file}")
         
         try:
-            # Read Parquet file
+            # Read Parquet file (pyarrow is only imported when this dataset is used)
+            import pyarrow.parquet as pq
             table = pq.read_table(parquet_file)
             
             # Convert to list of dictionaries
@@ -1,4 +1,3 @@
-import pandas as pd
 import ast
 import os
 import random
@@ -9,6 +8,7 @@ class GSM8KLoader(BaseLoader):
     
     def _load_data(self):
         """Load GSM8K data from local files"""
+        import pandas as pd  # Imported here so runs on other datasets skip pandas at startup
         
         # Check for parquet file
         parquet_file = os.path.join(self.path, "train-00000-of-00001.parquet")
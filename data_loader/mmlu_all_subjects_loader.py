@@ -19,22 +19,28 @@ class MMLUAllSubjectsLoader(BaseLoader):
         if path is None:
             path = DATA_PATHS.get("mmlu", "data/MMLU-data")
         
-        self.subject_data = {}  # Store data for each subject
+        self.subject_index = {}  # Subject name -> file, size, split sizes and shuffle RNG state
+        self.subject_data = {}  # Store data for each loaded subject
         super().__init__(path)
     
+    def _snapshot_key_extra(self):
+        return MMLU_ALL_SUBJECTS
+
     def _load_data(self):
-        """Load all MMLU subject data, store separately by subject"""
+        """Index all MMLU subjects (file, size, split sizes, shuffle RNG state); subject data is loaded on first access"""
         if not os.path.exists(self.path):
             raise FileNotFoundError(f"MMLU data path does not exist: {self.path}")
         
-        print(f" Starting to load all MMLU subject data...")
+        print(f" Starting to index all MMLU subject data...")
         print(f" Data path: {self.path}")
         
         # Set random seed for reproducibility
         random.seed(DATA_SPLIT_CONFIG['random_seed'])
         
-        self.subject_data = {}
-        successful_subjects = 0
+        self.subject_index = {}
+        self.subject_data = {}  # Loaded subjects, filled on access and emptied by release_subject
+        total_validation = 0
+        total_test = 0
         
         for subject in MMLU_ALL_SUBJECTS:
             test_file = os.path.join(self.path, "test", f"{subject}_test.csv")
@@ -44,61 +50,93 @@ class MMLUAllSubjectsLoader(BaseLoader):
                 continue
             
             try:
-                # Load subject data
-                subject_data_list = self._load_subject_data(test_file, subject)
-                
-                if not subject_data_list:
-                    print(f" Subject {subject} data is empty")
-                    continue
-                
-                # Shuffle data
-                if DATA_SPLIT_CONFIG['shuffle_before_split']:
-                    random.shuffle(subject_data_list)
-                
-                # Split data: validation set 50, test set is the rest
-                val_size = 50
-                total_available = len(subject_data_list)
-                
-                if total_available < val_size:
-                    # If total samples less than 50, adjust split ratio
-                    val_size = max(1, total_available // 2)
-                    test_size = total_available - val_size
-                else:
-                    test_size = total_available - val_size
-                
-                validation_data = subject_data_list[:val_size]
-                test_data = subject_data_list[val_size:val_size + test_size]
-                
-                self.subject_data[subject] = {
-                    'validation': validation_data,
-                    'test': test_data,
-                    'all': subject_data_list
-                }
-                
-                successful_subjects += 1
-                print(f" {subject}: validation {len(validation_data)} samples, test {len(test_data)} samples (total {total_available})")
-                
+                total_available = sum(1 for _ in self._iter_subject_rows(test_file))
             except Exception as e:
-                print(f" Error loading subject {subject}: {e}")
+                print(f" Error loading {test_file}: {e}")
+                total_available = 0
+            
+            if not total_available:
+                print(f" Subject {subject} data is empty")
                 continue
+            
+            # Record the RNG state the subject's shuffle starts from and advance the RNG exactly as shuffling
+            # the subject would, so lazily loaded splits match loading every subject in order
+            rng_state = None
+            if DATA_SPLIT_CONFIG['shuffle_before_split']:
+                rng_state = random.getstate()
+                random.shuffle(list(range(total_available)))
+            
+            val_size, test_size = self._split_sizes(total_available)
+            self.subject_index[subject] = {
+                'file': test_file,
+                'size': total_available,
+                'validation': val_size,
+                'test': test_size,
+                'rng_state': rng_state
+            }
+            total_validation += val_size
+            total_test += test_size
+            print(f" {subject}: validation {val_size} samples, test {test_size} samples (total {total_available})")
         
-        print(f"\n Successfully loaded {successful_subjects}/{len(MMLU_ALL_SUBJECTS)} MMLU subjects")
-        
-        # Create a comprehensive data dict for compatibility with existing interface
-        all_validation = []
-        all_test = []
-        
-        for subject, subject_data in self.subject_data.items():
-            all_validation.extend(subject_data['validation'])
-            all_test.extend(subject_data['test'])
+        print(f"\n Successfully indexed {len(self.subject_index)}/{len(MMLU_ALL_SUBJECTS)} MMLU subjects")
         
         self.data = {
-            'validation': all_validation,
-            'test': all_test,
-            'subject_data': self.subject_data  # Keep data grouped by subject
+            'subject_index': self.subject_index,
+            'subject_data': self.subject_data  # Loaded subjects grouped by subject
         }
         
-        print(f" Total: validation {len(all_validation)} samples, test {len(all_test)} samples")
+        print(f" Total: validation {total_validation} samples, test {total_test} samples")
+    
+    @staticmethod
+    def _split_sizes(total_available: int):
+        """Split data: validation set 50, test set is the rest"""
+        val_size = 50
+        if total_available < val_size:
+            # If total samples less than 50, adjust split ratio
+            val_size = max(1, total_available // 2)
+        return val_size, total_available - val_size
+    
+    def _load_subject(self, subject: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Read, shuffle and split one indexed subject"""
+        entry = self.subject_index[subject]
+        subject_data_list = self._load_subject_data(entry['file'], subject)
+        
+        if len(subject_data_list) != entry['size']:
+            print(f" Subject {subject} changed since indexing: {len(subject_data_list)} samples, indexed {entry['size']}")
+        
+        # Shuffle data from the RNG state recorded for this subject (the global RNG is left untouched)
+        if entry['rng_state'] is not None:
+            rng = random.Random()
+            rng.setstate(entry['rng_state'])
+            rng.shuffle(subject_data_list)
+        
+        val_size, test_size = self._split_sizes(len(subject_data_list))
+        return {
+            'validation': subject_data_list[:val_size],
+            'test': subject_data_list[val_size:val_size + test_size],
+            'all': subject_data_list
+        }
+    
+    def _subject_splits(self, subject: str, keep: bool) -> Dict[str, List[Dict[str, Any]]]:
+        if subject in self.subject_data:
+            return self.subject_data[subject]
+        splits = self._load_subject(subject)
+        if keep:
+            self.subject_data[subject] = splits
+        return splits
+    
+    @staticmethod
+    def _iter_subject_rows(file_path: str):
+        """(row index, row) of every well-formed CSV row (6 columns, answer A-D)"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            for row_idx, row in enumerate(reader):
+                if len(row) < 6:
+                    continue
+                # Ensure answer format is correct
+                if row[5].strip().upper() not in ['A', 'B', 'C', 'D']:
+                    continue
+                yield row_idx, row
     
     def _load_subject_data(self, file_path: str, subject: str) -> List[Dict[str, Any]]:
         """
@@ -114,63 +152,54 @@ class MMLUAllSubjectsLoader(BaseLoader):
         data = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row_idx, row in enumerate(reader):
-                    if len(row) < 6:
-                        continue
-                    
-                    question = row[0].strip()
-                    option_a = row[1].strip()
-                    option_b = row[2].strip()
-                    option_c = row[3].strip()
-                    option_d = row[4].strip()
-                    answer = row[5].strip().upper()
-                    
-                    # Ensure answer format is correct
-                    if answer not in ['A', 'B', 'C', 'D']:
-                        continue
-                    
-                    # Construct options dictionary
-                    options = {
-                        'A': option_a,
-                        'B': option_b,
-                        'C': option_c,
-                        'D': option_d
-                    }
-                    
-                    # Construct input text (multiple choice format)
-                    input_text = f"Question: {question}\n\n"
-                    input_text += f"A. {option_a}\n"
-                    input_text += f"B. {option_b}\n"
-                    input_text += f"C. {option_c}\n"
-                    input_text += f"D. {option_d}\n\n"
-                    input_text += "Answer:"
-                    
-                    # Create data item
-                    item = {
-                        # Standard fields
-                        'input': input_text,
-                        'question': question,
-                        'options': options,
-                        'answer': f"({answer})",  # Format as (A) form
-                        'target': f"({answer})",
-                        'subject': subject,
-                        
-                        # Compatibility fields
-                        'prompt': input_text,
-                        'output': f"({answer})",
-                        'label': answer,
-                        'correct_answer': answer,
-                        
-                        # Metadata
-                        'task_type': 'multiple_choice',
-                        'dataset': 'mmlu',
-                        'id': f"{subject}_{row_idx}"
-                    }
+            for row_idx, row in self._iter_subject_rows(file_path):
+                question = row[0].strip()
+                option_a = row[1].strip()
+                option_b = row[2].strip()
+                option_c = row[3].strip()
+                option_d = row[4].strip()
+                answer = row[5].strip().upper()
+                
+                # Construct options dictionary
+                options = {
+                    'A': option_a,
+                    'B': option_b,
+                    'C': option_c,
+                    'D': option_d
+                }
+                
+                # Construct input text (multiple choice format)
+                input_text = f"Question: {question}\n\n"
+                input_text += f"A. {option_a}\n"
+                input_text += f"B. {option_b}\n"
+                input_text += f"C. {option_c}\n"
+                input_text += f"D. {option_d}\n\n"
+                input_text += "Answer:"
+                
+                # Create data item
+                item = {
+                    # Standard fields
+                    'input': input_text,
+                    'question': question,
+                    'options': options,
+                    'answer': f"({answer})",  # Format as (A) form
+                    'target': f"({answer})",
+                    'subject': subject,
                     
-                    data.append(item)
+                    # Compatibility fields
+                    'prompt': input_text,
+                    'output': f"({answer})",
+                    'label': answer,
+                    'correct_answer': answer,
                     
+                    # Metadata
+                    'task_type': 'multiple_choice',
+                    'dataset': 'mmlu',
+                    'id': f"{subject}_{row_idx}"
+                }
+                
+                data.append(item)
+                
         except Exception as e:
             print(f" Error loading {file_path}: {e}")
             return []
@@ -188,12 +217,13 @@ class MMLUAllSubjectsLoader(BaseLoader):
         if self.data is None:
             self._load_data()
         
+        data = []
         if split_name in ['validation', 'test', 'dev']:
-            data = self.data.get(split_name, [])
-            if split_name == 'dev' and not data:
-                data = self.data.get('validation', [])
-        else:
-            data = []
+            # Concatenation over all subjects; subjects not loaded yet are read without being kept
+            # ('dev' is served from the validation splits)
+            split_key = 'validation' if split_name == 'dev' else split_name
+            for subject in self.subject_index:
+                data.extend(self._subject_splits(subject, keep=False).get(split_key, []))
         
         # Apply offset and num_samples
         if offset > 0:
@@ -205,21 +235,30 @@ class MMLUAllSubjectsLoader(BaseLoader):
         return data
     
     def get_subject_data(self, subject: str, split_name: str) -> List[Dict[str, Any]]:
-        """Get data for specific subject"""
+        """Get data for specific subject, loading the subject on first access"""
         if self.data is None:
             self._load_data()
         
-        if subject not in self.subject_data:
+        if subject not in self.subject_index:
             return []
         
-        return self.subject_data[subject].get(split_name, [])
+        return self._subject_splits(subject, keep=True).get(split_name, [])
+    
+    def release_subject(self, subject: str):
+        """Drop a loaded subject from memory (it is loaded again, identically, on the next access)"""
+        self.subject_data.pop(subject, None)
+    
+    def release_category(self, category: str):
+        """Drop the loaded subjects of a category from memory"""
+        for subject in MMLU_CATEGORIES.get(category, []):
+            self.release_subject(subject)
     
     def get_all_subject_names(self) -> List[str]:
-        """Get all successfully loaded subject names"""
+        """Get all successfully indexed subject names"""
         if self.data is None:
             self._load_data()
         
-        return list(self.subject_data.keys())
+        return list(self.subject_index.keys())
     
     def get_category_data(self, category: str, split_name: str) -> List[Dict[str, Any]]:
         """
@@ -248,8 +287,8 @@ class MMLUAllSubjectsLoader(BaseLoader):
         # First merge all raw data from subjects in this category (using 'all' field)
         merged_all_data = []
         for subject in category_subjects:
-            if subject in self.subject_data:
-                subject_all_data = self.subject_data[subject].get('all', [])
+            if subject in self.subject_index:
+                subject_all_data = self.get_subject_data(subject, 'all')
                 merged_all_data.extend(subject_all_data)
         
         # Already shuffled using seed during loading, no need to shuffle again
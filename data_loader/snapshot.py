@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+# Binary snapshots of fully loaded (parsed, shuffled and split) loader state.
+# A snapshot is named <Loader>-<settings hash>-<version hash>.pkl: the settings hash covers the loader parameters,
+# DATA_SPLIT_CONFIG and the RNG state at load time, the version hash covers the source files and the loader code.
+# Writing a new version removes the older versions of the same settings.
+
+
+def _stable_hash(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def source_fingerprint(paths: List[str]) -> Optional[List]:
+    """(path, size, mtime) of every source file under `paths`, None when a source does not exist locally"""
+    fingerprint = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            return None
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            fingerprint.append([path, stat.st_size, stat.st_mtime_ns])
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+            for name in sorted(files):
+                if name.startswith('.'):
+                    continue
+                file_path = os.path.join(root, name)
+                stat = os.stat(file_path)
+                fingerprint.append([os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def snapshot_file(directory: str, loader_name: str, settings: Dict[str, Any], version: Dict[str, Any]) -> str:
+    return os.path.join(directory, f"{loader_name}-{_stable_hash(settings)[:12]}-{_stable_hash(version)[:16]}.pkl")
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_snapshot(path: str, state: Dict[str, Any]):
+    """Write a snapshot atomically and drop older versions of the same loader settings"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    settings_prefix = os.path.basename(path).rsplit("-", 1)[0] + "-"
+    for name in os.listdir(directory):
+        if name.startswith(settings_prefix) and name.endswith(".pkl") and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
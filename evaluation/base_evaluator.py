@@ -1,5 +1,8 @@
+import hashlib
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from ..llm_apis import is_failure
 
 class BaseEvaluator(ABC):
     """
@@ -30,7 +33,11 @@ class BaseEvaluator(ABC):
                                          current_prompt: str = None, factors_dict: Dict[str, str] = None,
                                          factor_selection_history: str = None,
                                          full_reasoning: List[str] = None,
-                                         evaluation_results: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+                                         evaluation_results: List[Dict[str, Any]] = None,
+                                         max_workers: int = 1,
+                                         max_analyzed: int = None,
+                                         sampling: str = "stratified",
+                                         use_cache: bool = True) -> Dict[str, Any]:
         """
         Collect and analyze error samples - fine-grained error localization based on reasoning steps
 
@@ -44,13 +51,14 @@ class BaseEvaluator(ABC):
             factor_selection_history: Factor selection history
             full_reasoning: List of model's full reasoning process (for error analysis, use predictions if None)
             evaluation_results: Existing evaluation results list (containing correct field), avoid duplicate judgment
+            max_workers: Number of step analyses run concurrently (1 = sequential)
+            max_analyzed: Analyze at most this many errors (None = all)
+            sampling: How to pick errors when capped: "stratified" (round-robin over item type) or "first"
+            use_cache: Reuse analyses across steps for samples whose model output and factor names are unchanged
 
         Returns:
             Dictionary containing error analysis results, including error type distribution and factor improvement suggestions
         """
-        import re
-        import json
-
         errors = []
         factor_effectiveness = {}
 
@@ -72,58 +80,150 @@ class BaseEvaluator(ABC):
                 # Get full reasoning process: prefer full_reasoning, fallback to pred
                 model_full_output = full_reasoning[i] if full_reasoning and i < len(full_reasoning) else pred
 
-                error_info = {
+                errors.append({
                     'sample_id': i,
                     'question': ref.get('question') or ref.get('input') or ref.get('prompt') or '',
                     'model_output': model_full_output,  # Full reasoning process for error analysis
                     'extracted_answer': pred,  # Extracted answer for display
                     'target_answer': gold_answer,
                     'ground_truth_steps': ground_truth_steps,
-                }
-
-                if llm:
-                    # Analyze regardless of whether steps exist, pass steps if available, otherwise pass empty
-                    has_steps = bool(ground_truth_steps)
-                    analysis_type = "step-level analysis" if has_steps else "question-answer based analysis"
-                    print(f"  [Sample {i}] Calling LLM for {analysis_type}...")
-                    print(f"    Model answer: {pred}")
-                    print(f"    Gold answer: {gold_answer}")
-                    
-                    step_analysis = self._do_step_analysis(
-                        llm, error_info['question'], error_info['model_output'],
-                        error_info['ground_truth_steps'], error_info['target_answer'],
-                        factor_names=factor_names,
-                        current_prompt=current_prompt,
-                        factors_dict=factors_dict,
-                        factor_selection_history=factor_selection_history
-                    )
-                    error_info['step_analysis'] = step_analysis
-
-                    suggested_factor = step_analysis.get('suggested_factor')
-                    if suggested_factor:  # As long as not None/empty, use directly
-                        factor_effectiveness[suggested_factor] = factor_effectiveness.get(suggested_factor, 0) + 1
-
-                    print(f"    Error description: {step_analysis.get('error_description', 'N/A')[:80]}")
-                    print(f"    Suggested factor: {suggested_factor}, confidence: {step_analysis.get('confidence', 0.0):.2f}")
-
-                errors.append(error_info)
+                })
+
+        analyzed = []
+        if llm and errors:
+            analyzed = self._select_errors_for_analysis(errors, references, max_analyzed, sampling)
+            workers = max(1, min(int(max_workers or 1), len(analyzed)))
+            print(f"[Step Analysis] Analyzing {len(analyzed)}/{len(errors)} errors (max_workers={workers})")
+
+            def analyze(error_info):
+                return self._do_step_analysis(
+                    llm, error_info['question'], error_info['model_output'],
+                    error_info['ground_truth_steps'], error_info['target_answer'],
+                    factor_names=factor_names,
+                    current_prompt=current_prompt,
+                    factors_dict=factors_dict,
+                    factor_selection_history=factor_selection_history
+                )
+
+            # Reuse analyses of samples that failed the same way in an earlier step
+            analyses = [None] * len(analyzed)
+            cache_keys = [None] * len(analyzed)
+            if use_cache:
+                for j, error_info in enumerate(analyzed):
+                    cache_keys[j] = self._step_analysis_cache_key(error_info, factor_names)
+                    cached = self._get_step_analysis_cache().get(cache_keys[j])
+                    if cached is not None:
+                        analyses[j] = dict(cached)
+            pending = [j for j in range(len(analyzed)) if analyses[j] is None]
+            hits = len(analyzed) - len(pending)
+            if hits:
+                print(f"[Step Analysis] Reusing {hits} cached analyses, calling LLM for {len(pending)}")
+
+            tokens_before = llm.get_token_stats().get('total_tokens', 0) if hasattr(llm, 'get_token_stats') else 0
+            if workers > 1 and len(pending) > 1:
+                # executor.map keeps input order, so aggregation below does not depend on completion order
+                with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                    fresh = list(executor.map(analyze, [analyzed[j] for j in pending]))
+            else:
+                fresh = [analyze(analyzed[j]) for j in pending]
+            tokens_used = (llm.get_token_stats().get('total_tokens', 0) - tokens_before) if hasattr(llm, 'get_token_stats') else 0
+
+            for j, step_analysis in zip(pending, fresh):
+                analyses[j] = step_analysis
+                # Failed analyses are not cached so they get retried next step
+                if use_cache and step_analysis.get('error_description') != 'Analysis failed':
+                    self._get_step_analysis_cache()[cache_keys[j]] = dict(step_analysis)
+            self._record_step_analysis_cache(hits, len(pending), tokens_used)
+
+            # Aggregate in sample order
+            for error_info, step_analysis in zip(analyzed, analyses):
+                error_info['step_analysis'] = step_analysis
+
+                suggested_factor = step_analysis.get('suggested_factor')
+                if suggested_factor:  # As long as not None/empty, use directly
+                    factor_effectiveness[suggested_factor] = factor_effectiveness.get(suggested_factor, 0) + 1
+
+                analysis_type = "step-level analysis" if error_info['ground_truth_steps'] else "question-answer based analysis"
+                print(f"  [Sample {error_info['sample_id']}] {analysis_type}")
+                print(f"    Model answer: {error_info['extracted_answer']}")
+                print(f"    Gold answer: {error_info['target_answer']}")
+                print(f"    Error description: {step_analysis.get('error_description', 'N/A')[:80]}")
+                print(f"    Suggested factor: {suggested_factor}, confidence: {step_analysis.get('confidence', 0.0):.2f}")
 
         total_errors = len(errors)
         print(f"\n[Collection Complete] Total error samples: {total_errors}")
         print(f"           Factor effectiveness: {factor_effectiveness}\n")
 
         factor_priorities = {}
-        if total_errors > 0 and factor_effectiveness:
+        # Priorities are shares of the analyzed errors (all errors unless capped)
+        analyzed_count = len(analyzed) if analyzed else total_errors
+        if analyzed_count > 0 and factor_effectiveness:
             for factor, count in factor_effectiveness.items():
-                factor_priorities[factor] = count / total_errors
+                factor_priorities[factor] = count / analyzed_count
 
         return {
             'total_errors': total_errors,
+            'analyzed_errors': len(analyzed),
             'errors': errors,
             'factor_priorities': factor_priorities,
             'factor_effectiveness': factor_effectiveness
         }
 
+    def _get_step_analysis_cache(self) -> Dict[tuple, Dict[str, Any]]:
+        """Step analyses kept across optimization steps (created lazily, subclasses need not call super().__init__)"""
+        if not hasattr(self, '_step_analysis_cache'):
+            self._step_analysis_cache = {}
+        return self._step_analysis_cache
+
+    @staticmethod
+    def _step_analysis_cache_key(error_info: Dict[str, Any], factor_names: List[str] = None) -> tuple:
+        """(sample_id, hash of model output, factor names)"""
+        output_hash = hashlib.sha256(str(error_info['model_output']).encode('utf-8', errors='ignore')).hexdigest()
+        return error_info['sample_id'], output_hash, tuple(factor_names or ())
+
+    def _record_step_analysis_cache(self, hits: int, misses: int, tokens_used: int):
+        """Track cache hits and an estimate of architect tokens saved (hits x average tokens per analysis)"""
+        stats = self.get_step_analysis_cache_stats()
+        stats['hits'] += hits
+        stats['misses'] += misses
+        stats['analysis_tokens'] += tokens_used
+        if stats['misses'] > 0:
+            stats['estimated_tokens_saved'] += int(hits * stats['analysis_tokens'] / stats['misses'])
+
+    def get_step_analysis_cache_stats(self) -> Dict[str, int]:
+        """Cross-step step-analysis cache statistics"""
+        if not hasattr(self, '_step_analysis_cache_stats'):
+            self._step_analysis_cache_stats = {'hits': 0, 'misses': 0, 'analysis_tokens': 0, 'estimated_tokens_saved': 0}
+        return self._step_analysis_cache_stats
+
+    def _select_errors_for_analysis(self, errors: List[Dict[str, Any]], references: List[Dict[str, Any]],
+                                    max_analyzed: int = None, sampling: str = "stratified") -> List[Dict[str, Any]]:
+        """
+        Pick the errors to analyze when capped. Stratified sampling takes errors round-robin across
+        item types (type/task/subject/level field) in sample order, so the pick is deterministic.
+        """
+        if not max_analyzed or max_analyzed >= len(errors):
+            return list(errors)
+        if sampling != "stratified":
+            return errors[:max_analyzed]
+
+        strata = {}
+        for error_info in errors:
+            ref = references[error_info['sample_id']]
+            stratum = str(ref.get('type') or ref.get('task') or ref.get('subject') or ref.get('level') or '')
+            strata.setdefault(stratum, []).append(error_info)
+
+        selected = []
+        queues = [strata[key] for key in sorted(strata)]
+        depth = 0
+        while len(selected) < max_analyzed:
+            for queue in queues:
+                if depth < len(queue) and len(selected) < max_analyzed:
+                    selected.append(queue[depth])
+            depth += 1
+        # Keep sample order
+        return sorted(selected, key=lambda error_info: error_info['sample_id'])
+
     def _check_correctness(self, prediction: str, gold_answer: str) -> bool:
         """Basic correctness check (can be overridden by subclasses)"""
         if not gold_answer:
@@ -240,6 +340,9 @@ JSON Output:"""
 
         try:
             response = llm.generate(analysis_prompt)
+            if is_failure(response):
+                # Failed call (returned, not raised): must not be parsed into a cached fallback
+                raise RuntimeError(response.error)
             parsed_result = self._parse_analysis(response, factor_names)
             return parsed_result
         except Exception as e:
@@ -0,0 +1,99 @@
+"""
+Batched multi-item LLM judging.
+
+Packs several (response, gold answer) pairs into one numbered prompt and asks for a JSON object
+mapping every item number to a verdict. Entries that are missing or malformed in the reply are
+re-judged one by one with the evaluator's single-item judge.
+"""
+import json
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def parse_numbered_verdicts(response: str, count: int, positive: str, negative: str) -> Dict[int, bool]:
+    """
+    Parse {"1": "YES", "2": "NO", ...} style output into {item_index: verdict}.
+    Only well-formed entries for items 1..count are returned (as 0-based indices).
+    """
+    verdicts = {}
+    if not response:
+        return verdicts
+    positive, negative = positive.upper(), negative.upper()
+
+    def _verdict(value) -> Optional[bool]:
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().strip('"\'.').upper()
+        if text == positive:
+            return True
+        if text == negative:
+            return False
+        return None
+
+    # Preferred: the last JSON object in the reply
+    for match in reversed(list(re.finditer(r'\{[^{}]*\}', response, re.DOTALL))):
+        try:
+            parsed = json.loads(match.group(0))
+        except (ValueError, TypeError):
+            continue
+        if isinstance(parsed, dict):
+            for key, value in parsed.items():
+                number = re.sub(r'\D', '', str(key))
+                verdict = _verdict(value)
+                if number and 1 <= int(number) <= count and verdict is not None:
+                    verdicts[int(number) - 1] = verdict
+            if verdicts:
+                return verdicts
+
+    # Fallback: "1: YES" / "Item 2 - NO" lines
+    pattern = re.compile(r'(?:item\s*)?"?(\d+)"?\s*[:.)=-]\s*"?(' + re.escape(positive) + '|' + re.escape(negative) + r')\b',
+                         re.IGNORECASE)
+    for number, value in pattern.findall(response):
+        if 1 <= int(number) <= count:
+            verdicts[int(number) - 1] = value.upper() == positive
+    return verdicts
+
+
+def judge_in_batches(entries: Sequence, llm, batch_size: int,
+                     build_prompt: Callable[[Sequence], str],
+                     single_judge: Callable[[object], bool],
+                     positive: str = "YES", negative: str = "NO") -> List[bool]:
+    """
+    Judge entries in chunks of `batch_size`, one LLM call per chunk.
+
+    Args:
+        entries: Items to judge (opaque to this function)
+        build_prompt: chunk -> numbered judge prompt
+        single_judge: entry -> bool, used for batch_size <= 1 and for malformed entries
+        positive / negative: verdict words expected in the JSON output
+
+    Returns:
+        One verdict per entry, in input order
+    """
+    if not entries:
+        return []
+    if batch_size <= 1 or len(entries) == 1 or llm is None:
+        return [single_judge(entry) for entry in entries]
+
+    chunks = [list(entries[start:start + batch_size]) for start in range(0, len(entries), batch_size)]
+    prompts = [build_prompt(chunk) for chunk in chunks]
+    try:
+        responses = llm.batch_generate(prompts)
+    except Exception as e:
+        print(f"     Batched judgment failed, judging items individually: {e}")
+        responses = [""] * len(chunks)
+
+    results = []
+    fallbacks = 0
+    for chunk, response in zip(chunks, responses):
+        verdicts = parse_numbered_verdicts(response, len(chunk), positive, negative)
+        for j, entry in enumerate(chunk):
+            if j in verdicts:
+                results.append(verdicts[j])
+            else:
+                fallbacks += 1
+                results.append(single_judge(entry))
+
+    print(f"     Batched judgment: {len(entries)} items in {len(chunks)} calls"
+          f"{f', {fallbacks} re-judged individually' if fallbacks else ''}")
+    return results
@@ -1,8 +1,32 @@
 import re
 from typing import List, Dict, Any
 from .base_evaluator import BaseEvaluator
+from .batch_judge import judge_in_batches
 from ..llm_apis import get_llm, BaseLLM
-from ..config import ANSWER_EXTRACTOR_LLM
+from ..config import ANSWER_EXTRACTOR_LLM, LLM_JUDGE_BATCH_SIZE
+
+# Judging rules shared by the single and the batched judge prompt, so both judge alike
+_JUDGE_GUIDELINES = """**Evaluation Guidelines:**
+1. **Focus ONLY on the final answer** - ignore the reasoning process quality
+2. **Check mathematical equivalence** - the final numerical/symbolic result must match
+3. **Ignore ALL formatting differences**:
+   - LaTeX syntax: \\boxed{}, \\frac{}{}, \\text{}
+   - Spacing and whitespace
+   - Parentheses placement
+   - Mathematical notation variants
+4. **Consider mathematical equivalence**:
+   - Different forms of the same expression (e.g., 2/4 = 0.5 = 1/2)
+   - Algebraic commutativity (e.g., a+b = b+a)
+   - Simplified vs unsimplified forms
+5. **For choice questions**: (A), A, and "Option A" are all equivalent
+6. **Extract the final answer yourself** from the model's response and compare
+
+**CRITICAL**: If the final answer is mathematically correct, output CORRECT even if:
+- The reasoning has minor issues
+- The formatting is different
+- The answer is expressed differently but is mathematically equivalent
+
+"""
 
 class CompetitionMathEvaluator(BaseEvaluator):
     """
@@ -259,27 +283,7 @@ Final Answer:"""
 **Model's Complete Response:**
 {model_response}
 
-**Evaluation Guidelines:**
-1. **Focus ONLY on the final answer** - ignore the reasoning process quality
-2. **Check mathematical equivalence** - the final numerical/symbolic result must match
-3. **Ignore ALL formatting differences**:
-   - LaTeX syntax: \\boxed{{}}, \\frac{{}}{{}}, \\text{{}}
-   - Spacing and whitespace
-   - Parentheses placement
-   - Mathematical notation variants
-4. **Consider mathematical equivalence**:
-   - Different forms of the same expression (e.g., 2/4 = 0.5 = 1/2)
-   - Algebraic commutativity (e.g., a+b = b+a)
-   - Simplified vs unsimplified forms
-5. **For choice questions**: (A), A, and "Option A" are all equivalent
-6. **Extract the final answer yourself** from the model's response and compare
-
-**CRITICAL**: If the final answer is mathematically correct, output CORRECT even if:
-- The reasoning has minor issues
-- The formatting is different
-- The answer is expressed differently but is mathematically equivalent
-
-Output EXACTLY one word: CORRECT or WRONG
+{_JUDGE_GUIDELINES}Output EXACTLY one word: CORRECT or WRONG
 
 Your judgment:"""
         
@@ -296,6 +300,32 @@ Your judgment:"""
             print(f"  LLM judgment failed: {e}")
             return False
     
+    def _judge_answers_with_llm_batch(self, entries: List[tuple], batch_size: int = None) -> List[bool]:
+        """
+        Judge several (model_response, question, ground_truth_answer) entries per LLM call.
+        Entries missing or malformed in the JSON reply are re-judged with _judge_answer_with_llm.
+        """
+        if batch_size is None:
+            batch_size = LLM_JUDGE_BATCH_SIZE.get(self.__class__.__name__, 1)
+
+        def build_prompt(chunk):
+            items_text = "\n\n".join(
+                f"### Item {n}\n**Problem:**\n{question}\n\n**Ground Truth Answer:**\n{ground_truth_answer}\n\n"
+                f"**Model's Complete Response:**\n{model_response}"
+                for n, (model_response, question, ground_truth_answer) in enumerate(chunk, 1)
+            )
+            return f"""You are a professional mathematics answer evaluator. For each numbered item, determine if the model's final answer is mathematically correct. Judge every item independently.
+
+{items_text}
+
+{_JUDGE_GUIDELINES}Output ONLY a JSON object mapping every item number to CORRECT or WRONG, e.g. {{"1": "CORRECT", "2": "WRONG"}}"""
+
+        return judge_in_batches(
+            entries, self.extractor_llm, batch_size, build_prompt,
+            single_judge=lambda entry: self._judge_answer_with_llm(entry[0], entry[1], entry[2]),
+            positive="CORRECT", negative="WRONG"
+        )
+    
     def _compare_answers(self, pred: str, gold: str) -> bool:
         """Compare if two mathematical answers are equal"""
         
@@ -333,15 +363,23 @@ Your judgment:"""
         print(f"Total samples: {total}")
         print(f"Answer comparison mode: {'LLM Semantic Comparison' if self.use_llm_comparison else 'Rule-based Comparison'}")
         
+        use_llm_judgment = self.use_llm_comparison and hasattr(self, 'extractor_llm') and self.extractor_llm
+        if use_llm_judgment:
+            # Use LLM judgment directly (without extracting answer), several samples per call
+            judgments = self._judge_answers_with_llm_batch([
+                (pred,
+                 ref.get('problem') or ref.get('question') or ref.get('input') or '',
+                 str(ref.get('answer') or ref.get('target') or ref.get('output') or '').strip())
+                for pred, ref in zip(predictions, references)
+            ])
+        
         for i, (pred, ref) in enumerate(zip(predictions, references)):
             # Get ground truth information
             question = ref.get('problem') or ref.get('question') or ref.get('input') or ''
             gold_answer = str(ref.get('answer') or ref.get('target') or ref.get('output') or '').strip()
-            gold_solution = ref.get('solution') or ref.get('explanation') or ''
             
-            # Use LLM judgment directly (without extracting answer)
-            if self.use_llm_comparison and hasattr(self, 'extractor_llm') and self.extractor_llm:
-                is_correct = self._judge_answer_with_llm(pred, question, gold_answer, gold_solution)
+            if use_llm_judgment:
+                is_correct = judgments[i]
             else:
                 # Fallback: extract answer then compare
                 extracted_pred = self._extract_answer(pred)
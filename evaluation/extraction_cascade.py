@@ -0,0 +1,203 @@
+"""
+Rule-first answer extraction cascade.
+
+Tier 1 runs regex / rule extractors that return an answer together with a confidence score.
+Tier 2 (the LLM extractor or judge) is only called when the rule tier is missing or ambiguous.
+An optional audit mode re-checks a deterministic sample of rule hits with the LLM and records agreement.
+"""
+import hashlib
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import EXTRACTION_CASCADE_CONFIG
+
+_NUMBER = r'(?<![\d.,/])[+-]?\d[\d,]*(?:\.\d+)?(?![\d,]*\s*/)'
+# A stated answer must end the statement: "the answer is 2 + 3 = 5" or "the answer is 3:45" is not 2 / 3
+_STATEMENT_END = r'(?![\d.,]*\s*[-+*/×÷=:^])'
+
+# (pattern, confidence) for explicit final-answer statements, strongest first
+_EXPLICIT_NUMBER_PATTERNS = [
+    (re.compile(r'####\s*\$?\s*(' + _NUMBER + r')'), 0.95),
+    (re.compile(r'\\boxed\{\s*\\?\$?\s*(' + _NUMBER + r')\s*\}'), 0.95),
+    (re.compile(r'(?:final answer|the answer)\s*(?:is|:|=)\s*:?\s*\\?\$?\s*(' + _NUMBER + r')' + _STATEMENT_END, re.IGNORECASE), 0.9),
+    (re.compile(r'\banswer\s*:\s*\\?\$?\s*(' + _NUMBER + r')' + _STATEMENT_END, re.IGNORECASE), 0.9),
+]
+_ANY_NUMBER = re.compile(_NUMBER)
+_ONLY_NUMBER = re.compile(r'^\s*\\?\$?\s*(' + _NUMBER + r')\s*\.?\s*$')
+
+_EXPLICIT_CHOICE_PATTERNS = [
+    (re.compile(r'\\boxed\{\s*(?:\\text\{\s*)?\(?([A-Z])\)?\s*\}?\s*\}'), 0.95),
+    (re.compile(r'(?i:final answer|correct answer|the answer|answer)\s*(?i:is|:)\s*:?\s*(?i:option\s*)?\(?([A-Z])\)?(?![A-Za-z])'), 0.9),
+]
+_ONLY_CHOICE = re.compile(r'^\s*\(?([A-Z])\)?\s*\.?\s*$')
+
+# Confidence penalty when explicit statements disagree with each other
+_CONFLICT_PENALTY = 0.3
+
+
+def _clean_number(value: str) -> str:
+    """Drop thousands separators"""
+    return value.replace(',', '')
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(_clean_number(str(value).strip().replace('$', '')))
+    except (TypeError, ValueError):
+        return None
+
+
+def numbers_equal(a: Any, b: Any) -> Optional[bool]:
+    """Numeric equality with tolerance; None when either side is not a number"""
+    x, y = _to_float(a), _to_float(b)
+    if x is None or y is None:
+        return None
+    return abs(x - y) < 1e-6
+
+
+def rule_extract_number(prediction: str) -> Tuple[Optional[str], float]:
+    """
+    Extract the final numerical answer with a confidence score
+
+    >>> rule_extract_number("The answer is 42.")
+    ('42', 0.9)
+    >>> rule_extract_number("The answer is 2 + 3 = 5")
+    ('5', 0.4)
+    >>> rule_extract_number("so the answer is 3:45")
+    ('45', 0.4)
+    """
+    if not prediction:
+        return None, 0.0
+    text = prediction.replace('**', '')
+
+    only = _ONLY_NUMBER.match(text)
+    if only:
+        return _clean_number(only.group(1)), 0.95
+
+    for pattern, confidence in _EXPLICIT_NUMBER_PATTERNS:
+        matches = pattern.findall(text)
+        if matches:
+            values = {_to_float(m) for m in matches}
+            answer = _clean_number(matches[-1])
+            if len(values) > 1:
+                return answer, confidence - _CONFLICT_PENALTY
+            return answer, confidence
+
+    numbers = _ANY_NUMBER.findall(text)
+    if not numbers:
+        return None, 0.0
+    if len({_to_float(n) for n in numbers}) == 1:
+        return _clean_number(numbers[-1]), 0.8
+    # Last number of a multi-number response is a guess
+    return _clean_number(numbers[-1]), 0.4
+
+
+def rule_extract_choice(prediction: str, valid_letters: Optional[List[str]] = None) -> Tuple[Optional[str], float]:
+    """Extract the final option letter with a confidence score"""
+    if not prediction:
+        return None, 0.0
+    text = prediction.replace('**', '')
+    valid = set(letter.upper() for letter in valid_letters) if valid_letters else None
+
+    only = _ONLY_CHOICE.match(text)
+    if only and (valid is None or only.group(1) in valid):
+        return only.group(1), 0.95
+
+    for pattern, confidence in _EXPLICIT_CHOICE_PATTERNS:
+        matches = [m for m in pattern.findall(text) if valid is None or m in valid]
+        if matches:
+            if len(set(matches)) > 1:
+                return matches[-1], confidence - _CONFLICT_PENALTY
+            return matches[-1], confidence
+
+    return None, 0.0
+
+
+class ExtractionCascade:
+    """Runs the rule tier first and falls back to the LLM tier on low confidence, tracking per-tier hit rates."""
+
+    def __init__(self, confidence_threshold: float = 0.85, audit_rate: float = 0.0):
+        self.confidence_threshold = confidence_threshold
+        self.audit_rate = max(0.0, min(1.0, audit_rate))
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls) -> Optional["ExtractionCascade"]:
+        """Build from EXTRACTION_CASCADE_CONFIG, None when disabled"""
+        if not EXTRACTION_CASCADE_CONFIG.get("enabled", False):
+            return None
+        return cls(
+            confidence_threshold=EXTRACTION_CASCADE_CONFIG.get("confidence_threshold", 0.85),
+            audit_rate=EXTRACTION_CASCADE_CONFIG.get("audit_rate", 0.0)
+        )
+
+    def _count(self, name: str, key: str):
+        with self._lock:
+            counters = self.stats.setdefault(name, {'rule_hits': 0, 'llm_fallbacks': 0, 'audits': 0, 'audit_disagreements': 0})
+            counters[key] += 1
+
+    def _should_audit(self, prediction: str) -> bool:
+        """Deterministic sampling by content hash, independent of thread scheduling"""
+        if self.audit_rate <= 0.0:
+            return False
+        digest = hashlib.md5(prediction.encode('utf-8', errors='ignore')).hexdigest()
+        return int(digest[:8], 16) / 0xFFFFFFFF < self.audit_rate
+
+    def is_confident(self, rule_fn: Callable[[], Tuple[Any, float]]) -> bool:
+        """Whether the rule tier settles an item on its own (no statistics recorded)"""
+        try:
+            result, confidence = rule_fn()
+        except Exception:
+            return False
+        return result is not None and confidence >= self.confidence_threshold
+
+    def run(self, name: str, prediction: str,
+            rule_fn: Callable[[], Tuple[Any, float]],
+            llm_fn: Callable[[], Any],
+            agree_fn: Callable[[Any, Any], bool] = None) -> Any:
+        """
+        Return the rule result when its confidence clears the threshold, otherwise the LLM result.
+
+        Args:
+            name: Cascade name used for statistics (e.g. evaluator name)
+            rule_fn: () -> (result, confidence); result None means no rule answer
+            llm_fn: () -> result
+            agree_fn: (rule_result, llm_result) -> bool, used by audit mode
+        """
+        try:
+            result, confidence = rule_fn()
+        except Exception as e:
+            print(f"     Rule extraction failed, using LLM: {e}")
+            result, confidence = None, 0.0
+
+        if result is None or confidence < self.confidence_threshold:
+            self._count(name, 'llm_fallbacks')
+            return llm_fn()
+
+        self._count(name, 'rule_hits')
+        if self._should_audit(prediction):
+            llm_result = llm_fn()
+            agree = agree_fn(result, llm_result) if agree_fn else result == llm_result
+            self._count(name, 'audits')
+            if not agree:
+                self._count(name, 'audit_disagreements')
+                print(f"     Extraction audit disagreement ({name}): rule={result!r} llm={llm_result!r}")
+        return result
+
+    def format_stats(self) -> List[str]:
+        """Human-readable per-tier hit rates"""
+        lines = []
+        with self._lock:
+            for name, counters in sorted(self.stats.items()):
+                total = counters['rule_hits'] + counters['llm_fallbacks']
+                if total == 0:
+                    continue
+                line = (f"{name}: rule tier {counters['rule_hits']}/{total} "
+                        f"({counters['rule_hits'] / total * 100:.1f}%), LLM fallback {counters['llm_fallbacks']}/{total}")
+                if counters['audits']:
+                    agreement = 1 - counters['audit_disagreements'] / counters['audits']
+                    line += f", audit agreement {agreement * 100:.1f}% ({counters['audits']} audited)"
+                lines.append(line)
+        return lines
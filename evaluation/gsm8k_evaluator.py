@@ -1,6 +1,8 @@
 import re
 from typing import List, Dict, Any
 from .base_evaluator import BaseEvaluator
+from .batch_judge import judge_in_batches
+from ..config import LLM_JUDGE_BATCH_SIZE
 
 class GSM8KEvaluator(BaseEvaluator):
     """
@@ -54,6 +56,46 @@ Respond with only one word: YES or NO"""
             print(f"     LLM judgment error: {e}")
             return False
 
+    def _llm_judge_answers_batch(self, predictions: List[str], target_answers: List[str], llm=None,
+                                 batch_size: int = None) -> List[bool]:
+        """
+        Judge several (response, answer) pairs per LLM call, malformed entries are re-judged individually
+
+        Returns:
+            List[bool]: whether each response is correct, in input order
+        """
+        if batch_size is None:
+            batch_size = LLM_JUDGE_BATCH_SIZE.get(self.__class__.__name__, 1)
+        verdicts = [False] * len(predictions)
+        # Empty responses are wrong without asking the LLM
+        entries = [(i, p, t) for i, (p, t) in enumerate(zip(predictions, target_answers)) if p.strip()]
+        if not llm or not entries:
+            return verdicts
+
+        def build_prompt(chunk):
+            items_text = "\n\n".join(
+                f"### Item {n}\nSTUDENT'S RESPONSE:\n{prediction}\n\nCORRECT ANSWER: {target_answer}"
+                for n, (_, prediction, target_answer) in enumerate(chunk, 1)
+            )
+            return f"""You are a math teacher grading students' answers. Grade each numbered item independently.
+
+{items_text}
+
+For each item, is the student's final answer correct?
+- Ignore units, formatting differences (e.g., 56 = $56 = 56.0 = 56.00)
+- Focus on the final answer, not intermediate steps
+
+Respond with only a JSON object mapping every item number to YES or NO, e.g. {{"1": "YES", "2": "NO"}}"""
+
+        results = judge_in_batches(
+            entries, llm, batch_size, build_prompt,
+            single_judge=lambda entry: self._llm_judge_answer(entry[1], entry[2], llm),
+            positive="YES", negative="NO"
+        )
+        for (i, _, _), is_correct in zip(entries, results):
+            verdicts[i] = is_correct
+        return verdicts
+
     def evaluate(self, predictions: List[str], references: List[Dict[str, Any]], llm=None) -> Dict[str, Any]:
         """
         Evaluate prediction results - use LLM to directly judge correctness
@@ -71,16 +113,19 @@ Respond with only one word: YES or NO"""
 
         detailed_results = []
 
-        for i in range(min(len(predictions), len(eval_data))):
+        sample_count = min(len(predictions), len(eval_data))
+        target_answers = [self._get_target_answer(eval_data[i]) for i in range(sample_count)]
+        # Use LLM to directly judge correctness, several samples per call
+        if llm:
+            judgments = self._llm_judge_answers_batch(predictions[:sample_count], target_answers, llm)
+        else:
+            print(f"     Warning: No LLM provided, cannot evaluate answers")
+            judgments = [False] * sample_count
+
+        for i in range(sample_count):
             prediction = predictions[i]
-            target_answer = self._get_target_answer(eval_data[i])
-
-            # Use LLM to directly judge correctness
-            if llm:
-                is_correct = self._llm_judge_answer(prediction, target_answer, llm)
-            else:
-                print(f"     Warning: No LLM provided, cannot evaluate answers")
-                is_correct = False
+            target_answer = target_answers[i]
+            is_correct = judgments[i]
 
             if is_correct:
                 correct_count += 1
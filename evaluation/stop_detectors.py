@@ -0,0 +1,108 @@
+import re
+from typing import Callable, Dict, List, Optional
+
+# Each detector returns the last complete final answer found in a partial completion, or None.
+# A match needs a terminator after the answer (closing brace, newline, ". "), so "42" is not taken from "42.5".
+
+_THINK_OPEN = re.compile(r'[<＜](?:think|thinking|thought)[>＞]', re.IGNORECASE)
+_THINK_CLOSE = re.compile(r'[<＜]/(?:think|thinking|thought)[>＞]', re.IGNORECASE)
+
+
+def _last_boxed(text: str) -> Optional[str]:
+    """Content of the last closed \\boxed{...} (nested braces allowed)"""
+    start = text.rfind('\\boxed{')
+    while start != -1:
+        depth = 0
+        for i in range(start + len('\\boxed{') - 1, len(text)):
+            if text[i] == '{':
+                depth += 1
+            elif text[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    return text[start + len('\\boxed{'):i].strip()
+        # Last \boxed{ still open, fall back to an earlier closed one
+        start = text.rfind('\\boxed{', 0, start)
+    return None
+
+
+def _last_match(pattern: re.Pattern, text: str) -> Optional[str]:
+    answer = None
+    for match in pattern.finditer(text):
+        answer = match.group(1).strip()
+    return answer or None
+
+
+_ANSWER_IS = re.compile(
+    r'(?:the\s+)?(?:final\s+)?answer\s+is\s*:?\s*([^\n]{1,80}?)\s*(?:\n|\.\s)',
+    re.IGNORECASE
+)
+_HASHES = re.compile(r'####\s*([^\n]{1,40}?)\s*\n')
+_CHOICE = re.compile(
+    r'(?:answer|option|choice)\b[^\n(]{0,30}\(([A-Ea-e])\)[^\n]*\n',
+    re.IGNORECASE
+)
+
+DETECTORS: Dict[str, Callable[[str], Optional[str]]] = {
+    "boxed": _last_boxed,
+    "answer_is": lambda text: _last_match(_ANSWER_IS, text),
+    "hashes": lambda text: _last_match(_HASHES, text),
+    "choice": lambda text: _last_match(_CHOICE, text),
+}
+
+# Detectors per evaluator class (override in EARLY_STOP_CONFIG["detectors"])
+DEFAULT_EVALUATOR_DETECTORS = {
+    "GSM8KEvaluator": ["boxed", "hashes", "answer_is"],
+    "GSMHardEvaluator": ["boxed", "hashes", "answer_is"],
+    "MultiArithEvaluator": ["boxed", "hashes", "answer_is"],
+    "CompetitionMathEvaluator": ["boxed"],
+    "AIME2025Evaluator": ["boxed"],
+    "AQuAEvaluator": ["choice", "boxed", "answer_is"],
+    "MMLUEvaluator": ["choice", "boxed", "answer_is"],
+    "AccuracyEvaluator": ["choice", "boxed", "answer_is"],
+}
+
+
+class StopDetector:
+    """
+    Combination of named detectors applied to a streamed completion.
+    Text inside an unfinished think block is ignored, so reasoning models are not cut off mid-thought.
+    """
+
+    def __init__(self, names: List[str], grace_tokens: int = 8):
+        unknown = [name for name in names if name not in DETECTORS]
+        if unknown:
+            raise ValueError(f"Unknown stop detectors {unknown}, available: {list(DETECTORS)}")
+        self.names = list(names)
+        # Chunks the detected answer must stay unchanged before the stream is cancelled
+        self.grace_tokens = max(0, int(grace_tokens))
+
+    def __call__(self, text: str) -> Optional[str]:
+        """Final answer found so far in `text`, or None"""
+        if _THINK_OPEN.search(text):
+            closes = list(_THINK_CLOSE.finditer(text))
+            if not closes:
+                return None
+            text = text[closes[-1].end():]
+        for name in self.names:
+            answer = DETECTORS[name](text)
+            if answer is not None:
+                return answer
+        return None
+
+    def __str__(self) -> str:
+        # Stable identity for response-cache keys
+        return f"StopDetector({','.join(self.names)}, grace={self.grace_tokens})"
+
+    __repr__ = __str__
+
+
+def build_stop_detector(evaluator, config: Dict = None) -> Optional[StopDetector]:
+    """Stop detector for an evaluator, None when early stopping is disabled or the evaluator has none"""
+    config = config or {}
+    if not config.get("enabled", False) or evaluator is None:
+        return None
+    evaluator_name = evaluator.__class__.__name__
+    names = config.get("detectors", {}).get(evaluator_name, DEFAULT_EVALUATOR_DETECTORS.get(evaluator_name))
+    if not names:
+        return None
+    return StopDetector(names, grace_tokens=config.get("grace_tokens", 8))
@@ -3,9 +3,89 @@ Unified scoring mechanism - Use LLM for intelligent answer extraction
 """
 import re
 import logging
+import threading
 from typing import Dict, Any, List
-from ..llm_apis import BaseLLM
+from ..llm_apis import BaseLLM, is_failure
 from .aqua_evaluator import AQuAEvaluator
+from .extraction_cascade import ExtractionCascade, rule_extract_number, rule_extract_choice, numbers_equal
+from ..llm_apis.think_parser import ThinkStripper
+
+# Think-process stripping for prediction preprocessing (half-width tags only, broader end-of-think keywords)
+_THINK_STRIPPER = ThinkStripper(
+    line_keywords=['end think', 'think end', 'end thinking', 'thinking end',
+                   'now i will', 'let me', 'based on', 'therefore', 'so', 'according to'],
+    colon_chars=":：",
+    fullwidth_brackets=False,
+    leftmost_colon=True
+)
+
+def _normalize_for_comparison(ans) -> str:
+    """Numerical/choice standardization used for answer comparison"""
+    ans_str = str(ans).strip().upper().replace('(', '').replace(')', '')
+    ans_str = ans_str.replace(',', '')
+    
+    try:
+        if '.' in ans_str:
+            num = float(ans_str)
+            if num.is_integer():
+                return str(int(num))
+            else:
+                return str(num)
+        else:
+            num = int(ans_str)
+            return str(num)
+    except ValueError:
+        return ans_str
+
+
+class ScoringPlan:
+    """
+    Scoring plan compiled once per (evaluator, data split).
+    Target answer and task type of every item and the evaluator-specific extractor are resolved up front,
+    so scoring an item is a lookup plus the extraction itself.
+    """
+
+    def __init__(self, scorer: "UnifiedScorer", evaluator, items: List[Dict[str, Any]]):
+        self.scorer = scorer
+        self.evaluator = evaluator
+        self.items = items
+        self.extractor = scorer._get_extractor(evaluator)
+        self.target_answers = []
+        self.task_types = []
+        for item in items:
+            try:
+                target_answer = scorer._get_target_answer(item)
+                task_type = scorer._identify_task_type(item, target_answer, evaluator)
+            except Exception:
+                # Unresolvable item, scored through the regular path (which surfaces the error)
+                target_answer, task_type = None, None
+            self.target_answers.append(target_answer)
+            self.task_types.append(task_type)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def prejudge(self, scored: List[tuple]):
+        """
+        Batch the LLM judgments for (index, prediction) pairs ahead of score() calls,
+        for evaluators that judge correctness directly (GSM8K, CompetitionMath)
+        """
+        prejudge = getattr(self.extractor, 'prejudge', None)
+        if prejudge is None:
+            return
+        prejudge([
+            (prediction, self.items[index], self.target_answers[index])
+            for index, prediction in scored if self.task_types[index] is not None and not is_failure(prediction)
+        ])
+
+    def score(self, index: int, prediction: str) -> tuple:
+        """Score the prediction for item `index`, same result as UnifiedScorer.extract_and_score"""
+        if self.task_types[index] is None:
+            return self.scorer.extract_and_score(prediction, self.items[index], self.evaluator)
+        return self.scorer._score_with_extractor(
+            self.extractor, prediction, self.items[index], self.target_answers[index], self.task_types[index]
+        )
+
 
 class UnifiedScorer:
     """Unified answer extraction and scoring mechanism using LLM intelligent extraction"""
@@ -13,6 +93,17 @@ class UnifiedScorer:
     def __init__(self, llm: BaseLLM, dataset_name: str = ""):
         self.llm = llm
         self.dataset_name = dataset_name.lower()
+        # Resolved extractor per evaluator instance
+        self._extractors = {}
+        # Rule-first extraction cascade (None when disabled)
+        self.cascade = ExtractionCascade.from_config()
+        # Batched LLM verdicts waiting to be consumed: (evaluator id, prediction, target) -> bool
+        self._prejudged = {}
+        self._prejudged_lock = threading.Lock()
+    
+    def build_plan(self, items: List[Dict[str, Any]], evaluator) -> ScoringPlan:
+        """Compile a scoring plan for a data split"""
+        return ScoringPlan(self, evaluator, items)
     
     def extract_and_score(self, prediction: str, item: Dict[str, Any], evaluator) -> tuple:
         """
@@ -20,111 +111,282 @@ class UnifiedScorer:
         """
         target_answer = self._get_target_answer(item)
         task_type = self._identify_task_type(item, target_answer, evaluator)
-        
-        # Use specialized answer extraction method based on evaluator type
+        extractor = self._get_extractor(evaluator)
+        return self._score_with_extractor(extractor, prediction, item, target_answer, task_type)
+    
+    def _get_extractor(self, evaluator):
+        """Return the extractor for this evaluator, resolving the dispatch only once"""
+        key = id(evaluator)
+        if key not in self._extractors:
+            self._extractors[key] = self._resolve_extractor(evaluator)
+        return self._extractors[key]
+    
+    def _resolve_extractor(self, evaluator):
+        """
+        Select the answer extraction method based on evaluator type.
+
+        Returns a callable (prediction, item, target_answer, task_type) -> (extracted_answer, is_correct),
+        where is_correct is None unless the evaluator judges correctness directly.
+        """
         evaluator_name = evaluator.__class__.__name__
         
         if evaluator_name == "WebOfLiesEvaluator":
             # WebOfLies: Yes/No tasks
             if hasattr(evaluator, '_extract_yes_no_answer'):
-                original_question = item.get('input', item.get('question', ''))
-                extracted_answer = evaluator._extract_yes_no_answer(prediction, original_question)
+                def extractor(prediction, item, target_answer, task_type):
+                    original_question = item.get('input', item.get('question', ''))
+                    return evaluator._extract_yes_no_answer(prediction, original_question), None
             else:
-                extracted_answer = self._extract_yes_no_answer_regex(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_yes_no_answer_regex(prediction), None
                 
         elif evaluator_name == "AQuAEvaluator":
             # AQuA: Force use LLM intelligent answer extraction
             if hasattr(evaluator, '_llm_extract_choice_answer') and self.llm:
-                extracted_answer = evaluator._llm_extract_choice_answer(prediction, item, self.llm)
+                def llm_extractor(prediction, item, target_answer, task_type):
+                    return evaluator._llm_extract_choice_answer(prediction, item, self.llm), None
+                
+                def rule_extractor(prediction, item, target_answer, task_type):
+                    letters = [m.group(1) for m in (re.match(r'\s*\(?([A-Z])\)', opt) for opt in item.get('options', [])) if m]
+                    answer, confidence = rule_extract_choice(prediction, letters or None)
+                    return ((answer, None) if answer else None), confidence
+                
+                extractor = self._with_cascade(evaluator_name, rule_extractor, llm_extractor, self._same_extracted_answer)
             else:
                 # Fallback: use unified scorer LLM extraction
-                extracted_answer = self._extract_with_llm_only(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_with_llm_only(prediction), None
                 
         elif evaluator_name == "GSM8KEvaluator":
             # GSM8K: Use LLM to directly judge correctness
             if hasattr(evaluator, '_llm_judge_answer') and self.llm:
-                is_correct = evaluator._llm_judge_answer(prediction, target_answer, self.llm)
-                # Return judgment result directly, no need to extract answer
-                return "", target_answer, is_correct
+                def llm_extractor(prediction, item, target_answer, task_type):
+                    # Return judgment result directly, no need to extract answer
+                    judged = self._take_prejudged(evaluator, prediction, target_answer)
+                    if judged is None:
+                        judged = evaluator._llm_judge_answer(prediction, target_answer, self.llm)
+                    return "", judged
+                
+                def rule_extractor(prediction, item, target_answer, task_type):
+                    answer, confidence = rule_extract_number(prediction)
+                    is_correct = numbers_equal(answer, target_answer)
+                    if is_correct is None:
+                        return None, 0.0
+                    return (answer, is_correct), confidence
+                
+                extractor = self._with_cascade(evaluator_name, rule_extractor, llm_extractor, self._same_judgment)
+                
+                def judge_batch(entries):
+                    return evaluator._llm_judge_answers_batch(
+                        [prediction for prediction, _, _ in entries], [target for _, _, target in entries], self.llm
+                    )
+                
+                extractor.prejudge = self._make_prejudge(evaluator, rule_extractor, judge_batch)
             else:
                 # Fallback: use unified scorer LLM extraction
-                extracted_answer = self._extract_with_llm_only(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_with_llm_only(prediction), None
                 
         elif evaluator_name == "GSMHardEvaluator":
             # GSM-Hard: LLM intelligent numerical extraction
             if hasattr(evaluator, '_extract_final_answer'):
-                extracted_answer = evaluator._extract_final_answer(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return evaluator._extract_final_answer(prediction), None
             else:
-                extracted_answer = self._extract_math_answer_regex(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_math_answer_regex(prediction), None
                 
         elif evaluator_name == "MultiArithEvaluator":
             # MultiArith: Force use LLM intelligent numerical extraction (consistent with GSM8K)
             if hasattr(evaluator, '_llm_extract_numerical_answer') and self.llm:
-                extracted_answer = evaluator._llm_extract_numerical_answer(prediction, self.llm)
+                def llm_extractor(prediction, item, target_answer, task_type):
+                    return evaluator._llm_extract_numerical_answer(prediction, self.llm), None
+                
+                def rule_extractor(prediction, item, target_answer, task_type):
+                    answer, confidence = rule_extract_number(prediction)
+                    return ((answer, None) if answer else None), confidence
+                
+                extractor = self._with_cascade(evaluator_name, rule_extractor, llm_extractor, self._same_extracted_answer)
             else:
-                # Fallback: use unified scorer LLM extraction
-                extracted_answer = self._extract_with_llm_only(prediction)
-                if not extracted_answer:
-                    # Final fallback: use regular expression
-                    numeric_answer = evaluator._extract_numerical_answer(prediction) if hasattr(evaluator, '_extract_numerical_answer') else None
-                    extracted_answer = str(numeric_answer) if numeric_answer is not None else ""
+                def extractor(prediction, item, target_answer, task_type):
+                    # Fallback: use unified scorer LLM extraction
+                    extracted_answer = self._extract_with_llm_only(prediction)
+                    if not extracted_answer:
+                        # Final fallback: use regular expression
+                        numeric_answer = evaluator._extract_numerical_answer(prediction) if hasattr(evaluator, '_extract_numerical_answer') else None
+                        extracted_answer = str(numeric_answer) if numeric_answer is not None else ""
+                    return extracted_answer, None
                 
         elif evaluator_name == "AIME2025Evaluator":
             # AIME2025: Numerical answer extraction + LLM intelligent extraction
             if hasattr(evaluator, '_extract_final_answer'):
-                extracted_answer = evaluator._extract_final_answer(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return evaluator._extract_final_answer(prediction), None
             else:
                 # Backup: Use LLM intelligent numerical extraction
-                extracted_answer = self._extract_aime_answer_with_llm(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_aime_answer_with_llm(prediction), None
                 
         elif evaluator_name == "CompetitionMathEvaluator":
+            # Display extraction for CompetitionMath
+            if hasattr(evaluator, '_extract_answer'):
+                extract_for_display = evaluator._extract_answer
+            else:
+                extract_for_display = self._extract_with_llm_only
+            
             # CompetitionMath: Directly use LLM to judge, do not extract answer
             if hasattr(evaluator, '_judge_answer_with_llm') and hasattr(evaluator, 'extractor_llm') and evaluator.extractor_llm:
-                # Use new direct judgment method
-                question = item.get('problem') or item.get('question') or item.get('input') or ''
-                gold_answer = self._get_target_answer(item)
-                gold_solution = item.get('solution') or item.get('explanation') or ''
-                is_correct = evaluator._judge_answer_with_llm(prediction, question, gold_answer, gold_solution)
-                # Still extract answer for display, but use LLM judgment for result
-                if hasattr(evaluator, '_extract_answer'):
-                    extracted_answer = evaluator._extract_answer(prediction)
-                else:
-                    extracted_answer = self._extract_with_llm_only(prediction)
-                # Return extracted answer, target answer and LLM judgment result
-                return extracted_answer, gold_answer, is_correct
+                def llm_extractor(prediction, item, target_answer, task_type):
+                    question = item.get('problem') or item.get('question') or item.get('input') or ''
+                    gold_solution = item.get('solution') or item.get('explanation') or ''
+                    is_correct = self._take_prejudged(evaluator, prediction, target_answer)
+                    if is_correct is None:
+                        is_correct = evaluator._judge_answer_with_llm(prediction, question, target_answer, gold_solution)
+                    # Still extract answer for display, but use LLM judgment for result
+                    return extract_for_display(prediction), is_correct
+                
+                def rule_extractor(prediction, item, target_answer, task_type):
+                    return self._rule_judge_boxed_answer(evaluator, prediction, target_answer)
+                
+                extractor = self._with_cascade(evaluator_name, rule_extractor, llm_extractor, self._same_judgment)
+                
+                def judge_batch(entries):
+                    return evaluator._judge_answers_with_llm_batch([
+                        (prediction, item.get('problem') or item.get('question') or item.get('input') or '', target)
+                        for prediction, item, target in entries
+                    ])
+                
+                extractor.prejudge = self._make_prejudge(evaluator, rule_extractor, judge_batch)
             else:
                 # Fallback: extract answer
-                if hasattr(evaluator, '_extract_answer'):
-                    extracted_answer = evaluator._extract_answer(prediction)
-                else:
-                    extracted_answer = self._extract_with_llm_only(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return extract_for_display(prediction), None
                 
         elif evaluator_name in ["MMLUEvaluator", "AccuracyEvaluator"]:
             # MMLU/Accuracy: Intelligent context extraction
             if hasattr(evaluator, '_extract_answer_with_context'):
-                extracted_answer = evaluator._extract_answer_with_context(prediction, item)
+                def extractor(prediction, item, target_answer, task_type):
+                    return evaluator._extract_answer_with_context(prediction, item), None
             elif hasattr(evaluator, '_extract_answer'):
-                extracted_answer = evaluator._extract_answer(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return evaluator._extract_answer(prediction), None
             else:
-                extracted_answer = self._extract_with_llm_only(prediction)
+                def extractor(prediction, item, target_answer, task_type):
+                    return self._extract_with_llm_only(prediction), None
         
         elif evaluator_name == "SquadV2Evaluator":
             # SQuAD 2.0: Extractive QA, need to extract text spans or identify unanswerable
-            extracted_answer = self._extract_squad_answer(prediction)
+            def extractor(prediction, item, target_answer, task_type):
+                return self._extract_squad_answer(prediction), None
                 
         else:
             # Default processing: select method based on task type
-            if task_type == "yes_no":
-                extracted_answer = self._extract_yes_no_answer_regex(prediction)
-            elif task_type == "math":
-                extracted_answer = self._extract_math_answer_regex(prediction)
-            elif task_type == "multiple_choice":
-                extracted_answer = self._extract_choice_answer_regex(prediction)
-            else:
+            def extractor(prediction, item, target_answer, task_type):
+                if task_type == "yes_no":
+                    return self._extract_yes_no_answer_regex(prediction), None
+                elif task_type == "math":
+                    return self._extract_math_answer_regex(prediction), None
+                elif task_type == "multiple_choice":
+                    return self._extract_choice_answer_regex(prediction), None
                 # General LLM extraction
                 extracted_answer = self._extract_with_llm_only(prediction)
                 if not extracted_answer:
                     extracted_answer = self._fallback_extraction(prediction, task_type)
+                return extracted_answer, None
+        
+        return extractor
+    
+    def _with_cascade(self, name: str, rule_extractor, llm_extractor, agree_fn):
+        """Put the rule tier in front of an LLM extractor; the LLM runs only when the rule tier is ambiguous"""
+        if self.cascade is None:
+            return llm_extractor
+        cascade = self.cascade
+        
+        def extractor(prediction, item, target_answer, task_type):
+            return cascade.run(
+                name, prediction or "",
+                lambda: rule_extractor(prediction or "", item, target_answer, task_type),
+                lambda: llm_extractor(prediction, item, target_answer, task_type),
+                agree_fn
+            )
+        return extractor
+    
+    def _make_prejudge(self, evaluator, rule_extractor, judge_batch):
+        """
+        Build a prejudge(entries) hook for judge-style extractors. Entries the rule tier cannot settle are
+        judged with one batched LLM call per chunk; verdicts are picked up by the extractor's LLM tier.
+        """
+        def prejudge(entries):
+            pending, seen = [], set()
+            for prediction, item, target_answer in entries:
+                key = (id(evaluator), prediction, str(target_answer))
+                if not prediction or not prediction.strip() or key in seen:
+                    continue
+                if self.cascade is not None and self.cascade.is_confident(
+                        lambda: rule_extractor(prediction, item, target_answer, None)):
+                    continue
+                seen.add(key)
+                pending.append((prediction, item, target_answer))
+            if len(pending) < 2:
+                return
+            try:
+                verdicts = judge_batch(pending)
+            except Exception as e:
+                print(f"     Batched judgment failed, items will be judged individually: {e}")
+                return
+            with self._prejudged_lock:
+                for (prediction, _, target_answer), verdict in zip(pending, verdicts):
+                    self._prejudged[(id(evaluator), prediction, str(target_answer))] = verdict
+        return prejudge
+    
+    def _take_prejudged(self, evaluator, prediction: str, target_answer) -> bool:
+        """Pop a batched verdict, None when the item was not prejudged"""
+        with self._prejudged_lock:
+            return self._prejudged.pop((id(evaluator), prediction, str(target_answer)), None)
+    
+    @staticmethod
+    def _same_judgment(rule_result: tuple, llm_result: tuple) -> bool:
+        """Audit agreement for judge-style extractors"""
+        return bool(rule_result[1]) == bool(llm_result[1])
+    
+    @staticmethod
+    def _same_extracted_answer(rule_result: tuple, llm_result: tuple) -> bool:
+        """Audit agreement for extract-then-compare extractors"""
+        return _normalize_for_comparison(rule_result[0]) == _normalize_for_comparison(llm_result[0])
+    
+    def _rule_judge_boxed_answer(self, evaluator, prediction: str, target_answer: str) -> tuple:
+        """Judge a CompetitionMath response by its \\boxed{} answer; ((answer, is_correct), confidence)"""
+        boxed_answers = []
+        start = prediction.find('\\boxed{')
+        while start != -1:
+            content = evaluator._extract_boxed_answer(prediction[start:])
+            if content:
+                boxed_answers.append(content.strip())
+            start = prediction.find('\\boxed{', start + 1)
+        if not boxed_answers:
+            return None, 0.0
+        
+        answer = boxed_answers[-1]
+        norm_answer = evaluator._normalize_answer(answer)
+        confidence = 0.95 if len({evaluator._normalize_answer(a) for a in boxed_answers}) == 1 else 0.5
+        if norm_answer and norm_answer == evaluator._normalize_answer(str(target_answer)):
+            return (answer, True), confidence
+        if numbers_equal(norm_answer, evaluator._normalize_answer(str(target_answer))) is False:
+            # Both plain numbers and different; equivalent symbolic forms are left to the LLM judge
+            return (answer, False), confidence - 0.05
+        return None, 0.0
+    
+    def get_cascade_stats(self) -> List[str]:
+        """Per-tier hit rates of the extraction cascade"""
+        return self.cascade.format_stats() if self.cascade else []
+    
+    def _score_with_extractor(self, extractor, prediction: str, item: Dict[str, Any],
+                              target_answer: str, task_type: str) -> tuple:
+        """Run a resolved extractor and compare against the target answer"""
+        extracted_answer, judged_correct = extractor(prediction, item, target_answer, task_type)
+        if judged_correct is not None:
+            # Evaluator judged correctness directly
+            return extracted_answer, target_answer, judged_correct
         
         # Standardized comparison
         if task_type == "yes_no":
@@ -133,25 +395,8 @@ class UnifiedScorer:
             norm_target = str(target_answer).strip().upper()
         else:
             # Other tasks: numerical/choice standardization
-            def normalize_for_comparison(ans):
-                ans_str = str(ans).strip().upper().replace('(', '').replace(')', '')
-                ans_str = ans_str.replace(',', '')
-                
-                try:
-                    if '.' in ans_str:
-                        num = float(ans_str)
-                        if num.is_integer():
-                            return str(int(num))
-                        else:
-                            return str(num)
-                    else:
-                        num = int(ans_str)
-                        return str(num)
-                except ValueError:
-                    return ans_str
-            
-            norm_extracted = normalize_for_comparison(extracted_answer)
-            norm_target = normalize_for_comparison(target_answer)
+            norm_extracted = _normalize_for_comparison(extracted_answer)
+            norm_target = _normalize_for_comparison(target_answer)
         
         is_correct = (norm_extracted == norm_target)
         
@@ -909,10 +1154,8 @@ Answer:"""
     def _preprocess_qwen3_output(self, prediction: str) -> str:
         """
         Preprocess Qwen3 architect model output, extract content after think process
-        This method is consistent with _extract_content_after_think method in GPT_API
+        This method is consistent with _extract_content_after_think method in GPT_API (same ThinkStripper rules)
         """
-        import re
-        
         # Check if think process markers are included
         think_indicators = ['<think>', '<thinking>', '<thought>', 'think:', 'thinking:', 'thinking:']
         has_think_process = any(indicator.lower() in prediction.lower() for indicator in think_indicators)
@@ -920,74 +1163,10 @@ Answer:"""
         if not has_think_process:
             return prediction  # If no think process, return original content directly
         
-        # Method 1: Extract content after <think>...</think> tags
-        think_patterns = [
-            r'<think>.*?</think>\s*(.*?)$',  # <think>...</think>
-            r'<thinking>.*?</thinking>\s*(.*?)$',  # <thinking>...</thinking>
-            r'<thought>.*?</thought>\s*(.*?)$',  # <thought>...</thought>
-        ]
-
-        for pattern in think_patterns:
-            match = re.search(pattern, prediction, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:  # Ensure extracted content is not empty
-                    logging.info(" Successfully extracted content after think from Qwen3 output")
-                    return extracted
-        
-        # Method 2: Find content after "Think:" or "Thinking:"
-        think_start_patterns = [
-            r'(?:Think|Thinking)[:：]\s*(.*?)$',  # Think: or Thinking:
-            r'(?:Thinking|Thinking)[:：]\s*(.*?)$',  # Thinking: or Thinking:
-        ]
-
-        for pattern in think_start_patterns:
-            match = re.search(pattern, prediction, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:
-                    logging.info(" Successfully extracted content after think from Qwen3 output")
-                    return extracted
-        
-        # Method 3: Find content after think process ends
-        think_end_markers = [
-            r'</think>\s*(.*?)$',
-            r'</thinking>\s*(.*?)$',
-            r'</thought>\s*(.*?)$',
-            r'(?:end\s+think|think\s+end|end\s+thinking)\s*(.*?)$',
-        ]
-
-        for pattern in think_end_markers:
-            match = re.search(pattern, prediction, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:
-                    logging.info(" Successfully extracted content after think from Qwen3 output")
-                    return extracted
-        
-        # Method 4: Smart segmentation - find think process end position
-        lines = prediction.split('\n')
-        think_end_line = -1
-
-        # Find possible think process end lines
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-            # Look for think process end indicator words
-            if any(end_word in line_lower for end_word in [
-                'end think', 'think end', 'end thinking', 'thinking end',
-                'now i will', 'let me', 'based on', 'therefore',
-                'so', 'therefore', 'based on', 'according to'
-            ]):
-                think_end_line = i
-                break
-
-        # If think end line found, extract content after it
-        if think_end_line >= 0 and think_end_line < len(lines) - 1:
-            remaining_lines = lines[think_end_line + 1:]
-            remaining_content = '\n'.join(remaining_lines).strip()
-            if remaining_content:
-                logging.info(" Successfully extracted content after think from Qwen3 output")
-                return remaining_content
+        extracted = _THINK_STRIPPER.extract(prediction)
+        if extracted is not None:
+            logging.info(" Successfully extracted content after think from Qwen3 output")
+            return extracted
 
         # If all methods fail, log warning and return original content
         logging.warning(" Unable to extract content after think from Qwen3 output, using original content")
@@ -1049,6 +1228,7 @@ def evaluate_with_unified_scoring(
     Unified scoring function - use LLM for intelligent answer extraction
     """
     scorer = UnifiedScorer(llm, dataset_name)
+    plan = scorer.build_plan(eval_data, evaluator)
     
     correct_count = 0
     detailed_results = []
@@ -1058,11 +1238,7 @@ def evaluate_with_unified_scoring(
         print(f" Sample count: {len(predictions)}")
     
     for i, (prediction, item) in enumerate(zip(predictions, eval_data)):
-        extracted_answer, target_answer, is_correct = scorer.extract_and_score(
-            prediction=prediction,
-            item=item,
-            evaluator=evaluator
-        )
+        extracted_answer, target_answer, is_correct = plan.score(i, prediction)
         
         if is_correct:
             correct_count += 1
@@ -1078,7 +1254,7 @@ def evaluate_with_unified_scoring(
         # Modified: Only show details when verbose=True
         if verbose and i < 10:  # Only show first 10 samples to avoid excessive output
             # Modified: Choose appropriate normalization method based on task type
-            task_type = scorer._identify_task_type(item, target_answer, evaluator)
+            task_type = plan.task_types[i]
             if task_type == "yes_no":
                 normalized_extracted = extracted_answer.lower() if extracted_answer else ""
                 normalized_target = target_answer.lower() if target_answer else ""
@@ -1,58 +1,177 @@
-from .gpt_api import GPT_API
-from .google_api import Google_API
-from .llama_api import Llama_API
 from .base_api import BaseLLM
-from ..config import MODELS, API_KEYS, API_BASE_URLS
+from .registry import get_client_registry
+from .resilience import LLMFailure, is_failure
+from .rate_limiter import get_rate_limiter
+from .hedging import get_hedge_policy
+from .load_balancer import ReplicaPool, get_replica_pool
+from .prompt_layout import PrefixedPrompt
+from ..config import MODELS, API_KEYS, API_BASE_URLS, RATE_LIMITS, HEDGING_CONFIG, REPLICA_BALANCER_CONFIG
+from typing import Any, Callable, Dict
+import importlib
+import sys
 
-def get_llm(model_id: str) -> BaseLLM:
+# Provider modules are imported on first use, so OpenAI-only runs never import torch/transformers
+# or google-generativeai. Names stay importable as `from llm_apis import GPT_API` via __getattr__.
+_LAZY_EXPORTS = {
+    "GPT_API": ".gpt_api",
+    "Google_API": ".google_api",
+    "Llama_API": ".llama_api",
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+# Provider plugin registry: provider name -> factory(model_id, model_config, model_kwargs) -> BaseLLM
+_PROVIDERS: Dict[str, Callable[[str, Dict[str, Any], Dict[str, Any]], BaseLLM]] = {}
+
+def register_provider(name: str, factory: Callable = None):
+    """
+    Register an LLM provider under the `provider` name used in MODELS.
+    Usable directly or as a decorator; factories should import their heavy dependencies lazily.
+    """
+    def _register(fn):
+        _PROVIDERS[name] = fn
+        return fn
+    return _register(factory) if factory is not None else _register
+
+def get_llm(model_id: str, call_site: str = None) -> BaseLLM:
     """
     Factory function to get an LLM API wrapper instance.
+    Wrappers are lightweight; the HTTP connection pool (per endpoint) and local model weights
+    are shared process-wide through the client registry.
 
     Args:
         model_id (str): Model identifier from configuration file (e.g., "architect", "worker").
+        call_site (str): Label for per-call-site token statistics (defaults to the calling module).
 
     Returns:
         BaseLLM: Instance of the corresponding LLM wrapper.
     """
+    if call_site is None:
+        call_site = sys._getframe(1).f_globals.get("__name__", "unknown")
+    llm = _create_llm(model_id)
+    llm.role = model_id
+    llm.call_site = call_site
+    return llm
+
+def _api_base_ids(model_config: Dict[str, Any]) -> list:
+    """Endpoint keys of a model: `api_base_id` is a single key or a list of replica keys"""
+    api_base_id = model_config.get("api_base_id")
+    if not api_base_id:
+        return []
+    return list(api_base_id) if isinstance(api_base_id, (list, tuple)) else [api_base_id]
+
+def _endpoint_pool_size(api_base_id: str) -> int:
+    """Connections for a shared endpoint pool: enough for every role on it to run at full concurrency"""
+    return sum(
+        int(config.get("max_concurrency", 16)) for config in MODELS.values()
+        if config.get("provider") == "openai" and api_base_id in _api_base_ids(config)
+    ) or 16
+
+# MODELS keys that configure the wrapper itself; every other key is passed to the provider as a generation kwarg
+_NON_GENERATION_KEYS = {
+    "provider", "model_name", "api_base_id", "api_key", "max_concurrency",
+    "prompt_layout", "prefix_warmup", "batching", "prefix_cache", "device", "cpu",
+}
+
+def _create_llm(model_id: str) -> BaseLLM:
+    """Build the provider wrapper for a model id"""
     if model_id not in MODELS:
         raise ValueError(f"Model ID '{model_id}' not found in config.py.")
 
     model_config = MODELS[model_id]
     provider = model_config.get("provider")
-    model_name = model_config.get("model_name")
-    
-    model_kwargs = {
-        k: v for k, v in model_config.items()
-        if k not in ["provider", "model_name", "api_base_id", "api_key"] # Add "api_key" here
-    }
-
-    if provider == "openai":
-        # Prefer api_key identifier from model config, then look up from API_KEYS dict
-        api_key_id = model_config.get("api_key")
-        api_key = API_KEYS.get(api_key_id) if api_key_id else API_KEYS.get("openai")
-
-        if not api_key or "YOUR" in api_key:
-            print("Warning: OpenAI API key not set. This may be normal for local services like vLLM.")
-            api_key = "N/A"
-        
-        api_base_id = model_config.get("api_base_id")
-        api_base_url = API_BASE_URLS.get(api_base_id) if api_base_id else None
-        
-        return GPT_API(
-            model_name=model_name, 
-            api_key=api_key, 
-            api_base=api_base_url, 
+
+    model_kwargs = {k: v for k, v in model_config.items() if k not in _NON_GENERATION_KEYS}
+
+    factory = _PROVIDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"Provider '{provider}' (model '{model_id}') is not supported.")
+    return factory(model_id, model_config, model_kwargs)
+
+@register_provider("openai")
+def _create_openai(model_id: str, model_config: Dict[str, Any], model_kwargs: Dict[str, Any]) -> BaseLLM:
+    from .gpt_api import GPT_API, build_replicas
+
+    # Prefer api_key identifier from model config, then look up from API_KEYS dict
+    api_key_id = model_config.get("api_key")
+    api_key = API_KEYS.get(api_key_id) if api_key_id else API_KEYS.get("openai")
+
+    if not api_key or "YOUR" in api_key:
+        print("Warning: OpenAI API key not set. This may be normal for local services like vLLM.")
+        api_key = "N/A"
+
+    registry = get_client_registry()
+    api_base_ids = _api_base_ids(model_config)
+    if len(api_base_ids) > 1:
+        # Replicas of the same model: GPT_API balances requests across them. The pool (outstanding requests,
+        # latencies, ejections) is shared by every wrapper of the model, each replica has its endpoint's rate limiter
+        def build_pool():
+            replica_endpoints = []
+            for replica_id in api_base_ids:
+                if replica_id not in API_BASE_URLS:
+                    raise ValueError(f"Replica endpoint '{replica_id}' (model '{model_id}') not found in API_BASE_URLS.")
+                replica_url = API_BASE_URLS[replica_id]
+                replica_endpoints.append((
+                    replica_id, replica_url,
+                    registry.get_http_client(replica_url, api_key, _endpoint_pool_size(replica_id))
+                ))
+            rate_limiters = {replica_id: get_rate_limiter(replica_id, RATE_LIMITS.get(replica_id)) for replica_id in api_base_ids}
+            return ReplicaPool(build_replicas(api_key, replica_endpoints, rate_limiters=rate_limiters), **REPLICA_BALANCER_CONFIG)
+
+        llm = GPT_API(
+            model_name=model_config.get("model_name"),
+            api_key=api_key,
+            max_concurrency=model_config.get("max_concurrency", 16),
+            replica_pool=get_replica_pool(model_id, build_pool),
+            prompt_layout=model_config.get("prompt_layout", "inline"),
+            prefix_warmup=model_config.get("prefix_warmup", False),
             **model_kwargs
         )
-    
-    elif provider == "google":
-        api_key = API_KEYS.get("google")
-        if not api_key or "YOUR" in api_key:
-            raise ValueError("Google API key not set in config.py.")
-        return Google_API(model_name=model_name, api_key=api_key, **model_kwargs)
-
-    elif provider == "llama_local":
-        return Llama_API(model_name=model_name, api_key=None, **model_kwargs)
-
-    else:
-        raise ValueError(f"Provider '{provider}' (model '{model_id}') is not supported.")
\ No newline at end of file
+        llm.hedge_policy = get_hedge_policy(model_id, HEDGING_CONFIG)
+        return llm
+
+    api_base_id = api_base_ids[0] if api_base_ids else None
+    api_base_url = API_BASE_URLS.get(api_base_id) if api_base_id else None
+
+    llm = GPT_API(
+        model_name=model_config.get("model_name"),
+        api_key=api_key,
+        api_base=api_base_url,
+        max_concurrency=model_config.get("max_concurrency", 16),
+        prompt_layout=model_config.get("prompt_layout", "inline"),
+        prefix_warmup=model_config.get("prefix_warmup", False),
+        http_client=registry.get_http_client(api_base_url, api_key, _endpoint_pool_size(api_base_id)),
+        **model_kwargs
+    )
+    llm.rate_limiter = get_rate_limiter(api_base_id, RATE_LIMITS.get(api_base_id))
+    llm.hedge_policy = get_hedge_policy(model_id, HEDGING_CONFIG)
+    return llm
+
+@register_provider("google")
+def _create_google(model_id: str, model_config: Dict[str, Any], model_kwargs: Dict[str, Any]) -> BaseLLM:
+    from .google_api import Google_API
+
+    api_key = API_KEYS.get("google")
+    if not api_key or "YOUR" in api_key:
+        raise ValueError("Google API key not set in config.py.")
+    return Google_API(model_name=model_config.get("model_name"), api_key=api_key, **model_kwargs)
+
+@register_provider("llama_local")
+def _create_llama_local(model_id: str, model_config: Dict[str, Any], model_kwargs: Dict[str, Any]) -> BaseLLM:
+    first_torch_import = "torch" not in sys.modules
+    from .llama_api import Llama_API
+    if first_torch_import:
+        # torch was not loaded when the run seeded its RNGs, seed it now
+        import torch
+        from ..config import DATA_SPLIT_CONFIG
+        torch.manual_seed(DATA_SPLIT_CONFIG['random_seed'])
+        if torch.cuda.is_available():
+            torch.cuda.manual_seed_all(DATA_SPLIT_CONFIG['random_seed'])
+
+    return Llama_API(model_name=model_config.get("model_name"), api_key=None,
+                     batching=model_config.get("batching"), prefix_cache=model_config.get("prefix_cache"),
+                     device=model_config.get("device", "auto"), cpu=model_config.get("cpu"), **model_kwargs)
@@ -1,5 +1,26 @@
+import asyncio
+import functools
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from .response_cache import ResponseCache, get_response_cache
+from .registry import get_client_registry
+from .resilience import is_failure
+from ..config import RESPONSE_CACHE_CONFIG
+
+
+def _with_response_cache(generate_fn):
+    """Wrap a provider `generate` so identical requests are served from the response cache"""
+    @functools.wraps(generate_fn)
+    def wrapper(self, prompt: str, **kwargs) -> str:
+        cache_key, cached = self._cache_lookup(prompt, kwargs)
+        if cached is not None:
+            return cached
+        response = generate_fn(self, prompt, **kwargs)
+        self._cache_store(cache_key, response)
+        return response
+    return wrapper
+
 
 class BaseLLM(ABC):
     """
@@ -7,6 +28,17 @@ class BaseLLM(ABC):
     Provides a unified interface for calling different LLM providers.
     """
 
+    # Whether generate accepts `stop_detector` (streamed completion with early stop)
+    supports_stop_detector = False
+    # Whether generate accepts `length_profiler` (adaptive max_tokens budget)
+    supports_length_profiler = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Transparently put the response cache in front of every provider's generate
+        if "generate" in cls.__dict__ and not getattr(cls.__dict__["generate"], "__isabstractmethod__", False):
+            cls.generate = _with_response_cache(cls.__dict__["generate"])
+
     def __init__(self, model_name: str, api_key: str, **kwargs):
         """
         Initialize the LLM API wrapper.
@@ -24,6 +56,25 @@ class BaseLLM(ABC):
         self.prompt_tokens = 0
         self.completion_tokens = 0
         self.api_calls = 0
+        # Guards token counters when generate is called from multiple threads
+        self._stats_lock = threading.Lock()
+        # Set by get_llm: usage is also aggregated per (role, call site) in the client registry
+        self.role = None
+        self.call_site = None
+        # Client-side RPM/TPM limiter shared per api_base_id (set by get_llm when RATE_LIMITS has an entry)
+        self.rate_limiter = None
+        # Response cache statistics
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_cache = None
+        if RESPONSE_CACHE_CONFIG.get("enabled", False):
+            try:
+                self.response_cache = get_response_cache(
+                    RESPONSE_CACHE_CONFIG.get("path", "cache/llm_responses.sqlite"),
+                    RESPONSE_CACHE_CONFIG.get("max_entries", 200000)
+                )
+            except Exception as e:
+                print(f"Warning: Response cache disabled, could not open it: {e}")
 
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
@@ -39,32 +90,140 @@ class BaseLLM(ABC):
         """
         pass
 
-    def batch_generate(self, prompts: List[str], **kwargs) -> List[str]:
+    def batch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
         """
         Generate text completions for a batch of prompts.
         Subclasses should implement this method if the provider supports efficient batching.
-        Otherwise, it defaults to iteratively calling `generate`.
+        Otherwise, it defaults to iteratively calling `generate` (`max_concurrency` is ignored).
         """
         return [self.generate(prompt, **kwargs) for prompt in prompts]
 
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Async version of `generate`.
+        Defaults to running the blocking `generate` in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    async def abatch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
+        """
+        Async version of `batch_generate`, results keep the order of `prompts`.
+        """
+        return list(await asyncio.gather(*[self.agenerate(prompt, **kwargs) for prompt in prompts]))
+
     def __call__(self, prompt: str, **kwargs) -> str:
         """
         Allow calling the object as a function.
         """
         return self.generate(prompt, **kwargs)
 
+    def _record_usage(self, prompt_tokens: int = 0, completion_tokens: int = 0, total_tokens: int = 0):
+        """Record one API call and its token usage (thread-safe)"""
+        with self._stats_lock:
+            self.api_calls += 1
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+            self.total_tokens += total_tokens or 0
+        if self.role is not None:
+            get_client_registry().record_usage(self.role, self.call_site, prompt_tokens, completion_tokens, total_tokens)
+
+    def _rate_limited_call(self, call, prompt: str, request_kwargs: Dict[str, Any], rate_limiter=None):
+        """
+        Run one API request within the endpoint's RPM/TPM budget, then correct the budget with the reported usage.
+        `rate_limiter` overrides self.rate_limiter (e.g. the limiter of the replica serving the request).
+        """
+        if rate_limiter is None:
+            rate_limiter = self.rate_limiter
+        if rate_limiter is None:
+            return call()
+        estimated = rate_limiter.estimate(prompt, request_kwargs.get("max_tokens"))
+        rate_limiter.acquire(estimated)
+        try:
+            response = call()
+        except Exception:
+            rate_limiter.settle(estimated)
+            raise
+        self._settle_rate_limit(estimated, response, rate_limiter)
+        return response
+
+    async def _arate_limited_call(self, call, prompt: str, request_kwargs: Dict[str, Any]):
+        """Async version of _rate_limited_call, `call` returns an awaitable"""
+        if self.rate_limiter is None:
+            return await call()
+        estimated = self.rate_limiter.estimate(prompt, request_kwargs.get("max_tokens"))
+        await self.rate_limiter.aacquire(estimated)
+        try:
+            response = await call()
+        except Exception:
+            self.rate_limiter.settle(estimated)
+            raise
+        self._settle_rate_limit(estimated, response, self.rate_limiter)
+        return response
+
+    @staticmethod
+    def _settle_rate_limit(estimated: int, response, rate_limiter):
+        usage = getattr(response, "usage", None)
+        if usage:
+            rate_limiter.settle(estimated, usage.total_tokens, usage.completion_tokens)
+        else:
+            rate_limiter.settle(estimated, estimated)
+
+    def _cache_lookup(self, prompt: str, kwargs: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a request in the response cache.
+        Pops the per-call `use_cache` switch from kwargs. Returns (cache_key, cached_response);
+        cache_key is None when the request must bypass the cache.
+        """
+        use_cache = kwargs.pop("use_cache", True)
+        if self.response_cache is None or not use_cache:
+            return None, None
+
+        request_kwargs = {**self.model_kwargs, **kwargs}
+        # Sampled calls are not reproducible, bypass unless explicitly enabled
+        if (request_kwargs.get("temperature") or 0) > 0 and not RESPONSE_CACHE_CONFIG.get("cache_sampled_calls", False):
+            return None, None
+
+        cache_key = ResponseCache.make_key(self.model_name, request_kwargs, self._cache_prompt_text(prompt),
+                                           endpoint=self._cache_endpoint())
+        cached = self.response_cache.get(cache_key)
+        with self._stats_lock:
+            if cached is not None:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        return cache_key, cached
+
+    def _cache_prompt_text(self, prompt: str) -> str:
+        """Prompt text used in the cache key; providers override it when the request also depends on other settings"""
+        return prompt
+
+    def _cache_endpoint(self) -> Any:
+        """Endpoint serving the requests, so the same model name on different servers is cached apart"""
+        return None
+
+    def _cache_store(self, cache_key: Optional[str], response: str):
+        """Store a successful response under cache_key (error responses are never cached)"""
+        if cache_key is None or not isinstance(response, str) or is_failure(response) or response.startswith("Error:"):
+            return
+        self.response_cache.put(cache_key, self.model_name, response)
+
     def get_token_stats(self) -> Dict[str, int]:
         """Get token statistics"""
         return {
             "total_tokens": self.total_tokens,
             "prompt_tokens": self.prompt_tokens,
             "completion_tokens": self.completion_tokens,
-            "api_calls": self.api_calls
+            "api_calls": self.api_calls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
         }
 
     def reset_token_stats(self):
         """Reset token statistics"""
-        self.total_tokens = 0
-        self.prompt_tokens = 0
-        self.completion_tokens = 0
-        self.api_calls = 0
\ No newline at end of file
+        with self._stats_lock:
+            self.total_tokens = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.api_calls = 0
+            self.cache_hits = 0
+            self.cache_misses = 0
\ No newline at end of file
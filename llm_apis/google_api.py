@@ -2,6 +2,7 @@
 # Requires the `google-generativeai` library.
 from typing import List
 from .base_api import BaseLLM
+from .resilience import LLMFailure, classify_exception
 import google.generativeai as genai
 
 class Google_API(BaseLLM):
@@ -33,7 +34,7 @@ class Google_API(BaseLLM):
                 return response.text
             else:
                 reason = response.prompt_feedback.block_reason.name if response.prompt_feedback else "Unknown"
-                return f"Error: Model did not return content. Reason: {reason}"
+                return LLMFailure(f"Model did not return content. Reason: {reason}")
         except Exception as e:
             print(f"Google API error: {e}")
-            return f"Error: {e}"
\ No newline at end of file
+            return LLMFailure(e, retryable=classify_exception(e)[0])
\ No newline at end of file
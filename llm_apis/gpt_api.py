@@ -1,52 +1,479 @@
+import asyncio
+import threading
+import time
+import httpx
 import openai
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
 from .base_api import BaseLLM
+from .load_balancer import Replica, ReplicaPool
+from .prompt_layout import PROMPT_LAYOUTS, PrefixedPrompt, build_messages, prefix_grouped_order
+from .rate_limiter import estimate_prompt_tokens
+from .think_parser import ThinkStream, ThinkStripper
+from .resilience import LLMFailure, RetryPolicy, call_with_retries, acall_with_retries, get_circuit_breaker, is_failure
+from ..config import LLM_RETRY_CONFIG, REPLICA_BALANCER_CONFIG
+
+# Think-process stripping for thinking models; keywords mark the line where the think process ends
+_THINK_STRIPPER = ThinkStripper(
+    line_keywords=['end think', 'think end', 'now i will', 'let me', 'based on', 'therefore'],
+    colon_chars=":",
+    fullwidth_brackets=True
+)
+
+def build_replicas(api_key: str, replica_endpoints: List[Tuple[str, str, httpx.Client]],
+                   pool_limits: httpx.Limits = None, rate_limiters: Dict[str, Any] = None) -> List[Replica]:
+    """Replica clients for [(name, api_base, http_client), ...]; `rate_limiters` maps replica names to limiters"""
+    rate_limiters = rate_limiters or {}
+    return [
+        Replica(name, replica_base, openai.OpenAI(
+            api_key=api_key,
+            base_url=replica_base,
+            http_client=replica_http_client or httpx.Client(limits=pool_limits or httpx.Limits(), timeout=openai.DEFAULT_TIMEOUT),
+            max_retries=0
+        ), rate_limiter=rate_limiters.get(name))
+        for name, replica_base, replica_http_client in replica_endpoints
+    ]
 
 class GPT_API(BaseLLM):
     """
     Wrapper for OpenAI GPT models (e.g., gpt-4, gpt-3.5-turbo).
     Also compatible with any OpenAI API-compatible endpoint (e.g., vLLM).
+    With `replica_endpoints` [(name, api_base, http_client), ...] requests are balanced across
+    several endpoints serving the same model; pass `replica_pool` instead to share a pool between wrappers.
+    `prompt_layout` controls how PrefixedPrompt inputs are sent (see prompt_layout.PROMPT_LAYOUTS);
+    with `prefix_warmup` batches prefill each shared prefix once and then send its requests back to back.
     """
 
-    def __init__(self, model_name: str, api_key: str, api_base: str = None, **kwargs):
+    supports_stop_detector = True
+    supports_length_profiler = True
+
+    def __init__(self, model_name: str, api_key: str, api_base: str = None, max_concurrency: int = 16,
+                 http_client: httpx.Client = None, replica_endpoints: List[Tuple[str, str, httpx.Client]] = None,
+                 replica_pool: ReplicaPool = None, prompt_layout: str = "inline", prefix_warmup: bool = False, **kwargs):
         super().__init__(model_name=model_name, api_key=api_key, **kwargs)
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt_layout '{prompt_layout}', expected one of {PROMPT_LAYOUTS}")
+        self.prompt_layout = prompt_layout
+        self.prefix_warmup = prefix_warmup
+        if replica_pool is not None and api_base is None:
+            api_base = replica_pool.replicas[0].api_base
+        elif replica_endpoints and api_base is None:
+            api_base = replica_endpoints[0][1]
+        self.api_base = api_base
+        # Upper bound on in-flight requests for batch_generate / abatch_generate
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._pool_limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency
+        )
+        # Keep-alive connection pool: shared per endpoint when handed out by the client registry,
+        # otherwise a per-instance pool sized to the concurrency cap
+        if http_client is None:
+            http_client = httpx.Client(limits=self._pool_limits, timeout=openai.DEFAULT_TIMEOUT)
+        # Classified retries with jittered backoff and a per-endpoint circuit breaker;
+        # the SDK's own retries are disabled so attempts are not multiplied
+        self.retry_policy = RetryPolicy(
+            max_retries=LLM_RETRY_CONFIG.get("max_retries", 4),
+            base_delay=LLM_RETRY_CONFIG.get("base_delay", 1.0),
+            max_delay=LLM_RETRY_CONFIG.get("max_delay", 30.0)
+        )
+        self.circuit_breaker = get_circuit_breaker(
+            api_base or "openai",
+            failure_threshold=LLM_RETRY_CONFIG.get("circuit_failure_threshold", 5),
+            reset_seconds=LLM_RETRY_CONFIG.get("circuit_reset_seconds", 30.0)
+        )
         # Create a separate client for this instance to support custom api_base
         self.client = openai.OpenAI(
             api_key=self.api_key,
-            base_url=api_base
+            base_url=api_base,
+            http_client=http_client,
+            max_retries=0
         )
+        # Replica pool: ejection of failing / slow replicas replaces the single-endpoint circuit breaker,
+        # so a retry is sent to another replica instead of failing fast
+        if replica_pool is None and replica_endpoints and len(replica_endpoints) > 1:
+            replica_pool = ReplicaPool(build_replicas(self.api_key, replica_endpoints, self._pool_limits),
+                                       **REPLICA_BALANCER_CONFIG)
+        self.replica_pool = replica_pool
+        if replica_pool is not None:
+            self.client = replica_pool.replicas[0].client
+            self.circuit_breaker = None
+        # Hedged requests for temperature-0 calls (set by get_llm when HEDGING_CONFIG covers the model)
+        self.hedge_policy = None
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+        # Streaming with early stop (generate(..., stop_detector=...))
+        self.stream_stats = {'streamed_calls': 0, 'early_stops': 0, 'completion_tokens_saved': 0}
+        self._avg_full_completion_tokens = None
+        # Async client is bound to the event loop it was first used on, created lazily
+        self._async_client = None
+        self._async_client_loop = None
+        self._async_client_lock = threading.Lock()
 
-    def generate(self, prompt: str, **kwargs) -> str:
+    def generate(self, prompt: str, stop_detector=None, length_profiler=None, **kwargs) -> str:
         """
         Generate a single text completion using the ChatCompletions endpoint.
         For Qwen3 architect model, automatically extract formal output content after the think process.
+        With `stop_detector` (callable(text) -> final answer or None, see evaluation.stop_detectors) the
+        completion is streamed and cancelled once the detected answer stayed unchanged for its grace period.
+        With `length_profiler` (see length_profiler.OutputLengthProfiler) max_tokens is lowered to the observed
+        output-length percentile; completions cut off by that budget are retried with a larger one when they
+        do not already contain a final answer (checked with the profiler's answer detector).
         """
         request_kwargs = {**self.model_kwargs, **kwargs}
+        ceiling = request_kwargs.get("max_tokens")
+        budget = length_profiler.budget(ceiling) if length_profiler is not None and ceiling else None
+        if budget is not None and budget < ceiling:
+            request_kwargs["max_tokens"] = budget
+            length_profiler.count('budgeted_calls')
+        else:
+            budget = None
+
+        response = self._call(prompt, request_kwargs, stop_detector)
+        retries = 0
+        while budget is not None and self._finish_reason(response) == "length":
+            answer_detector = length_profiler.answer_detector or stop_detector
+            if answer_detector is not None and answer_detector(response.choices[0].message.content or ""):
+                # Cut off after the answer (e.g. a runaway tail), keep it
+                length_profiler.count('kept_truncated')
+                break
+            if budget >= ceiling or retries >= length_profiler.max_retries:
+                break
+            budget = length_profiler.next_budget(budget, ceiling)
+            request_kwargs["max_tokens"] = budget
+            retries += 1
+            length_profiler.count('truncation_retries')
+            # The truncated attempt is superseded but was paid for
+            self._record_discarded(response)
+            response = self._call(prompt, request_kwargs, stop_detector)
+
+        # Only natural completions: budget cut-offs and early-stopped streams ("stop_detector", whose usage
+        # is an estimate) would pull the percentile down
+        if length_profiler is not None and not is_failure(response) and self._finish_reason(response) == "stop":
+            usage = getattr(response, 'usage', None)
+            length_profiler.record(usage.completion_tokens if usage else None)
+        return self._finish(response)
+
+    def _call(self, prompt: str, request_kwargs: dict, stop_detector=None):
+        """
+        One completion, hedged when a hedge policy is set and the call is deterministic (temperature 0):
+        if the first request is still running after the policy's latency percentile, a duplicate is sent
+        (to another replica when there is a pool) and the first successful result wins.
+        """
+        policy = self.hedge_policy
+        if policy is None or (request_kwargs.get("temperature") or 0) > 0:
+            return self._call_with_retries(prompt, request_kwargs, stop_detector)
+
+        start = time.perf_counter()
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._call_with_retries, prompt, request_kwargs, stop_detector)
+        # Latency of every first request feeds the percentile, also when a hedge wins
+        primary.add_done_callback(
+            lambda f: None if is_failure(f.result()) else policy.record_latency(time.perf_counter() - start)
+        )
+        delay = policy.delay()
+        if delay is None or wait([primary], timeout=delay).done or not policy.try_acquire():
+            return primary.result()
 
+        hedge = executor.submit(self._call_with_retries, prompt, request_kwargs, stop_detector)
+        pending = {primary, hedge}
+        response = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if response is None or is_failure(response):
+                    response = future.result()
+                    if future is hedge and not is_failure(response):
+                        policy.record_hedge_win()
+            if response is not None and not is_failure(response):
+                break
+        # The slower request keeps running; count its tokens when it finishes
+        for future in pending:
+            future.add_done_callback(lambda f: self._record_discarded(f.result()))
+        return response
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=2 * self.max_concurrency,
+                                                          thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _record_discarded(self, response):
+        """Token usage of a request whose result was not used (losing hedge, superseded truncated attempt)"""
+        usage = getattr(response, 'usage', None)
+        if not is_failure(response) and usage:
+            self._record_usage(usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+
+    def _call_with_retries(self, prompt: str, request_kwargs: dict, stop_detector=None):
+        """One completion (API response or failure result) with classified retries and rate limiting"""
+        # Use instance client (or the least loaded replica) for API call
+        return call_with_retries(
+            lambda: self._rate_limited_call(
+                lambda: self._create_completion(prompt, request_kwargs, stop_detector),
+                prompt, request_kwargs
+            ),
+            self.retry_policy, self.circuit_breaker
+        )
+
+    @staticmethod
+    def _finish_reason(response):
+        if is_failure(response):
+            return None
         try:
-            # Use instance client for API call
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                **request_kwargs
+            return response.choices[0].finish_reason
+        except (AttributeError, IndexError):
+            return None
+
+    def _create_completion(self, prompt: str, request_kwargs: dict, stop_detector=None):
+        """One ChatCompletions request, routed through the replica pool when there is one"""
+        if self.replica_pool is None:
+            return self._request(self.client, prompt, request_kwargs, stop_detector)
+        with self.replica_pool.lease() as replica:
+            # Each replica endpoint has its own RPM/TPM budget
+            return self._rate_limited_call(
+                lambda: self._request(replica.client, prompt, request_kwargs, stop_detector),
+                prompt, request_kwargs, rate_limiter=replica.rate_limiter
             )
-            raw_content = response.choices[0].message.content.strip()
 
-            # Record token statistics
-            self.api_calls += 1
-            if hasattr(response, 'usage') and response.usage:
-                self.prompt_tokens += response.usage.prompt_tokens or 0
-                self.completion_tokens += response.usage.completion_tokens or 0
-                self.total_tokens += response.usage.total_tokens or 0
+    def _request(self, client: openai.OpenAI, prompt: str, request_kwargs: dict, stop_detector=None):
+        messages = build_messages(prompt, self.prompt_layout)
+        if stop_detector is None:
+            response = client.chat.completions.create(model=self.model_name, messages=messages, **request_kwargs)
+            if getattr(response, 'usage', None):
+                self._observe_full_completion(response.usage.completion_tokens)
+            return response
+        stream = client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs
+        )
+        return self._consume_stream(stream, prompt, stop_detector)
 
-            # Check if this is a thinking model (Qwen3, gpt-oss-120b, etc.), if so extract content after think
-            if self._is_thinking_model():
-                return self._extract_content_after_think(raw_content)
+    def _consume_stream(self, stream, prompt: str, stop_detector):
+        """
+        Read a streamed completion, cancelling it once the detected answer is stable.
+        Returns a response-like object (choices[0].message.content, finish_reason, usage).
+        """
+        parts = []
+        usage = None
+        finish_reason = None
+        answer = None
+        chunks_since_answer = 0
+        stopped = False
+        think_stream = ThinkStream()
+        try:
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if answer is not None:
+                    chunks_since_answer += 1
+                # No answer inside an unfinished think block; answers only complete at a terminator,
+                # skip the scan on other chunks
+                in_think = think_stream.feed(delta)
+                if not in_think and ('\n' in delta or '}' in delta or '.' in delta):
+                    found = stop_detector("".join(parts))
+                    if found != answer:
+                        answer, chunks_since_answer = found, 0
+                if answer is not None and chunks_since_answer >= getattr(stop_detector, 'grace_tokens', 0):
+                    stopped = True
+                    break
+        finally:
+            if stopped:
+                stream.close()  # Disconnect, the server aborts the rest of the generation
+
+        with self._stats_lock:
+            self.stream_stats['streamed_calls'] += 1
+        if stopped:
+            # No usage is reported for a cancelled stream: estimate it (one token per content chunk)
+            completion_tokens = len(parts)
+            prompt_tokens = estimate_prompt_tokens(prompt)
+            usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                    total_tokens=prompt_tokens + completion_tokens)
+            finish_reason = "stop_detector"
+            with self._stats_lock:
+                self.stream_stats['early_stops'] += 1
+                if self._avg_full_completion_tokens is not None:
+                    saved = max(0, int(self._avg_full_completion_tokens) - completion_tokens)
+                    self.stream_stats['completion_tokens_saved'] += saved
+        elif usage is not None:
+            self._observe_full_completion(usage.completion_tokens)
+
+        message = SimpleNamespace(role="assistant", content="".join(parts))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+            usage=usage
+        )
 
-            return raw_content
+    def _observe_full_completion(self, completion_tokens: int):
+        """Moving average of uncut completion lengths, the baseline for estimating early-stop savings"""
+        if not completion_tokens:
+            return
+        with self._stats_lock:
+            if self._avg_full_completion_tokens is None:
+                self._avg_full_completion_tokens = float(completion_tokens)
+            else:
+                self._avg_full_completion_tokens = 0.9 * self._avg_full_completion_tokens + 0.1 * completion_tokens
+
+    def batch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
+        """
+        Generate completions for a batch of prompts concurrently.
+        Requests share the instance connection pool and at most `max_concurrency` are in flight;
+        results are returned in the same order as `prompts`.
+        """
+        if not prompts:
+            return []
+
+        workers = min(max_concurrency or self.max_concurrency, self.max_concurrency, len(prompts))
+        order = list(range(len(prompts)))
+        if self.prefix_warmup:
+            self._warm_prefixes(prompts, workers)
+            order = prefix_grouped_order(prompts)
+        results = [None] * len(prompts)
+        if workers <= 1:
+            for i in order:
+                results[i] = self.generate(prompts[i], **kwargs)
+            return results
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i, response in zip(order, executor.map(lambda i: self.generate(prompts[i], **kwargs), order)):
+                results[i] = response
+        return results
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Async version of generate built on openai.AsyncOpenAI"""
+        if self.replica_pool is not None or kwargs.get("stop_detector") is not None or kwargs.get("length_profiler") is not None:
+            # Replica balancing, early-stop streaming and length budgeting live in the blocking path; run it in a worker thread
+            return await super().agenerate(prompt, **kwargs)
+        cache_key, cached = self._cache_lookup(prompt, kwargs)
+        if cached is not None:
+            return cached
+        request_kwargs = {**self.model_kwargs, **kwargs}
+
+        response = await acall_with_retries(
+            lambda: self._arate_limited_call(
+                lambda: self._get_async_client().chat.completions.create(
+                    model=self.model_name,
+                    messages=build_messages(prompt, self.prompt_layout),
+                    **request_kwargs
+                ),
+                prompt, request_kwargs
+            ),
+            self.retry_policy, self.circuit_breaker
+        )
+        content = self._finish(response)
+        self._cache_store(cache_key, content)
+        return content
+
+    async def abatch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
+        """Async batch generation, at most `max_concurrency` requests in flight, results keep input order"""
+        limit = min(max_concurrency or self.max_concurrency, self.max_concurrency)
+        semaphore = asyncio.Semaphore(max(1, limit))
+
+        async def _bounded(prompt: str, **request_kwargs) -> str:
+            async with semaphore:
+                return await self.agenerate(prompt, **request_kwargs)
+
+        order = list(range(len(prompts)))
+        if self.prefix_warmup:
+            # Tasks start in creation order, so warm the prefixes first and then create them prefix-grouped
+            await asyncio.gather(*[
+                _bounded(PrefixedPrompt(prefix, ""), max_tokens=1, use_cache=False)
+                for prefix in self._shared_prefixes(prompts)
+            ])
+            order = prefix_grouped_order(prompts)
+        responses = await asyncio.gather(*[_bounded(prompts[i], **kwargs) for i in order])
+        results = [None] * len(prompts)
+        for i, response in zip(order, responses):
+            results[i] = response
+        return results
+
+    def _get_async_client(self) -> openai.AsyncOpenAI:
+        """Return the AsyncOpenAI client for the running event loop (recreated if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        with self._async_client_lock:
+            if self._async_client is None or self._async_client_loop is not loop:
+                self._async_client = openai.AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.api_base,
+                    http_client=httpx.AsyncClient(limits=self._pool_limits, timeout=openai.DEFAULT_TIMEOUT),
+                    max_retries=0
+                )
+                self._async_client_loop = loop
+            return self._async_client
+
+    @staticmethod
+    def _shared_prefixes(prompts: List[str]) -> List[str]:
+        """Prefixes shared by more than one PrefixedPrompt in a batch, in first-appearance order"""
+        counts = {}
+        for prompt in prompts:
+            if isinstance(prompt, PrefixedPrompt) and prompt.prefix:
+                counts[prompt.prefix] = counts.get(prompt.prefix, 0) + 1
+        return [prefix for prefix, count in counts.items() if count > 1]
+
+    def _warm_prefixes(self, prompts: List[str], workers: int):
+        """
+        Prefill each shared prefix once with a max_tokens=1 request, so the grouped requests that follow
+        hit the server's prefix cache instead of all computing the same prefix in the first concurrent wave
+        """
+        prefixes = self._shared_prefixes(prompts)
+        if not prefixes:
+            return
+        warm = lambda prefix: self.generate(PrefixedPrompt(prefix, ""), max_tokens=1, use_cache=False)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prefixes)))) as executor:
+            list(executor.map(warm, prefixes))
+
+    def _cache_endpoint(self):
+        if self.replica_pool is not None:
+            return sorted(replica.api_base for replica in self.replica_pool.replicas)
+        return self.api_base
+
+    def _cache_prompt_text(self, prompt: str) -> str:
+        """Split layouts send a different request than the inline prompt, keep their cache entries apart"""
+        if len(build_messages(prompt, self.prompt_layout)) > 1:
+            return f"[prompt_layout={self.prompt_layout}]\n{prompt}"
+        return prompt
+
+    def _finish(self, response) -> str:
+        """Turn an API response (or failure result) into the returned text"""
+        if is_failure(response):
+            print(f"OpenAI compatible API error: {response.error}")
+            return response
+        try:
+            return self._process_response(response)
         except Exception as e:
             print(f"OpenAI compatible API error: {e}")
-            return f"Error: {e}"
+            return LLMFailure(e)
+
+    def _process_response(self, response) -> str:
+        """Record token usage and return the response text (think content stripped for thinking models)"""
+        raw_content = response.choices[0].message.content.strip()
+
+        # Record token statistics
+        if hasattr(response, 'usage') and response.usage:
+            self._record_usage(
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                response.usage.total_tokens
+            )
+        else:
+            self._record_usage()
+
+        # Check if this is a thinking model (Qwen3, gpt-oss-120b, etc.), if so extract content after think
+        if self._is_thinking_model():
+            return self._extract_content_after_think(raw_content)
+
+        return raw_content
     
     def _is_qwen3_architect_model(self) -> bool:
         """Check if current model is Qwen3 architect model"""
@@ -69,75 +496,12 @@ class GPT_API(BaseLLM):
         2. <thinking>...</thinking>
         3. Think: ... (paragraphs starting with Think:)
         4. Thought: ... (alternative thinking markers)
+        Parsing is done by think_parser.ThinkStripper in a single scan.
         """
-        import re
-        
-        # Method 1: Extract content after <think>...</think> tags (supports full-width and half-width brackets)
-        think_patterns = [
-            r'[<＜]think[>＞].*?[<＜]/think[>＞]\s*(.*?)$',  # <think>...</think> or ＜think＞...＜/think＞
-            r'[<＜]thinking[>＞].*?[<＜]/thinking[>＞]\s*(.*?)$',  # <thinking>...</thinking>
-            r'[<＜]thought[>＞].*?[<＜]/thought[>＞]\s*(.*?)$',  # <thought>...</thought>
-        ]
-        
-        for pattern in think_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:  # Ensure extracted content is not empty
-                    return extracted
-
-        # Method 2: Find content after "Think:" or "Thinking:"
-        think_start_patterns = [
-            r'(?:Think)[:]\s*(.*?)$',
-            r'(?:Thinking)[:]\s*(.*?)$',
-        ]
-        
-        for pattern in think_start_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:
-                    return extracted
-        
-        # Method 3: Find content after think process ends (supports full-width and half-width brackets)
-        # Try to find the end position of think process, then extract content after it
-        think_end_markers = [
-            r'[<＜]/think[>＞]\s*(.*?)$',
-            r'[<＜]/thinking[>＞]\s*(.*?)$', 
-            r'[<＜]/thought[>＞]\s*(.*?)$',
-            r'(?:end\s+think|think\s+end)\s*(.*?)$',
-        ]
-        
-        for pattern in think_end_markers:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                extracted = match.group(1).strip()
-                if extracted:
-                    return extracted
-        
-        # Method 4: If no clear think markers found, try intelligent splitting
-        # Find possible think process end position
-        lines = content.split('\n')
-        think_end_line = -1
-
-        # Find possible think process end line
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-            # Find indicators of think process end
-            if any(end_word in line_lower for end_word in [
-                'end think', 'think end',
-                'now i will', 'let me', 'based on', 'therefore',
-            ]):
-                think_end_line = i
-                break
-        
-        # If think end line found, extract content after it
-        if think_end_line >= 0 and think_end_line < len(lines) - 1:
-            remaining_lines = lines[think_end_line + 1:]
-            remaining_content = '\n'.join(remaining_lines).strip()
-            if remaining_content:
-                return remaining_content
-        
+        extracted = _THINK_STRIPPER.extract(content)
+        if extracted is not None:
+            return extracted
+
         # If all methods fail, return original content
         print(f" Could not extract content after think from Qwen3 output, returning original content")
         return content
\ No newline at end of file
@@ -0,0 +1,71 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate (hedged) request for a model.
+    The hedge delay is the `percentile` of recent successful call latencies (at least `min_delay` seconds),
+    and hedges are capped at `max_extra_fraction` of all requests so tail-cutting never multiplies load.
+    """
+
+    def __init__(self, name: str, percentile: float = 0.95, min_samples: int = 20, min_delay: float = 2.0,
+                 max_extra_fraction: float = 0.1, window: int = 200):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = max(1, int(min_samples))
+        self.min_delay = min_delay
+        self.max_extra_fraction = max_extra_fraction
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_denied': 0}
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait on the first request before hedging, None while there are too few samples"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, max(0, int(math.ceil(self.percentile * len(latencies))) - 1))
+        return max(self.min_delay, latencies[index])
+
+    def try_acquire(self) -> bool:
+        """Take one hedge from the budget"""
+        with self._lock:
+            if self.stats['hedged'] + 1 > self.max_extra_fraction * self.stats['requests']:
+                self.stats['budget_denied'] += 1
+                return False
+            self.stats['hedged'] += 1
+            return True
+
+    def record_hedge_win(self):
+        with self._lock:
+            self.stats['hedge_wins'] += 1
+
+
+_POLICIES: Dict[str, HedgePolicy] = {}
+_POLICIES_LOCK = threading.Lock()
+
+
+def get_hedge_policy(model_id: str, config: Dict = None) -> Optional[HedgePolicy]:
+    """Return the process-wide hedge policy of a model id, None when hedging is disabled for it"""
+    config = config or {}
+    if not config.get("enabled", False) or model_id not in config.get("models", []):
+        return None
+    with _POLICIES_LOCK:
+        if model_id not in _POLICIES:
+            _POLICIES[model_id] = HedgePolicy(
+                model_id,
+                percentile=config.get("percentile", 0.95),
+                min_samples=config.get("min_samples", 20),
+                min_delay=config.get("min_delay", 2.0),
+                max_extra_fraction=config.get("max_extra_fraction", 0.1)
+            )
+        return _POLICIES[model_id]
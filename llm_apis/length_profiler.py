@@ -0,0 +1,88 @@
+import math
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class OutputLengthProfiler:
+    """
+    Completion-length profile of one (dataset, model) pair, from the `usage` of finished calls.
+    Once `min_samples` lengths are known, later calls get max_tokens = percentile x margin
+    (clamped to [floor, configured max_tokens]). A call cut off at that budget is retried with a doubled
+    budget, at most `max_retries` times, unless `answer_detector` finds a final answer in its text.
+    """
+
+    def __init__(self, name: str, percentile: float = 0.95, margin: float = 1.25, min_samples: int = 30,
+                 floor: int = 256, window: int = 500, max_retries: int = 2):
+        self.name = name
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = max(1, int(min_samples))
+        self.floor = floor
+        self.max_retries = max(0, int(max_retries))
+        # callable(text) -> final answer or None (evaluation.stop_detectors), set by the caller
+        self.answer_detector = None
+        self._lengths = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.stats = {'budgeted_calls': 0, 'truncation_retries': 0, 'kept_truncated': 0}
+
+    def record(self, completion_tokens: Optional[int]):
+        """Add the length of a completion that was not cut off by max_tokens"""
+        if completion_tokens:
+            with self._lock:
+                self._lengths.append(int(completion_tokens))
+
+    def budget(self, ceiling: int) -> Optional[int]:
+        """max_tokens for the next call, None while the profile is too small"""
+        with self._lock:
+            if len(self._lengths) < self.min_samples:
+                return None
+            lengths = sorted(self._lengths)
+        index = min(len(lengths) - 1, int(math.ceil(self.percentile * len(lengths))) - 1)
+        budget = int(math.ceil(lengths[max(0, index)] * self.margin))
+        return max(min(self.floor, ceiling), min(budget, ceiling))
+
+    def next_budget(self, budget: int, ceiling: int) -> int:
+        """Larger budget for retrying a truncated completion"""
+        return min(ceiling, budget * 2)
+
+    def __str__(self) -> str:
+        # Stable identity for response-cache keys (budgeted calls may return a truncated completion)
+        return f"OutputLengthProfiler({self.name})"
+
+    __repr__ = __str__
+
+    def count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, 'samples': len(self._lengths)}
+
+
+_PROFILERS: Dict[str, OutputLengthProfiler] = {}
+_PROFILERS_LOCK = threading.Lock()
+
+
+def get_length_profiler(dataset: str, model_name: str, config: Dict = None,
+                        answer_detector: Callable[[str], Optional[str]] = None) -> Optional[OutputLengthProfiler]:
+    """Return the process-wide profiler for a (dataset, model) pair, None when adaptive budgeting is disabled"""
+    config = config or {}
+    if not config.get("enabled", False):
+        return None
+    name = f"{dataset or 'unknown'}/{model_name}"
+    with _PROFILERS_LOCK:
+        if name not in _PROFILERS:
+            _PROFILERS[name] = OutputLengthProfiler(
+                name,
+                percentile=config.get("percentile", 0.95),
+                margin=config.get("margin", 1.25),
+                min_samples=config.get("min_samples", 30),
+                floor=config.get("floor", 256),
+                window=config.get("window", 500),
+                max_retries=config.get("max_retries", 2)
+            )
+        if answer_detector is not None:
+            _PROFILERS[name].answer_detector = answer_detector
+        return _PROFILERS[name]
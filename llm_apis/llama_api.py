@@ -1,60 +1,229 @@
 # This is a placeholder for local LLaMA models.
 # Actual implementation depends on the serving framework used, e.g., Hugging Face Transformers, vLLM or Ollama.
 # Below is an example using the Hugging Face Transformers library.
+import asyncio
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from typing import List
+from transformers import AutoTokenizer, AutoModelForCausalLM, DynamicCache
+from typing import Any, Dict, List, Tuple
 from .base_api import BaseLLM
+from .local_batcher import get_dynamic_batcher
+from .prefix_kv_cache import get_prefix_kv_cache
+from .prompt_layout import PrefixedPrompt
+from .rate_limiter import estimate_prompt_tokens
+from .registry import get_client_registry
+
+# CPU execution defaults (MODELS "cpu" overrides): num_threads None keeps torch's default
+CPU_DEFAULTS = {"dtype": "float32", "int8": False, "num_threads": None}
 
 class Llama_API(BaseLLM):
     """
     Wrapper for loading and running local models using Hugging Face Transformers.
+    Requests go through a process-wide dynamic batcher per model (see local_batcher.DynamicBatcher):
+    concurrent `generate` calls and `batch_generate` prompts are run as left-padded batches.
+    PrefixedPrompt inputs sharing a prefix are batched together and reuse its precomputed past_key_values
+    (see prefix_kv_cache.PrefixKVCache), so the shared fusion prompt is prefilled once.
+    On CPU (`device="cpu"`, or "auto" without a GPU) the `cpu` settings pick the weight dtype
+    ("float32" / "bfloat16"), optional dynamic int8 quantization of the Linear layers and the intra-op thread count.
     """
-    def __init__(self, model_name: str, api_key: str = None, **kwargs):
+    def __init__(self, model_name: str, api_key: str = None, batching: Dict[str, Any] = None,
+                 prefix_cache: Dict[str, Any] = None, device: str = "auto", cpu: Dict[str, Any] = None, **kwargs):
         super().__init__(model_name=model_name, api_key=api_key, **kwargs)
         
         # Automatically detect available device (prefer GPU)
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device
+        self.cpu_config = {**CPU_DEFAULTS, **(cpu or {})}
+        # Loaded weights, batcher and prefix cache are shared per (model, execution mode)
+        self.model_key = self.model_name
+        if self.device == "cpu":
+            self.model_key = f"{self.model_name} [cpu {self._cpu_dtype_name()}{' int8' if self.cpu_config['int8'] else ''}]"
+            if self.cpu_config.get("num_threads"):
+                torch.set_num_threads(int(self.cpu_config["num_threads"]))
         print(f"Loading local model on {self.device}: {self.model_name}")
 
         try:
-            # Load tokenizer and model
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                torch_dtype=torch.float16, # Use float16 to save GPU memory
-                device_map="auto" # Automatically shard model across available GPUs
-            )
-            print(f"Model {self.model_name} loaded successfully.")
+            # Weights are loaded once per process and shared by every wrapper of the same model
+            self.tokenizer, self.model = get_client_registry().get_local_model(self.model_key, self._load_model)
         except Exception as e:
             print(f"Error loading model: {e}")
             print("Please ensure the model path is correct and you have installed `torch` and `transformers`.")
             raise
 
-    @torch.no_grad() # Disable gradient computation during inference to save resources
-    def generate(self, prompt: str, **kwargs) -> str:
-        """
-        Generate a single text completion using a local Hugging Face model.
-        """
-        # Merge model default parameters with runtime parameters
+        # max_batch_size / max_batch_tokens / max_wait_ms (MODELS "batching"); {"enabled": False} runs prompts one by one
+        self.batcher = get_dynamic_batcher(self.model_key, self._run_batch, batching)
+        # max_entries / min_prefix_tokens (MODELS "prefix_cache"); {"enabled": False} always prefills the full prompt
+        self.prefix_kv_cache = get_prefix_kv_cache(self.model_key, prefix_cache)
+
+    def _load_model(self):
+        """Load tokenizer and model from disk"""
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        # Batches are left-padded so every prompt ends right where generation starts
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        if self.device == "cpu":
+            model = self._load_cpu_model()
+        else:
+            model = AutoModelForCausalLM.from_pretrained(
+                self.model_name,
+                torch_dtype=torch.float16, # Use float16 to save GPU memory
+                device_map="auto" # Automatically shard model across available GPUs
+            )
+        print(f"Model {self.model_name} loaded successfully.")
+        return tokenizer, model
+
+    def _cpu_dtype_name(self) -> str:
+        # Dynamic int8 quantization works on float32 Linear layers
+        return "float32" if self.cpu_config["int8"] else self.cpu_config["dtype"]
+
+    def _load_cpu_model(self):
+        """Load the model for CPU execution (fp16 matmuls are slow or unsupported on CPU)"""
+        dtype_name = self._cpu_dtype_name()
+        if dtype_name not in ("float32", "bfloat16"):
+            raise ValueError(f"Unsupported CPU dtype '{dtype_name}', use 'float32' or 'bfloat16'")
+        if self.cpu_config["int8"] and self.cpu_config["dtype"] != "float32":
+            print(f" int8 quantization requires float32 weights, loading float32 instead of {self.cpu_config['dtype']}")
+        model = AutoModelForCausalLM.from_pretrained(
+            self.model_name,
+            torch_dtype=getattr(torch, dtype_name),
+            low_cpu_mem_usage=True
+        )
+        model.eval()
+        if self.cpu_config["int8"]:
+            # int8 weights for every Linear layer, activations are quantized on the fly
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f" CPU mode: {dtype_name}{' + dynamic int8' if self.cpu_config['int8'] else ''}, "
+              f"{torch.get_num_threads()} threads")
+        return model
+
+    def _generation_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge model default parameters with runtime parameters"""
         generation_kwargs = {**self.model_kwargs, **kwargs}
 
         # Core fix: Disable sampling (greedy decoding) when temperature is 0
         if generation_kwargs.get("temperature") == 0.0:
             generation_kwargs["do_sample"] = False
+        return generation_kwargs
 
-        # Encode input as tensors and move to appropriate device
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+    def _submit(self, prompt: str, generation_kwargs: Dict[str, Any]):
+        """Queue a prompt on the model's batcher; returns a Future of (text, prompt_tokens, completion_tokens)"""
+        # Estimated size for the batch token budget (the tokenizer is only used on the batcher thread, it is not thread-safe)
+        prompt_tokens = estimate_prompt_tokens(prompt)
+        new_tokens = generation_kwargs.get("max_new_tokens") or getattr(self.model.generation_config, "max_new_tokens", None)
+        # Prompts only share a batch (and its cached prefix) with prompts of the same prefix
+        group = prompt.prefix if isinstance(prompt, PrefixedPrompt) and self.prefix_kv_cache is not None else None
+        return self.batcher.submit(prompt, generation_kwargs, prompt_tokens, new_tokens or 0, group=group)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate a single text completion using a local Hugging Face model.
+        Concurrent calls are batched together by the model's batcher.
+        """
+        generation_kwargs = self._generation_kwargs(kwargs)
+        if self.batcher is None:
+            (text, prompt_tokens, completion_tokens), = self._run_batch([prompt], generation_kwargs)
+        else:
+            text, prompt_tokens, completion_tokens = self._submit(prompt, generation_kwargs).result()
+        self._record_usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+        return text
+
+    def batch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
+        """
+        Generate completions for a batch of prompts in padded batches, results keep the order of `prompts`.
+        Batch sizes come from the batcher settings (`max_concurrency` is ignored).
+        """
+        if self.batcher is None:
+            return super().batch_generate(prompts, max_concurrency=max_concurrency, **kwargs)
+
+        results = [None] * len(prompts)
+        pending = []
+        for i, prompt in enumerate(prompts):
+            request_kwargs = dict(kwargs)
+            cache_key, cached = self._cache_lookup(prompt, request_kwargs)
+            if cached is not None:
+                results[i] = cached
+                continue
+            pending.append((i, cache_key, self._submit(prompt, self._generation_kwargs(request_kwargs))))
+
+        for i, cache_key, future in pending:
+            text, prompt_tokens, completion_tokens = future.result()
+            self._record_usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+            self._cache_store(cache_key, text)
+            results[i] = text
+        return results
+
+    async def abatch_generate(self, prompts: List[str], max_concurrency: int = None, **kwargs) -> List[str]:
+        """Async version of batch_generate (the batches run on the batcher thread)"""
+        return await asyncio.to_thread(self.batch_generate, prompts, max_concurrency, **kwargs)
+
+    @torch.inference_mode() # No autograd tracking or version counters during inference
+    def _run_batch(self, prompts: List[str], generation_kwargs: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+        """Run one left-padded model.generate over `prompts`, returns (text, prompt_tokens, completion_tokens) each"""
+        if self.prefix_kv_cache is not None and isinstance(prompts[0], PrefixedPrompt) and all(
+                isinstance(prompt, PrefixedPrompt) and prompt.prefix == prompts[0].prefix for prompt in prompts):
+            results = self._run_prefixed_batch(prompts, generation_kwargs)
+            if results is not None:
+                return results
+        # Encode inputs as one padded tensor batch and move to appropriate device
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+        generation_kwargs = {"pad_token_id": self.tokenizer.pad_token_id, **generation_kwargs}
 
         # Generate text
-        outputs = self.model.generate(**inputs, **generation_kwargs)
+        outputs = self.model.generate(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                                      **generation_kwargs)
 
-        # Decode generated tokens, skipping input portion tokens
-        result = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        # Decode only the generated tokens, the (padded) input portion is cut off
+        generated = outputs[:, inputs["input_ids"].shape[1]:]
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        completion_tokens = (generated != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        return [(text.strip(), int(p), int(c)) for text, p, c in zip(texts, prompt_tokens, completion_tokens)]
 
-        # Usually, the result includes the original prompt; we need to remove it.
-        # This is a simple implementation; for more complex prompt structures, adjustment may be needed.
-        if result.startswith(prompt):
-            return result[len(prompt):].strip()
-        else:
-            return result.strip()
\ No newline at end of file
+    @torch.inference_mode()
+    def _run_prefixed_batch(self, prompts: List[PrefixedPrompt], generation_kwargs: Dict[str, Any]):
+        """
+        Generate for prompts sharing one prefix on top of its cached past_key_values.
+        Rows are laid out as [shared prefix][padding][rest of the prompt] with the padding masked out, so every row
+        keeps the token ids and positions it has without the cache. Returns None when the shared part is too short.
+        """
+        rows = self.tokenizer([str(prompt) for prompt in prompts])["input_ids"]
+        prefix_ids = self.tokenizer(prompts[0].prefix)["input_ids"]
+        # Tokens shared by the prefix and every prompt (tokenization may merge across the prefix boundary),
+        # leaving at least one prompt token to feed through the model
+        shared = min(len(prefix_ids), min(len(row) for row in rows) - 1)
+        for row in rows:
+            shared = next((i for i in range(shared) if row[i] != prefix_ids[i]), shared)
+        if shared < self.prefix_kv_cache.min_prefix_tokens:
+            return None
+
+        past = self.prefix_kv_cache.get(prefix_ids[:shared], self._prefill, rows=len(prompts))
+        past.batch_repeat_interleave(len(prompts))
+
+        pad_token_id = self.tokenizer.pad_token_id
+        width = max(len(row) - shared for row in rows)
+        input_ids, attention_mask = [], []
+        for row in rows:
+            padding = width - (len(row) - shared)
+            input_ids.append(row[:shared] + [pad_token_id] * padding + row[shared:])
+            attention_mask.append([1] * shared + [0] * padding + [1] * (len(row) - shared))
+        input_ids = torch.tensor(input_ids, device=self.device)
+        attention_mask = torch.tensor(attention_mask, device=self.device)
+        generation_kwargs = {"pad_token_id": pad_token_id, **generation_kwargs}
+
+        outputs = self.model.generate(input_ids=input_ids, attention_mask=attention_mask, past_key_values=past,
+                                      **generation_kwargs)
+
+        generated = outputs[:, input_ids.shape[1]:]
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        completion_tokens = (generated != pad_token_id).sum(dim=1).tolist()
+        return [(text.strip(), len(row), int(c)) for text, row, c in zip(texts, rows, completion_tokens)]
+
+    def _prefill(self, token_ids: List[int]):
+        """past_key_values of a prefix (batch size 1)"""
+        output = self.model(input_ids=torch.tensor([token_ids], device=self.device), use_cache=True)
+        past = output.past_key_values
+        if not hasattr(past, "batch_repeat_interleave"):
+            # Older transformers return the legacy tuple format
+            past = DynamicCache.from_legacy_cache(past)
+        return past
@@ -0,0 +1,167 @@
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from .resilience import classify_exception
+
+
+class Replica:
+    """One OpenAI-compatible endpoint serving the same model"""
+
+    def __init__(self, name: str, api_base: str, client: Any, rate_limiter: Any = None):
+        self.name = name
+        self.api_base = api_base
+        self.client = client
+        # RPM/TPM budget of this endpoint (rate_limiter.RateLimiter), None when it has no configured limits
+        self.rate_limiter = rate_limiter
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.completed = 0
+        self.consecutive_failures = 0
+        self.ejected = False
+        self.ejected_at = 0.0
+        self.stats = {'requests': 0, 'failures': 0, 'ejections': 0}
+
+
+class ReplicaPool:
+    """
+    Least-outstanding-requests balancer over model replicas.
+    - Requests go to the healthy replica with the fewest in-flight requests (ties: lower latency EWMA)
+    - A replica is ejected after `failure_threshold` consecutive transient failures, or when its latency EWMA
+      exceeds `slow_factor` x the median of the other healthy replicas (after `min_samples` requests)
+    - Ejected replicas are health-checked (GET /models) in the background and readmitted once they answer,
+      no earlier than `eject_seconds` after ejection
+    If every replica is ejected, requests still go to the least loaded one rather than failing.
+    """
+
+    def __init__(self, replicas: List[Replica], slow_factor: float = 3.0, min_samples: int = 20,
+                 eject_seconds: float = 60.0, failure_threshold: int = 3, health_check_interval: float = 15.0,
+                 health_check_timeout: float = 5.0):
+        self.replicas = replicas
+        self.slow_factor = slow_factor
+        self.min_samples = min_samples
+        self.eject_seconds = eject_seconds
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    def acquire(self) -> Replica:
+        """Pick a replica and count the request as outstanding"""
+        with self._lock:
+            candidates = [r for r in self.replicas if not r.ejected] or self.replicas
+            replica = min(candidates, key=lambda r: (r.outstanding, r.latency_ewma or 0.0))
+            replica.outstanding += 1
+            replica.stats['requests'] += 1
+            return replica
+
+    def release(self, replica: Replica, latency: float = None, ok: bool = True):
+        """Finish a request; update latency / failure tracking and eject the replica if needed"""
+        eject_reason = None
+        with self._lock:
+            replica.outstanding -= 1
+            if ok:
+                replica.consecutive_failures = 0
+                replica.completed += 1
+                if latency is not None:
+                    replica.latency_ewma = latency if replica.latency_ewma is None else \
+                        0.8 * replica.latency_ewma + 0.2 * latency
+                eject_reason = self._slow_reason(replica)
+            else:
+                replica.consecutive_failures += 1
+                replica.stats['failures'] += 1
+                if replica.consecutive_failures >= self.failure_threshold:
+                    eject_reason = f"{replica.consecutive_failures} consecutive failures"
+            healthy_others = [r for r in self.replicas if r is not replica and not r.ejected]
+            if replica.ejected or not healthy_others:
+                eject_reason = None  # Already out, or the last healthy replica (never ejected)
+            elif eject_reason:
+                replica.ejected = True
+                replica.ejected_at = time.monotonic()
+                replica.stats['ejections'] += 1
+        if eject_reason:
+            print(f" Replica '{replica.name}' ejected ({eject_reason})")
+            self._ensure_health_checker()
+
+    def _slow_reason(self, replica: Replica) -> Optional[str]:
+        if replica.ejected or replica.completed < self.min_samples or replica.latency_ewma is None:
+            return None
+        others = [r.latency_ewma for r in self.replicas
+                  if r is not replica and not r.ejected and r.latency_ewma is not None and r.completed >= self.min_samples]
+        if not others:
+            return None
+        median = statistics.median(others)
+        if median > 0 and replica.latency_ewma > self.slow_factor * median:
+            return f"latency {replica.latency_ewma:.2f}s vs median {median:.2f}s"
+        return None
+
+    @contextmanager
+    def lease(self):
+        """Context manager around one request: yields a replica and records latency / transient failures"""
+        replica = self.acquire()
+        start = time.perf_counter()
+        try:
+            yield replica
+        except Exception as e:
+            retryable, _ = classify_exception(e)
+            # Client errors (4xx) are not the replica's fault
+            self.release(replica, ok=not retryable)
+            raise
+        self.release(replica, latency=time.perf_counter() - start, ok=True)
+
+    def _ensure_health_checker(self):
+        with self._lock:
+            if self._health_thread is not None and self._health_thread.is_alive():
+                return
+            self._health_thread = threading.Thread(target=self._health_check_loop, name="replica-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_check_loop(self):
+        """Probe ejected replicas until all are readmitted"""
+        while True:
+            time.sleep(self.health_check_interval)
+            with self._lock:
+                ejected = [r for r in self.replicas if r.ejected]
+            if not ejected:
+                return
+            for replica in ejected:
+                if time.monotonic() - replica.ejected_at < self.eject_seconds:
+                    continue
+                if self._probe(replica):
+                    with self._lock:
+                        replica.ejected = False
+                        replica.consecutive_failures = 0
+                        replica.latency_ewma = None
+                        replica.completed = 0
+                    print(f" Replica '{replica.name}' passed health check, readmitted")
+
+    def _probe(self, replica: Replica) -> bool:
+        try:
+            replica.client.with_options(timeout=self.health_check_timeout).models.list()
+            return True
+        except Exception:
+            return False
+
+    def get_stats(self) -> List[dict]:
+        """Per-replica request / failure / ejection counts"""
+        with self._lock:
+            return [{'name': r.name, 'ejected': r.ejected, 'latency_ewma': r.latency_ewma, **r.stats}
+                    for r in self.replicas]
+
+
+_POOLS: Dict[str, ReplicaPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_replica_pool(model_id: str, build: Callable[[], ReplicaPool]) -> ReplicaPool:
+    """
+    Return the process-wide replica pool of a model id (built with `build` on first use), so every wrapper
+    of the model shares outstanding-request counts, latency EWMAs and ejections
+    """
+    with _POOLS_LOCK:
+        if model_id not in _POOLS:
+            _POOLS[model_id] = build()
+        return _POOLS[model_id]
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# run_batch(prompts, generation_kwargs) -> [(text, prompt_tokens, completion_tokens), ...] in prompt order
+RunBatch = Callable[[List[str], Dict[str, Any]], List[Tuple[str, int, int]]]
+
+
+class _Request:
+    __slots__ = ("prompt", "generation_kwargs", "kwargs_key", "tokens", "future")
+
+    def __init__(self, prompt: str, generation_kwargs: Dict[str, Any], tokens: int, group: str = None):
+        self.prompt = prompt
+        self.generation_kwargs = generation_kwargs
+        # Only requests with identical generation settings (and batching group) can share a model.generate call
+        self.kwargs_key = json.dumps([generation_kwargs, group], sort_keys=True, default=str)
+        self.tokens = tokens
+        self.future = Future()
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent generation requests for one local model and runs them as padded batches.
+    A background thread waits up to `max_wait_ms` after the first pending request, then takes the oldest
+    request plus later ones with the same generation settings and group, as long as the padded batch
+    (batch size x (longest prompt + new tokens)) stays within `max_batch_tokens` and `max_batch_size`.
+    Each request gets its own (text, prompt_tokens, completion_tokens) through a Future.
+    """
+
+    def __init__(self, name: str, run_batch: RunBatch, max_batch_size: int = 16, max_batch_tokens: int = 16384,
+                 max_wait_ms: float = 10.0):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_batch_tokens = max(1, int(max_batch_tokens))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[_Request] = []
+        self._cond = threading.Condition()
+        self.stats = {'batches': 0, 'requests': 0, 'padded_tokens': 0, 'request_tokens': 0, 'fallback_batches': 0}
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, generation_kwargs: Dict[str, Any], prompt_tokens: int, new_tokens: int = 0,
+               group: str = None) -> Future:
+        """
+        Queue one request; `prompt_tokens` (may be an estimate) + `new_tokens` is its share of the batch token budget.
+        Requests of different `group`s (e.g. prompt prefixes) are never batched together.
+        """
+        request = _Request(prompt, generation_kwargs, prompt_tokens + max(0, new_tokens or 0), group)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent callers a moment to join the batch
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+            self._run(batch)
+
+    def _take_batch(self) -> List[_Request]:
+        """Oldest request first, then compatible requests that fit the token budget (caller holds the lock)"""
+        head = self._pending[0]
+        batch = [head]
+        longest = head.tokens
+        for request in self._pending[1:]:
+            if len(batch) >= self.max_batch_size:
+                break
+            if request.kwargs_key != head.kwargs_key:
+                continue
+            if (len(batch) + 1) * max(longest, request.tokens) > self.max_batch_tokens:
+                continue
+            batch.append(request)
+            longest = max(longest, request.tokens)
+        taken = set(map(id, batch))
+        self._pending = [request for request in self._pending if id(request) not in taken]
+        return batch
+
+    def _run(self, batch: List[_Request]):
+        prompts = [request.prompt for request in batch]
+        try:
+            results = self.run_batch(prompts, batch[0].generation_kwargs)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # e.g. out of memory on a large batch: run its requests one by one
+            print(f" Batched generation of {len(batch)} requests failed ({e}), retrying them individually")
+            self.stats['fallback_batches'] += 1
+            for request in batch:
+                self._run([request])
+            return
+        self.stats['batches'] += 1
+        self.stats['requests'] += len(batch)
+        self.stats['padded_tokens'] += len(batch) * max(request.tokens for request in batch)
+        self.stats['request_tokens'] += sum(request.tokens for request in batch)
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['avg_batch_size'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        # Share of the padded batch spent on real prompt/new tokens
+        stats['padding_efficiency'] = stats['request_tokens'] / stats['padded_tokens'] if stats['padded_tokens'] else 0.0
+        return stats
+
+
+_BATCHERS: Dict[str, DynamicBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_dynamic_batcher(model_name: str, run_batch: RunBatch, config: Dict = None) -> Optional[DynamicBatcher]:
+    """Return the process-wide batcher of a local model, None when dynamic batching is disabled"""
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+    with _BATCHERS_LOCK:
+        if model_name not in _BATCHERS:
+            _BATCHERS[model_name] = DynamicBatcher(
+                model_name, run_batch,
+                max_batch_size=config.get("max_batch_size", 16),
+                max_batch_tokens=config.get("max_batch_tokens", 16384),
+                max_wait_ms=config.get("max_wait_ms", 10.0)
+            )
+        return _BATCHERS[model_name]
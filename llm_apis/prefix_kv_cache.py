@@ -0,0 +1,77 @@
+import copy
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PrefixKVCache:
+    """
+    LRU of precomputed past_key_values for prompt prefixes (e.g. the fusion prompt shared by every
+    validation question), keyed by a hash of the prefix token ids. Fusion prompts change every step,
+    so only the `max_entries` most recently used prefixes are kept.
+    """
+
+    def __init__(self, name: str, max_entries: int = 8, min_prefix_tokens: int = 32):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        # Shorter shared prefixes are not worth a separate prefill pass
+        self.min_prefix_tokens = max(1, int(min_prefix_tokens))
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'prefill_tokens_skipped': 0, 'prefill_tokens_computed': 0}
+
+    @staticmethod
+    def key(token_ids: List[int]) -> str:
+        return hashlib.sha1(array('q', token_ids).tobytes()).hexdigest()
+
+    def get(self, token_ids: List[int], compute: Callable[[List[int]], Any], rows: int = 1) -> Any:
+        """
+        Copy of the cached past_key_values for `token_ids` (computed with `compute` on a miss),
+        counting the prefill skipped for `rows` prompts sharing it.
+        """
+        key = self.key(token_ids)
+        with self._lock:
+            past = self._entries.get(key)
+            if past is not None:
+                self._entries.move_to_end(key)
+        hit = past is not None
+        if not hit:
+            past = compute(token_ids)
+            with self._lock:
+                self._entries[key] = past
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats['evictions'] += 1
+        with self._lock:
+            self.stats['hits' if hit else 'misses'] += 1
+            self.stats['prefill_tokens_skipped'] += len(token_ids) * (rows if hit else rows - 1)
+            if not hit:
+                self.stats['prefill_tokens_computed'] += len(token_ids)
+        # generate() appends to the cache in place, callers get their own copy
+        return copy.deepcopy(past)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries)}
+
+
+_CACHES: Dict[str, PrefixKVCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_prefix_kv_cache(model_name: str, config: Dict = None) -> Optional[PrefixKVCache]:
+    """Return the process-wide prefix KV cache of a local model, None when prefix reuse is disabled"""
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+    with _CACHES_LOCK:
+        if model_name not in _CACHES:
+            _CACHES[model_name] = PrefixKVCache(
+                model_name,
+                max_entries=config.get("max_entries", 8),
+                min_prefix_tokens=config.get("min_prefix_tokens", 32)
+            )
+        return _CACHES[model_name]
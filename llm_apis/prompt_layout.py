@@ -0,0 +1,43 @@
+from typing import Dict, List
+
+# How GPT_API turns a PrefixedPrompt into chat messages
+#   "inline": one user message "{prefix}\n\n{suffix}" (original layout)
+#   "system": the prefix as a leading system message, the suffix as the user message
+PROMPT_LAYOUTS = ("inline", "system")
+
+
+class PrefixedPrompt(str):
+    """
+    Prompt made of a shared prefix (e.g. the fusion prompt) and a per-item suffix (the question).
+    Still the plain str "{prefix}\\n\\n{suffix}", so providers without layout support, the response
+    cache and token estimates see the original prompt text.
+    """
+
+    def __new__(cls, prefix: str, suffix: str):
+        prompt = super().__new__(cls, f"{prefix}\n\n{suffix}")
+        prompt.prefix = prefix
+        prompt.suffix = suffix
+        return prompt
+
+
+def build_messages(prompt: str, layout: str = "inline") -> List[Dict[str, str]]:
+    """Chat messages for a prompt under the given layout (plain strings are always one user message)"""
+    if layout == "system" and isinstance(prompt, PrefixedPrompt) and prompt.prefix:
+        return [
+            {"role": "system", "content": prompt.prefix},
+            {"role": "user", "content": prompt.suffix},
+        ]
+    return [{"role": "user", "content": prompt}]
+
+
+def prefix_grouped_order(prompts: List[str]) -> List[int]:
+    """
+    Dispatch order that sends prompts sharing a prefix back to back (groups keep the order of their
+    first appearance, items keep their order within a group), so the server's prefix cache is warm
+    for the whole group. Plain strings form their own group.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, prompt in enumerate(prompts):
+        key = prompt.prefix if isinstance(prompt, PrefixedPrompt) else None
+        groups.setdefault(key, []).append(i)
+    return [i for indices in groups.values() for i in indices]
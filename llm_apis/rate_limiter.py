@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+def estimate_prompt_tokens(prompt: str) -> int:
+    """Rough token estimate (~4 characters per token) used before the real usage is known"""
+    return max(1, len(prompt) // 4)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `limit_per_minute / 60` per second, holding at most one minute of budget.
+    The level may go negative when a request turns out larger than estimated; later requests then wait off the debt.
+    """
+
+    def __init__(self, limit_per_minute: float):
+        self.capacity = float(limit_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (requests above capacity only need a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def adjust(self, delta: float):
+        """Give back (positive) or charge (negative) tokens after the actual usage is known"""
+        self.level = min(self.capacity, self.level + delta)
+
+
+class RateLimiter:
+    """
+    Client-side RPM/TPM limiter for one endpoint (api_base_id), shared by every model on it.
+    Token cost is estimated up front from the prompt plus the average completion length seen so far,
+    then corrected with the `usage` reported by the API.
+    """
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 initial_completion_estimate: int = 512):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self._avg_completion_tokens = float(initial_completion_estimate)
+        self.stats = {'requests': 0, 'throttled_requests': 0, 'wait_seconds': 0.0}
+
+    def estimate(self, prompt: str, max_tokens: Optional[int] = None) -> int:
+        """Estimated total tokens of a request"""
+        completion = self._avg_completion_tokens
+        if max_tokens:
+            completion = min(completion, max_tokens)
+        return estimate_prompt_tokens(prompt) + int(completion)
+
+    def _reserve_or_wait(self, estimated_tokens: int) -> float:
+        """Take budget and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(estimated_tokens)
+            self.stats['requests'] += 1
+            return 0.0
+
+    def acquire(self, estimated_tokens: int):
+        """Block until one request and `estimated_tokens` fit in the budgets"""
+        throttled = False
+        while True:
+            wait = self._reserve_or_wait(estimated_tokens)
+            if wait <= 0:
+                break
+            throttled = True
+            with self._lock:
+                self.stats['wait_seconds'] += wait
+            time.sleep(wait)
+        if throttled:
+            with self._lock:
+                self.stats['throttled_requests'] += 1
+
+    async def aacquire(self, estimated_tokens: int):
+        """Async version of acquire"""
+        throttled = False
+        while True:
+            wait = self._reserve_or_wait(estimated_tokens)
+            if wait <= 0:
+                break
+            throttled = True
+            with self._lock:
+                self.stats['wait_seconds'] += wait
+            await asyncio.sleep(wait)
+        if throttled:
+            with self._lock:
+                self.stats['throttled_requests'] += 1
+
+    def settle(self, estimated_tokens: int, actual_total_tokens: Optional[int] = None,
+               actual_completion_tokens: Optional[int] = None):
+        """
+        Correct the token budget with the real usage. Without usage (failed request) the estimate is refunded,
+        since rejected requests are normally not charged against TPM.
+        """
+        with self._lock:
+            if self.tokens is not None:
+                actual = actual_total_tokens if actual_total_tokens is not None else 0
+                self.tokens.adjust(estimated_tokens - actual)
+            if actual_completion_tokens:
+                # Exponential moving average of completion length for future estimates
+                self._avg_completion_tokens = 0.9 * self._avg_completion_tokens + 0.1 * actual_completion_tokens
+
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(api_base_id: str, limits: Optional[Dict[str, float]]) -> Optional[RateLimiter]:
+    """Return the process-wide limiter for an api_base_id, None when it has no configured limits"""
+    if not api_base_id or not limits or not (limits.get("rpm") or limits.get("tpm")):
+        return None
+    with _LIMITERS_LOCK:
+        if api_base_id not in _LIMITERS:
+            _LIMITERS[api_base_id] = RateLimiter(api_base_id, rpm=limits.get("rpm"), tpm=limits.get("tpm"))
+        return _LIMITERS[api_base_id]
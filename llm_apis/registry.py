@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of the expensive parts of LLM clients.
+    - One keep-alive HTTP connection pool per OpenAI-compatible endpoint (api_base, api_key)
+    - One set of loaded weights per local model
+    get_llm still hands out a lightweight wrapper per call, so token statistics stay per role and per call site;
+    the registry additionally aggregates those statistics across all wrappers it has seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http_clients: Dict[Tuple[str, str], Any] = {}
+        self._local_models: Dict[str, Any] = {}
+        self._local_model_locks: Dict[str, threading.Lock] = {}
+        # (role, call_site) -> token counters
+        self._usage: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def get_http_client(self, api_base: str, api_key: str, pool_size: int):
+        """
+        Shared httpx.Client for an endpoint. Connections are opened lazily on the first request
+        and kept alive for every wrapper that talks to the same endpoint.
+        """
+        import httpx
+        import openai
+
+        key = (api_base or "", api_key or "")
+        with self._lock:
+            client = self._http_clients.get(key)
+            if client is None or client.is_closed:
+                limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                client = httpx.Client(limits=limits, timeout=openai.DEFAULT_TIMEOUT)
+                self._http_clients[key] = client
+            return client
+
+    def get_local_model(self, model_name: str, loader: Callable[[], Any]) -> Any:
+        """Load a local model once per process; concurrent callers for the same model wait for the first load"""
+        with self._lock:
+            if model_name in self._local_models:
+                return self._local_models[model_name]
+            model_lock = self._local_model_locks.setdefault(model_name, threading.Lock())
+        with model_lock:
+            with self._lock:
+                if model_name in self._local_models:
+                    return self._local_models[model_name]
+            loaded = loader()
+            with self._lock:
+                self._local_models[model_name] = loaded
+            return loaded
+
+    def record_usage(self, role: str, call_site: str, prompt_tokens: int, completion_tokens: int, total_tokens: int):
+        """Aggregate one API call under (role, call site)"""
+        with self._lock:
+            stats = self._usage.setdefault((role, call_site), {
+                'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'api_calls': 0
+            })
+            stats['prompt_tokens'] += prompt_tokens or 0
+            stats['completion_tokens'] += completion_tokens or 0
+            stats['total_tokens'] += total_tokens or 0
+            stats['api_calls'] += 1
+
+    def get_usage_report(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Token statistics as {role: {call_site: stats}}"""
+        with self._lock:
+            report: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for (role, call_site), stats in sorted(self._usage.items()):
+                report.setdefault(role, {})[call_site] = dict(stats)
+            return report
+
+    def format_usage_report(self) -> List[str]:
+        """Human-readable per-role / per-call-site token usage"""
+        lines = []
+        for role, sites in self.get_usage_report().items():
+            role_tokens = sum(stats['total_tokens'] for stats in sites.values())
+            role_calls = sum(stats['api_calls'] for stats in sites.values())
+            lines.append(f"{role}: {role_tokens:,} tokens ({role_calls} calls)")
+            for call_site, stats in sites.items():
+                lines.append(f"    {call_site}: {stats['total_tokens']:,} tokens ({stats['api_calls']} calls)")
+        return lines
+
+
+_REGISTRY = ClientRegistry()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry"""
+    return _REGISTRY
@@ -0,0 +1,186 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Exception class names (matched along the MRO, so SDKs are not imported here) that are worth retrying
+_RETRYABLE_EXCEPTION_NAMES = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "ConnectError", "ReadError", "RemoteProtocolError",
+    "TimeoutError", "ConnectionError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",  # google-api-core
+}
+_RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+
+
+class LLMFailure(str):
+    """
+    Explicit failure result of an LLM call.
+    Still a str ("Error: ...") so display-only callers keep working; use is_failure() to detect it.
+    """
+
+    def __new__(cls, error: Any, retryable: bool = False):
+        failure = super().__new__(cls, f"Error: {error}")
+        failure.error = str(error)
+        failure.retryable = retryable
+        return failure
+
+
+def is_failure(response: Any) -> bool:
+    """Whether an LLM response is a failure result rather than model output"""
+    return isinstance(response, LLMFailure)
+
+
+def classify_exception(e: Exception) -> Tuple[bool, Optional[float]]:
+    """Return (retryable, retry_after_seconds) for an exception raised by an API call"""
+    response = getattr(e, "response", None)
+    status = getattr(e, "status_code", None) or getattr(response, "status_code", None)
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+
+    if isinstance(status, int) and (status in _RETRYABLE_STATUS_CODES or status >= 500):
+        return True, retry_after
+    if any(cls.__name__ in _RETRYABLE_EXCEPTION_NAMES for cls in type(e).__mro__):
+        return True, retry_after
+    return False, None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After when the server sends one"""
+
+    def __init__(self, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            return min(self.max_delay, max(retry_after, backoff))
+        return backoff
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+    After `failure_threshold` consecutive retryable failures the circuit opens and calls fail fast for
+    `reset_seconds`; then a single probe call is let through (half-open) and closes the circuit on success.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probe_in_flight:
+                return False
+            self._probe_in_flight = True  # Half-open: one probe
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f" Circuit for endpoint '{self.name}' closed again")
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f" Circuit for endpoint '{self.name}' opened after {self._consecutive_failures} "
+                          f"consecutive failures, failing fast for {self.reset_seconds:.0f}s")
+                self._opened_at = time.monotonic()
+
+    def seconds_until_retry(self) -> float:
+        """Remaining open time (0 when closed or ready for a probe)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str, failure_threshold: int = 5, reset_seconds: float = 30.0) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an endpoint"""
+    endpoint = endpoint or "default"
+    with _BREAKERS_LOCK:
+        if endpoint not in _BREAKERS:
+            _BREAKERS[endpoint] = CircuitBreaker(endpoint, failure_threshold, reset_seconds)
+        return _BREAKERS[endpoint]
+
+
+def call_with_retries(call: Callable[[], Any], policy: RetryPolicy, breaker: CircuitBreaker = None) -> Any:
+    """
+    Run `call` with classified retries. Returns the call result, or an LLMFailure when the error is not
+    retryable, retries are exhausted or the endpoint circuit is open.
+    """
+    for attempt in range(policy.max_retries + 1):
+        if breaker is not None and not breaker.allow():
+            return LLMFailure(f"circuit open for endpoint '{breaker.name}'", retryable=True)
+        try:
+            result = call()
+        except Exception as e:
+            retryable, retry_after = classify_exception(e)
+            if breaker is not None:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    # Client errors (4xx) still prove the endpoint is reachable
+                    breaker.record_success()
+            if not retryable or attempt == policy.max_retries:
+                return LLMFailure(e, retryable=retryable)
+            delay = policy.delay(attempt, retry_after)
+            print(f" LLM call failed ({type(e).__name__}), retry {attempt + 1}/{policy.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def acall_with_retries(call: Callable[[], Any], policy: RetryPolicy, breaker: CircuitBreaker = None) -> Any:
+    """Async version of call_with_retries, `call` returns an awaitable"""
+    for attempt in range(policy.max_retries + 1):
+        if breaker is not None and not breaker.allow():
+            return LLMFailure(f"circuit open for endpoint '{breaker.name}'", retryable=True)
+        try:
+            result = await call()
+        except Exception as e:
+            retryable, retry_after = classify_exception(e)
+            if breaker is not None:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    # Client errors (4xx) still prove the endpoint is reachable
+                    breaker.record_success()
+            if not retryable or attempt == policy.max_retries:
+                return LLMFailure(e, retryable=retryable)
+            delay = policy.delay(attempt, retry_after)
+            print(f" LLM call failed ({type(e).__name__}), retry {attempt + 1}/{policy.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """
+    Persistent on-disk LLM response cache shared across runs.
+    Entries are keyed by a hash of (model name, endpoint, merged request kwargs, prompt) and stored in SQLite;
+    when the cache grows beyond `max_entries` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # One connection shared by all threads, serialized by self._lock
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " response TEXT NOT NULL,"
+            " created_at REAL,"
+            " last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._entry_count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, request_kwargs: Dict[str, Any], prompt: str, endpoint: Any = None) -> str:
+        """Content hash of everything that determines the response"""
+        payload = json.dumps(
+            {"model": model_name, "endpoint": endpoint, "kwargs": request_kwargs, "prompt": prompt},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached response or None, refreshing its LRU timestamp"""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            print(f" Response cache read failed: {e}")
+            return None
+
+    def put(self, key: str, model_name: str, response: str):
+        """Store a response and evict least recently used entries beyond max_entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO responses (key, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, model_name, response, now, now)
+                )
+                if cursor.rowcount == 1:
+                    self._entry_count += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE responses SET response = ?, last_access = ? WHERE key = ?",
+                        (response, now, key)
+                    )
+
+                if self._entry_count > self.max_entries:
+                    # Other processes may share the file, so re-count before evicting
+                    self._entry_count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                    excess = self._entry_count - self.max_entries
+                    if excess > 0:
+                        self._conn.execute(
+                            "DELETE FROM responses WHERE key IN "
+                            "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                            (excess,)
+                        )
+                        self._entry_count -= excess
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f" Response cache write failed: {e}")
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._entry_count = 0
+
+    def __len__(self) -> int:
+        return self._entry_count
+
+
+_CACHE_INSTANCES: Dict[str, ResponseCache] = {}
+_CACHE_INSTANCES_LOCK = threading.Lock()
+
+
+def get_response_cache(path: str, max_entries: int = 200000) -> ResponseCache:
+    """Return the process-wide ResponseCache for `path` (one SQLite connection per file)"""
+    abs_path = os.path.abspath(path)
+    with _CACHE_INSTANCES_LOCK:
+        if abs_path not in _CACHE_INSTANCES:
+            _CACHE_INSTANCES[abs_path] = ResponseCache(abs_path, max_entries=max_entries)
+        return _CACHE_INSTANCES[abs_path]
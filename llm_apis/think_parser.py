@@ -0,0 +1,154 @@
+import re
+from typing import List, Optional, Sequence
+
+# Think markers are located from the occurrences of "think" / "thought" in the lowercased text
+# (str.find, no per-rule regex scan), then classified by their neighbouring characters:
+#   open / close tags   <think> </think> <thinking> <thought> (also full-width brackets)
+#   colon markers       Think: / Thinking:
+#   end phrases         "end think" (rest starts after "think") / "think end"
+_TAG_NAMES = ("think", "thinking", "thought")
+_OPEN_BRACKETS = "<＜"
+_CLOSE_BRACKETS = ">＞"
+
+
+def _find_all(text: str, word: str) -> List[int]:
+    positions = []
+    position = text.find(word)
+    while position != -1:
+        positions.append(position)
+        position = text.find(word, position + 1)
+    return positions
+
+
+class ThinkStripper:
+    """
+    Extracts the formal answer after a reasoning model's think process, in one scan plus a few slices.
+
+    Rules, in priority order (first one yielding non-empty text wins):
+    1. text after the first closing tag that follows the first opening tag (think, thinking, thought)
+    2. text after the first "Think:", then after the first "Thinking:" (with `leftmost_colon`, after whichever comes first)
+    3. text after the first closing tag (think, thinking, thought), then after an "end think" / "think end" phrase
+    4. lines after the first line containing one of `line_keywords`
+    Returns None when nothing was extracted.
+    """
+
+    def __init__(self, line_keywords: Sequence[str], colon_chars: str = ":", fullwidth_brackets: bool = True,
+                 leftmost_colon: bool = False):
+        self.line_keywords = tuple(keyword.lower() for keyword in line_keywords)
+        self.colon_chars = colon_chars
+        self.open_brackets = _OPEN_BRACKETS if fullwidth_brackets else "<"
+        self.close_brackets = _CLOSE_BRACKETS if fullwidth_brackets else ">"
+        self.leftmost_colon = leftmost_colon
+
+    def extract(self, content: str) -> Optional[str]:
+        lowered = content.lower()
+        if len(lowered) != len(content):
+            # Keep positions aligned when a character lowercases to several (e.g. "İ")
+            lowered = "".join(char.lower()[0] for char in content)
+        length = len(lowered)
+
+        first_open = {}
+        closes = {name: [] for name in _TAG_NAMES}
+        first_colon = {}
+        end_phrase_rest = None
+        for position in sorted(_find_all(lowered, "think") + _find_all(lowered, "thought")):
+            word_end = position + (7 if lowered.startswith("thought", position) else 5)
+            name = "thought" if word_end - position == 7 else "think"
+            name_end = word_end
+            if name == "think" and lowered.startswith("ing", word_end):
+                name, name_end = "thinking", word_end + 3
+
+            if name_end < length and lowered[name_end] in self.close_brackets:
+                is_close = position > 0 and lowered[position - 1] == "/"
+                bracket = position - 2 if is_close else position - 1
+                if bracket >= 0 and lowered[bracket] in self.open_brackets:
+                    if is_close:
+                        closes[name].append(name_end + 1)
+                    else:
+                        first_open.setdefault(name, name_end + 1)
+                    continue
+            if name == "thought":
+                continue
+
+            if name_end < length and lowered[name_end] in self.colon_chars:
+                first_colon.setdefault(name, name_end + 1)
+            if end_phrase_rest is None:
+                # "end think": the rest starts after the word "think"
+                before = position - 1
+                while before >= 0 and lowered[before].isspace():
+                    before -= 1
+                if before < position - 1 and before >= 2 and lowered[before - 2:before + 1] == "end":
+                    end_phrase_rest = word_end
+                elif name == "think":
+                    after = word_end
+                    while after < length and lowered[after].isspace():
+                        after += 1
+                    if after > word_end and lowered.startswith("end", after):
+                        end_phrase_rest = after + 3
+
+        # 1. <tag>...</tag> rest
+        for name in _TAG_NAMES:
+            if name in first_open:
+                close_end = next((end for end in closes[name] if end > first_open[name]), None)
+                if close_end is not None:
+                    extracted = content[close_end:].strip()
+                    if extracted:
+                        return extracted
+
+        # 2. Think: / Thinking:
+        colon_rests = [first_colon[word] for word in ("think", "thinking") if word in first_colon]
+        if self.leftmost_colon:
+            colon_rests = sorted(colon_rests)[:1]
+        for rest in colon_rests:
+            extracted = content[rest:].strip()
+            if extracted:
+                return extracted
+
+        # 3. First closing tag anywhere, then end phrases
+        for name in _TAG_NAMES:
+            if closes[name]:
+                extracted = content[closes[name][0]:].strip()
+                if extracted:
+                    return extracted
+        if end_phrase_rest is not None:
+            extracted = content[end_phrase_rest:].strip()
+            if extracted:
+                return extracted
+
+        # 4. Lines after the first line with a think-end keyword
+        positions = [p for p in (lowered.find(keyword) for keyword in self.line_keywords) if p != -1]
+        if positions:
+            think_end_line = lowered.count('\n', 0, min(positions))
+            lines = content.split('\n')
+            if think_end_line < len(lines) - 1:
+                remaining_content = '\n'.join(lines[think_end_line + 1:]).strip()
+                if remaining_content:
+                    return remaining_content
+        return None
+
+
+class ThinkStream:
+    """
+    Incremental think-block tracker for streamed completions: feed() each delta and check `in_think`
+    without rescanning the whole text. Tags split across chunks are handled with a short carry-over.
+    """
+
+    _TAG = re.compile(r'[<＜](/?)(?:thinking|think|thought)[>＞]', re.IGNORECASE)
+    _CARRY = len('</thinking>')
+
+    def __init__(self):
+        self.in_think = False
+        self.seen_think = False
+        self._tail = ""
+
+    def feed(self, delta: str) -> bool:
+        """Consume a delta and return whether the stream is currently inside an unfinished think block"""
+        text = self._tail + delta
+        last_end = 0
+        for match in self._TAG.finditer(text):
+            self.in_think = not match.group(1)
+            self.seen_think = True
+            last_end = match.end()
+        # Keep a tail that may hold the start of a tag cut by the chunk boundary
+        self._tail = text[max(last_end, len(text) - self._CARRY):]
+        return self.in_think
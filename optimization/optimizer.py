@@ -4,14 +4,20 @@ import re
 import copy
 import json
 import os
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any
 from tqdm import tqdm
 
-from ..llm_apis import BaseLLM, get_llm
+from ..llm_apis import BaseLLM, PrefixedPrompt, get_llm, is_failure
+from ..llm_apis.registry import get_client_registry
 from ..evaluation import BaseEvaluator
 from .prompt_object import PromptStructure
-from ..evaluation.unified_scoring import evaluate_with_unified_scoring
+from ..evaluation.unified_scoring import evaluate_with_unified_scoring, UnifiedScorer
+from ..evaluation.stop_detectors import build_stop_detector
+from ..llm_apis.length_profiler import get_length_profiler
+from ..config import EARLY_STOP_CONFIG, LENGTH_BUDGET_CONFIG
 
 class Optimizer:
     """
@@ -60,6 +66,28 @@ class Optimizer:
         self.stagnation_counters = [0] * self.num_factors
         self.last_best_scores = [-1.0] * self.num_factors
         
+        # Worker calls that failed after client-side retries and were sent again (see _generate_with_requeue)
+        self.requeue_stats = {'requeued_calls': 0, 'recovered': 0, 'unrecovered': 0}
+        
+        # Worker generation controls: early stop once the final answer is emitted (EARLY_STOP_CONFIG)
+        # and max_tokens budgets from observed output lengths (LENGTH_BUDGET_CONFIG)
+        self.generation_kwargs = {}
+        if self.worker_llm.supports_stop_detector:
+            stop_detector = build_stop_detector(evaluator, EARLY_STOP_CONFIG)
+            if stop_detector is not None:
+                self.generation_kwargs['stop_detector'] = stop_detector
+        if self.worker_llm.supports_length_profiler:
+            length_profiler = get_length_profiler(
+                dataset_config.get('dataset'), self.worker_llm.model_name, LENGTH_BUDGET_CONFIG,
+                answer_detector=build_stop_detector(evaluator, {**EARLY_STOP_CONFIG, "enabled": True})
+            )
+            if length_profiler is not None:
+                self.generation_kwargs['length_profiler'] = length_profiler
+        
+        # Shared scorer, scoring plans are compiled once per data split (see _get_scoring_plan)
+        self.scorer = UnifiedScorer(self.worker_llm, "apsf_validation")
+        self._scoring_plans = {}
+        
         self.global_best_score = -1.0
         self.global_best_factor = None
         self.global_best_step = 0
@@ -67,6 +95,12 @@ class Optimizer:
         self.global_best_tokens = 0  # Cumulative token consumption when reaching optimum
         self.all_scores_history = []
         
+        # Per-run memo of prompt evaluations, keyed by composed prompt text (see _get_memoized_evaluation)
+        self._prompt_eval_memo = {}
+        self.prompt_memo_stats = {'hits': 0, 'misses': 0, 'worker_calls_saved': 0}
+        # Racing evaluation statistics for step 3 (see _race_candidate_prompts)
+        self.racing_stats = {'candidates_eliminated': 0, 'worker_calls_saved': 0, 'worker_calls_full': 0}
+        
         self.initial_score = self._evaluate_initial_structure()
         
         self.current_optimization_step = 0
@@ -134,91 +168,26 @@ class Optimizer:
         # Use passed structure or default structure to display current prompt
         display_structure = current_structure if current_structure else self.prompt_struct
         
-        for i, item in enumerate(self.eval_data):
-            input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
-            question = item.get(input_key, '')
-            # Combine instruction with question directly
-            formatted_prompt = f"{prompt_template}\n\n{question}"
-            
-            print(f"\n{'='*80}")
-            print(f" aPSF validation sample {i+1}/{len(self.eval_data)}")
-            print(f"{'='*80}")
-            print(f" Question:\n   {question}")
-            print(f"\n Current fusion prompt:\n   \"{prompt_template}\"")
-            
-            prediction = self.worker_llm.generate(formatted_prompt)
+        # Reuse the earlier evaluation of an identical prompt (deterministic worker only)
+        memo = self._get_memoized_evaluation(prompt_template, self.eval_data)
+        if memo is not None:
+            print(f"\n Reusing memoized evaluation of this prompt "
+                  f"(accuracy {memo['accuracy']:.4f}, {len(self.eval_data)} worker calls saved)")
+            self._last_evaluation_results = [dict(result) for result in memo['results']]
+            self._current_accuracy = memo['accuracy']
+            return list(memo['predictions'])
+        
+        # Generate and score every validation item
+        outcomes = self._predict_and_score(
+            [(prompt_template, item, i) for i, item in enumerate(self.eval_data)]
+        )
+        
+        for prediction, detailed_result, is_correct, _ in outcomes:
             predictions.append(prediction)
-            print(f"\n aPSF response:\n   {prediction}")
-            
-            # Immediately process answer extraction and matching for each sample
-            try:
-                from ..evaluation.unified_scoring import UnifiedScorer
-                scorer = UnifiedScorer(self.worker_llm, "apsf_validation")
-                extracted_answer, target_answer, is_correct = scorer.extract_and_score(
-                    prediction, item, self.evaluator
-                )
-                
-                # Add: Save detailed results for feedback
-                detailed_results.append({
-                    'question': item.get('input', item.get('prompt', item.get('question', ''))),
-                    'predicted_answer': prediction,
-                    'extracted_answer': extracted_answer,
-                    'correct_answer': target_answer,
-                    'correct': is_correct,
-                    'reasoning': prediction  # Complete reasoning process
-                })
-                
-                # Display information (CompetitionMath uses LLM direct judgment, does not display extracted answers)
-                evaluator_name = self.evaluator.__class__.__name__
-                if evaluator_name == "CompetitionMathEvaluator":
-                    # CompetitionMath: Display target answer and LLM judgment result
-                    print(f"\n Target answer: '{target_answer}'")
-                    verdict = " Correct" if is_correct else " Incorrect"
-                    print(f" LLM judgment result: {verdict}")
-                else:
-                    # Other datasets: Display extracted answers
-                    print(f"\n Intelligent extracted answer: '{extracted_answer}'")
-                    print(f" Target answer: '{target_answer}'")
-                    verdict = " Correct" if is_correct else " Incorrect"
-                    print(f" Answer match: {verdict}")
-                
-                # Accumulate correct count
-                if is_correct:
-                    correct_count += 1
-                    
-            except Exception as e:
-                print(f" Answer extraction failed: {e}")
-                # Use simple answer extraction as alternative
-                extracted_answer = self._extract_answer_from_prediction(prediction, item)
-                target_answer = self._get_target_answer(item)
-                is_correct = self._is_answer_correct(extracted_answer, target_answer, item)
-                
-                # Add: Save detailed results for feedback (exceptional cases)
-                detailed_results.append({
-                    'question': item.get('input', item.get('prompt', item.get('question', ''))),
-                    'predicted_answer': prediction,
-                    'extracted_answer': extracted_answer,
-                    'correct_answer': target_answer,
-                    'correct': is_correct,
-                    'reasoning': prediction
-                })
-                
-                # Display information (distinguish CompetitionMath)
-                evaluator_name = self.evaluator.__class__.__name__
-                if evaluator_name == "CompetitionMathEvaluator":
-                    print(f"\n Target answer: '{target_answer}'")
-                    verdict = " Correct" if is_correct else " Incorrect"
-                    print(f" LLM judgment result: {verdict}")
-                else:
-                    print(f"  Standardized comparison: '{extracted_answer}' vs '{target_answer}'")
-                    print(f"  Extracted answer: '{extracted_answer}'")
-                    print(f"  Target answer: '{target_answer}'")
-                    verdict = " Correct" if is_correct else " Incorrect"
-                    print(f"  Answer match: {verdict}")
-
-                # Exception path should also accumulate correct count, otherwise accuracy will be underestimated
-                if is_correct:
-                    correct_count += 1
+            detailed_results.append(detailed_result)
+            # Accumulate correct count
+            if is_correct:
+                correct_count += 1
         
         # Save detailed evaluation results for feedback mechanism
         self._last_evaluation_results = detailed_results
@@ -226,8 +195,219 @@ class Optimizer:
         # Set current accuracy to avoid repeated evaluation
         self._current_accuracy = correct_count / len(predictions) if predictions else 0.0
         
+        self._store_memoized_evaluation(prompt_template, self.eval_data, predictions, detailed_results)
+        
         return predictions
 
+    def _predict_and_score(self, jobs: List[tuple]) -> List[tuple]:
+        """
+        Run (prompt_template, item, item_index) jobs through the worker in one batched call,
+        then score them concurrently. Outcomes are returned (and printed) in job order.
+        """
+        total = len(jobs)
+        if total == 0:
+            return []
+        max_concurrency = max(1, int(self.dataset_config.get("max_concurrency", 1) or 1))
+        
+        # Send all jobs to the worker in one batched call
+        formatted_prompts = [self._format_eval_prompt(prompt_template, item)[1] for prompt_template, item, _ in jobs]
+        raw_predictions = self._generate_with_requeue(formatted_prompts, max_concurrency)
+        
+        # Fan out scoring, results are collected back in input order
+        plan = self._get_scoring_plan(self.eval_data)  # Compile before worker threads use it
+        # Batch the LLM judge calls for items scored through the plan
+        plan.prejudge([
+            (index, raw_predictions[j]) for j, (_, item, index) in enumerate(jobs)
+            if index < len(self.eval_data) and self.eval_data[index] is item
+        ])
+        outcomes = [None] * total
+        next_to_print = 0
+        
+        if max_concurrency <= 1 or total <= 1:
+            for j, (prompt_template, item, index) in enumerate(jobs):
+                outcomes[j] = self._evaluate_prediction_item(index, item, prompt_template, raw_predictions[j])
+                print(outcomes[j][3])
+        else:
+            print(f"\n Evaluating {total} validation samples (max_concurrency={max_concurrency})")
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, total)) as executor:
+                futures = {
+                    executor.submit(self._evaluate_prediction_item, index, item, prompt_template, raw_predictions[j]): j
+                    for j, (prompt_template, item, index) in enumerate(jobs)
+                }
+                for future in as_completed(futures):
+                    outcomes[futures[future]] = future.result()
+                    # Print finished samples in input order so logs stay readable
+                    while next_to_print < total and outcomes[next_to_print] is not None:
+                        print(outcomes[next_to_print][3])
+                        next_to_print += 1
+        
+        return outcomes
+
+    def _generate_with_requeue(self, prompts: List[str], max_concurrency: int = None) -> List[str]:
+        """
+        Batched worker generation that re-sends calls which failed after client-side retries
+        (e.g. an endpoint outage), so they are not scored as wrong answers.
+        Items still failing after the last round keep their failure result; non-retryable failures
+        (e.g. a bad request or an over-long context) are not re-sent.
+        """
+        predictions = self.worker_llm.batch_generate(prompts, max_concurrency=max_concurrency, **self.generation_kwargs)
+        rounds = int(self.dataset_config.get("failed_item_requeue_rounds", 3) or 0)
+        base_wait = float(self.dataset_config.get("failed_item_requeue_wait", 10.0))
+        
+        initially_failed = sum(1 for prediction in predictions if is_failure(prediction))
+        for round_index in range(1, rounds + 1):
+            failed = [i for i, prediction in enumerate(predictions) if is_failure(prediction) and prediction.retryable]
+            if not failed:
+                break
+            # Give the endpoint time to recover (at least until its circuit lets requests through)
+            breaker = getattr(self.worker_llm, 'circuit_breaker', None)
+            wait = max(base_wait * round_index, breaker.seconds_until_retry() if breaker else 0.0)
+            print(f"\n {len(failed)} worker calls failed, re-queueing them (round {round_index}/{rounds}) in {wait:.0f}s")
+            time.sleep(wait)
+            self.requeue_stats['requeued_calls'] += len(failed)
+            retried = self.worker_llm.batch_generate([prompts[i] for i in failed], max_concurrency=max_concurrency,
+                                                     **self.generation_kwargs)
+            for i, prediction in zip(failed, retried):
+                predictions[i] = prediction
+        
+        still_failed = sum(1 for prediction in predictions if is_failure(prediction))
+        self.requeue_stats['recovered'] += initially_failed - still_failed
+        self.requeue_stats['unrecovered'] += still_failed
+        if still_failed:
+            print(f" Warning: {still_failed} worker calls still failing (non-retryable or after {rounds} re-queue rounds), "
+                  f"counted as incorrect and not memoized")
+        return predictions
+
+    def _get_scoring_plan(self, data: List[Dict[str, Any]]):
+        """Return the compiled scoring plan for a data split (built on first use)"""
+        entry = self._scoring_plans.get(id(data))
+        if entry is None or entry[0] is not data or len(entry[1]) != len(data):
+            entry = (data, self.scorer.build_plan(data, self.evaluator))
+            self._scoring_plans[id(data)] = entry
+        return entry[1]
+
+    def _score_item(self, data: List[Dict[str, Any]], index: int, prediction: str) -> tuple:
+        """Score data[index] through the split's scoring plan"""
+        if is_failure(prediction):
+            # No model output to score (and no judge call on the error text)
+            return "", self._get_target_answer(data[index]), False
+        return self._get_scoring_plan(data).score(index, prediction)
+
+    def _prompt_memo_enabled(self) -> bool:
+        """Memoized scores are only valid when the worker decodes deterministically"""
+        if not self.dataset_config.get("prompt_memo_enabled", True):
+            return False
+        return (self.worker_llm.model_kwargs.get("temperature", 0.0) or 0.0) == 0.0
+
+    def _prompt_memo_key(self, prompt_text: str, eval_data: List[Dict[str, Any]]):
+        """Memo key: prompt text plus identity of the evaluated items"""
+        return prompt_text, tuple(id(item) for item in eval_data)
+
+    def _get_memoized_evaluation(self, prompt_text: str, eval_data: List[Dict[str, Any]]):
+        """Return memoized {'predictions', 'results', 'accuracy'} for this prompt on eval_data, or None"""
+        if not self._prompt_memo_enabled():
+            return None
+        memo = self._prompt_eval_memo.get(self._prompt_memo_key(prompt_text, eval_data))
+        if memo is None:
+            self.prompt_memo_stats['misses'] += 1
+            return None
+        self.prompt_memo_stats['hits'] += 1
+        self.prompt_memo_stats['worker_calls_saved'] += len(eval_data)
+        return memo
+
+    def _store_memoized_evaluation(self, prompt_text: str, eval_data: List[Dict[str, Any]],
+                                   predictions: List[str], results: List[Dict[str, Any]]):
+        """Remember predictions and per-item correctness of a full evaluation"""
+        if not self._prompt_memo_enabled() or len(results) != len(eval_data):
+            return
+        if any(is_failure(prediction) for prediction in predictions):
+            # Failed calls should be retried by the next evaluation, not replayed
+            return
+        correct_count = sum(1 for result in results if result.get('correct', False))
+        self._prompt_eval_memo[self._prompt_memo_key(prompt_text, eval_data)] = {
+            'predictions': list(predictions),
+            'results': [dict(result) for result in results],
+            'accuracy': correct_count / len(results) if results else 0.0,
+        }
+
+    def _format_eval_prompt(self, prompt_template: str, item: Dict[str, Any]):
+        """Return (question, formatted_prompt) for a data item"""
+        input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
+        question = item.get(input_key, '')
+        # Combine instruction with question directly; the fusion prompt stays a separable shared prefix
+        return question, PrefixedPrompt(prompt_template, question)
+
+    def _evaluate_prediction_item(self, index: int, item: Dict[str, Any], prompt_template: str, prediction: str):
+        """Score a single validation item, returns (prediction, detailed_result, is_correct, log_text)"""
+        log = []
+        question, _ = self._format_eval_prompt(prompt_template, item)
+        
+        log.append(f"\n{'='*80}")
+        log.append(f" aPSF validation sample {index+1}/{len(self.eval_data)}")
+        log.append(f"{'='*80}")
+        log.append(f" Question:\n   {question}")
+        log.append(f"\n Current fusion prompt:\n   \"{prompt_template}\"")
+        
+        log.append(f"\n aPSF response:\n   {prediction}")
+        
+        evaluator_name = self.evaluator.__class__.__name__
+        
+        # Immediately process answer extraction and matching for each sample
+        try:
+            if is_failure(prediction):
+                log.append(f" Worker call failed after re-queueing ({prediction.error}), counted as incorrect")
+                extracted_answer, target_answer, is_correct = "", self._get_target_answer(item), False
+            elif index < len(self.eval_data) and self.eval_data[index] is item:
+                extracted_answer, target_answer, is_correct = self._score_item(self.eval_data, index, prediction)
+            else:
+                extracted_answer, target_answer, is_correct = self.scorer.extract_and_score(
+                    prediction, item, self.evaluator
+                )
+            
+            # Display information (CompetitionMath uses LLM direct judgment, does not display extracted answers)
+            if evaluator_name == "CompetitionMathEvaluator":
+                # CompetitionMath: Display target answer and LLM judgment result
+                log.append(f"\n Target answer: '{target_answer}'")
+                verdict = " Correct" if is_correct else " Incorrect"
+                log.append(f" LLM judgment result: {verdict}")
+            else:
+                # Other datasets: Display extracted answers
+                log.append(f"\n Intelligent extracted answer: '{extracted_answer}'")
+                log.append(f" Target answer: '{target_answer}'")
+                verdict = " Correct" if is_correct else " Incorrect"
+                log.append(f" Answer match: {verdict}")
+                
+        except Exception as e:
+            log.append(f" Answer extraction failed: {e}")
+            # Use simple answer extraction as alternative
+            extracted_answer = self._extract_answer_from_prediction(prediction, item)
+            target_answer = self._get_target_answer(item)
+            is_correct = self._is_answer_correct(extracted_answer, target_answer, item)
+            
+            # Display information (distinguish CompetitionMath)
+            if evaluator_name == "CompetitionMathEvaluator":
+                log.append(f"\n Target answer: '{target_answer}'")
+                verdict = " Correct" if is_correct else " Incorrect"
+                log.append(f" LLM judgment result: {verdict}")
+            else:
+                log.append(f"  Standardized comparison: '{extracted_answer}' vs '{target_answer}'")
+                log.append(f"  Extracted answer: '{extracted_answer}'")
+                log.append(f"  Target answer: '{target_answer}'")
+                verdict = " Correct" if is_correct else " Incorrect"
+                log.append(f"  Answer match: {verdict}")
+        
+        # Save detailed results for feedback
+        detailed_result = {
+            'question': item.get('input', item.get('prompt', item.get('question', ''))),
+            'predicted_answer': prediction,
+            'extracted_answer': extracted_answer,
+            'correct_answer': target_answer,
+            'correct': is_correct,
+            'reasoning': prediction  # Complete reasoning process
+        }
+        
+        return prediction, detailed_result, is_correct, "\n".join(log)
+
     def _generate_fusion_factor_candidates(self, factor_name: str, num_candidates: int = 4) -> List[str]:
         """
         Generate candidate replacement phrases for specific factors in fusion prompt.
@@ -897,7 +1077,11 @@ Please provide the improved prompt, maintaining the original structure but addin
             factors_dict=self.prompt_struct.factors,
             factor_selection_history=factor_selection_history_summary,
             full_reasoning=full_reasoning,  # Pass complete reasoning process for error analysis
-            evaluation_results=self._last_evaluation_results  # Pass evaluation results to maintain consistent correctness judgment
+            evaluation_results=self._last_evaluation_results,  # Pass evaluation results to maintain consistent correctness judgment
+            max_workers=self.dataset_config.get("error_analysis_max_concurrency", 1),
+            max_analyzed=self.dataset_config.get("error_analysis_max_samples"),
+            sampling=self.dataset_config.get("error_analysis_sampling", "stratified"),
+            use_cache=self.dataset_config.get("error_analysis_cache_enabled", True)
         )
         
         # Collect confidence statistics
@@ -1021,10 +1205,9 @@ Please provide the improved prompt, maintaining the original structure but addin
         print(f"\nStep 3: train-50 full evaluation and conservative acceptance")
         print(f"{'─'*80}")
 
-        candidate_scores = []
         candidate_prompts = []  # Store constructed complete prompts
         for i, cand_item in enumerate(candidates_with_mappings):
-            print(f"\nEvaluating candidate {i+1}/{len(candidates_with_mappings)}")
+            print(f"\nConstructing candidate {i+1}/{len(candidates_with_mappings)}")
 
             # Construct complete prompt from factor description for evaluation
             old_factor_content = self.prompt_struct.factors[selected_factor]
@@ -1045,19 +1228,38 @@ Please provide the improved prompt, maintaining the original structure but addin
                 )
 
             candidate_prompts.append(complete_prompt)
-            score = self._evaluate_complete_prompt_candidate(complete_prompt)
-            candidate_scores.append(score)
-            print(f"  Candidate {i+1} score: {score:.4f}")
+
+        acceptance_threshold = self.dataset_config.get("acceptance_threshold", 1)
+        acceptance_threshold_score = current_score + (acceptance_threshold / len(self.eval_data))
+
+        if self.dataset_config.get("racing_enabled", True):
+            # Racing: interleave candidates over mini-batches and drop those that can no longer be accepted
+            candidate_scores, eliminated = self._race_candidate_prompts(candidate_prompts, acceptance_threshold_score)
+        else:
+            candidate_scores = []
+            eliminated = [False] * len(candidate_prompts)
+            for i, complete_prompt in enumerate(candidate_prompts):
+                print(f"\nEvaluating candidate {i+1}/{len(candidate_prompts)}")
+                candidate_scores.append(self._evaluate_complete_prompt_candidate(complete_prompt))
+
+        for i, score in enumerate(candidate_scores):
+            status = " (eliminated early, partial accuracy)" if eliminated[i] else ""
+            print(f"  Candidate {i+1} score: {score:.4f}{status}")
 
             # Fix issue 2: Record each evaluation to history
+            # (candidates eliminated by racing only have a partial accuracy, kept apart from the scores)
             self.all_scores_history.append({
                 'step': self.current_optimization_step,
                 'factor': selected_factor,
                 'candidate_idx': i,
-                'score': score,
+                'score': None if eliminated[i] else score,
+                'partial_score': score if eliminated[i] else None,
+                'eliminated': eliminated[i],
                 'accepted': False  # Update later
             })
         
+        # UCB statistics only see fully evaluated candidates, as with racing disabled
+        full_scores = [score for score, dropped in zip(candidate_scores, eliminated) if not dropped]
         best_idx = np.argmax(candidate_scores)
         best_score = candidate_scores[best_idx]
         best_candidate_item = candidates_with_mappings[best_idx]
@@ -1072,9 +1274,6 @@ Please provide the improved prompt, maintaining the original structure but addin
         print(f"Current best score: {current_score:.4f}")
         print(f"Score difference: {best_score - current_score:.4f}")
 
-        acceptance_threshold = self.dataset_config.get("acceptance_threshold", 1)
-        acceptance_threshold_score = current_score + (acceptance_threshold / len(self.eval_data))
-
         print(f"\nAcceptance rule judgment (threshold: +{acceptance_threshold}/50 = +{acceptance_threshold/len(self.eval_data):.4f})")
 
         # Record attempt
@@ -1136,7 +1335,7 @@ Please provide the improved prompt, maintaining the original structure but addin
 
             # Fix issue 1: Update UCB and DAP statistics
             factor_idx = factor_names.index(selected_factor)
-            self._update_ucb_scores(factor_idx, candidate_scores)
+            self._update_ucb_scores(factor_idx, full_scores)
             self._update_dap_statistics(factor_idx, best_score)
         else:
             print(f"\n  Reject: Insufficient improvement ({best_score:.4f} < {acceptance_threshold_score:.4f})")
@@ -1158,7 +1357,7 @@ Please provide the improved prompt, maintaining the original structure but addin
             self.stagnation_counters[factor_idx] += 1
 
             # Fix issue 1: Update statistics even on rejection (record this attempt)
-            self._update_ucb_scores(factor_idx, candidate_scores)
+            self._update_ucb_scores(factor_idx, full_scores)
             self._update_dap_statistics(factor_idx, current_score)
         
         print(f"{'='*80}\n")
@@ -1416,6 +1615,102 @@ Generate candidates:"""
 
         return variants[:num_candidates]
     
+    def _race_candidate_prompts(self, candidate_prompts: List[str], acceptance_threshold_score: float):
+        """
+        Racing evaluation of candidate prompts on the validation set.
+
+        Alive candidates are evaluated together in interleaved mini-batches. After each round a candidate is
+        dropped when, even answering every remaining item correctly, it could not reach acceptance_threshold_score
+        or could not overtake the guaranteed final score of the current leader. Both bounds are exact, so the
+        selected / accepted candidate is the same as with full evaluation.
+
+        Returns:
+            (scores, eliminated): full accuracy for finished candidates, observed accuracy (capped by the
+            reachable bound) for dropped ones
+        """
+        total = len(self.eval_data)
+        num_candidates = len(candidate_prompts)
+        if total == 0 or num_candidates == 0:
+            return [0.0] * num_candidates, [False] * num_candidates
+
+        batch_size = max(1, int(self.dataset_config.get("racing_batch_size", 10)))
+        correct = [0] * num_candidates
+        evaluated = [0] * num_candidates
+        predictions = [[] for _ in range(num_candidates)]
+        results = [[] for _ in range(num_candidates)]
+        eliminated = [False] * num_candidates
+        from_memo = [False] * num_candidates
+        calls_saved = 0
+
+        # Candidates already evaluated in this run are taken from the memo
+        for c, prompt in enumerate(candidate_prompts):
+            memo = self._get_memoized_evaluation(prompt, self.eval_data)
+            if memo is not None:
+                correct[c] = sum(1 for result in memo['results'] if result.get('correct', False))
+                evaluated[c] = total
+                from_memo[c] = True
+                print(f"  Candidate {c+1}: memoized evaluation (accuracy {memo['accuracy']:.4f})")
+
+        round_idx = 0
+        while True:
+            active = [c for c in range(num_candidates) if not eliminated[c] and evaluated[c] < total]
+            if not active:
+                break
+            round_idx += 1
+
+            jobs = []
+            owners = []
+            for c in active:
+                for idx in range(evaluated[c], min(evaluated[c] + batch_size, total)):
+                    jobs.append((candidate_prompts[c], self.eval_data[idx], idx))
+                    owners.append(c)
+
+            print(f"\nRacing round {round_idx}: candidates {[c + 1 for c in active]}, {len(jobs)} samples")
+            outcomes = self._predict_and_score(jobs)
+            for c, (prediction, detailed_result, is_correct, _) in zip(owners, outcomes):
+                predictions[c].append(prediction)
+                results[c].append(detailed_result)
+                evaluated[c] += 1
+                if is_correct:
+                    correct[c] += 1
+
+            # Guaranteed final correct count of the best surviving candidate
+            leader_floor = max(correct[c] for c in range(num_candidates) if not eliminated[c])
+            for c in active:
+                remaining = total - evaluated[c]
+                if remaining == 0:
+                    continue
+                upper_bound = correct[c] + remaining
+                if upper_bound / total < acceptance_threshold_score - 1e-9:
+                    reason = f"max reachable {upper_bound}/{total} below acceptance threshold {acceptance_threshold_score:.4f}"
+                elif upper_bound < leader_floor:
+                    reason = f"max reachable {upper_bound}/{total} below leader's {leader_floor}/{total}"
+                else:
+                    continue
+                eliminated[c] = True
+                calls_saved += remaining
+                print(f"  Candidate {c+1} eliminated after {evaluated[c]}/{total} samples: {reason}")
+
+        scores = []
+        for c in range(num_candidates):
+            if eliminated[c]:
+                # Capped by the reachable bound so a dropped candidate can never win selection or acceptance
+                observed = correct[c] / evaluated[c] if evaluated[c] else 0.0
+                scores.append(min(observed, (correct[c] + total - evaluated[c]) / total))
+                continue
+            scores.append(correct[c] / total)
+            if not from_memo[c]:
+                self._store_memoized_evaluation(candidate_prompts[c], self.eval_data, predictions[c], results[c])
+
+        full_calls = total * num_candidates
+        self.racing_stats['candidates_eliminated'] += sum(eliminated)
+        self.racing_stats['worker_calls_saved'] += calls_saved
+        self.racing_stats['worker_calls_full'] += full_calls
+        print(f"\nRacing summary: {sum(eliminated)}/{num_candidates} candidates eliminated early, "
+              f"{calls_saved}/{full_calls} worker calls saved")
+
+        return scores, eliminated
+
     def _evaluate_complete_prompt_candidate(self, complete_prompt: str) -> float:
         """Evaluate performance of complete prompt candidate"""
         predictions = self._generate_predictions(complete_prompt)
@@ -1555,7 +1850,8 @@ Return only the top {top_k} candidates as a numbered list (1, 2, 3...) in order
 
     def _update_ucb_scores(self, factor_idx: int, scores: List[float]):
         """Update UCB scores"""
-        best_score_for_step = max(scores) if scores else 0.0
+        # Every candidate eliminated early: count the selection without moving the factor's mean value
+        best_score_for_step = max(scores) if scores else self.candidate_values[factor_idx]
 
         self.candidate_counts[factor_idx] += 1
         self.candidate_values[factor_idx] = (
@@ -2009,19 +2305,33 @@ Now please extract the final numerical answer from the above solution:"""
         
         best_prompt = self.global_best_prompt_structure.compose()
         wrong_examples = []
+        max_concurrency = self.dataset_config.get("max_concurrency", 1)
+        
+        # The best prompt was normally evaluated on this data already, reuse per-item correctness
+        memo = self._get_memoized_evaluation(best_prompt, eval_data)
+        if memo is not None:
+            for item, prediction, result in zip(eval_data, memo['predictions'], memo['results']):
+                if not result.get('correct', False):
+                    question, _ = self._format_eval_prompt(best_prompt, item)
+                    wrong_examples.append({
+                        'question': question,
+                        'prediction': prediction,
+                        'expected': item.get('answer', item.get('target', 'Unknown')),
+                        'item_data': item
+                    })
+            logging.info(f" Collected {len(wrong_examples)} error samples (memoized evaluation)")
+            return wrong_examples
+        
+        formatted_prompts = [self._format_eval_prompt(best_prompt, item)[1] for item in eval_data]
+        all_predictions = self._generate_with_requeue(formatted_prompts, max_concurrency)
+        self._get_scoring_plan(eval_data).prejudge(list(enumerate(all_predictions)))
         
         for i, item in enumerate(tqdm(eval_data, desc="Collecting error samples", leave=False)):
-            input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
-            question = item.get(input_key, '')
-            # Combine instruction with question directly
-            formatted_prompt = f"{best_prompt}\n\n{question}"
-
-            prediction = self.worker_llm.generate(formatted_prompt)
+            question, _ = self._format_eval_prompt(best_prompt, item)
+            prediction = all_predictions[i]
 
             try:
-                from ..evaluation.unified_scoring import UnifiedScorer
-                scorer = UnifiedScorer(self.worker_llm, "validation_error_collection")
-                _, _, is_correct = scorer.extract_and_score(prediction, item, self.evaluator)
+                _, _, is_correct = self._score_item(eval_data, i, prediction)
 
                 if not is_correct:
                     wrong_examples.append({
@@ -2213,14 +2523,20 @@ Optimized prompt:
         
         total = len(eval_data)
         correct = 0
+        max_concurrency = self.dataset_config.get("max_concurrency", 1)
 
-        for i, item in enumerate(tqdm(eval_data, desc="Evaluating reflection prompt", leave=False)):
-            input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
-            question = item.get(input_key, '')
-            # Combine instruction with question directly
-            formatted_prompt = f"{reflection_prompt}\n\n{question}"
+        memo = self._get_memoized_evaluation(reflection_prompt, eval_data)
+        if memo is not None:
+            logging.info(f" Reflection prompt validation score: {memo['accuracy']:.4f} (memoized evaluation)")
+            return memo['accuracy']
+
+        formatted_prompts = [self._format_eval_prompt(reflection_prompt, item)[1] for item in eval_data]
+        all_predictions = self._generate_with_requeue(formatted_prompts, max_concurrency)
+        self._get_scoring_plan(eval_data).prejudge(list(enumerate(all_predictions)))
 
-            prediction = self.worker_llm.generate(formatted_prompt)
+        for i, item in enumerate(tqdm(eval_data, desc="Evaluating reflection prompt", leave=False)):
+            question, formatted_prompt = self._format_eval_prompt(reflection_prompt, item)
+            prediction = all_predictions[i]
 
             # Show detailed info for first 3 samples for debugging
             if i < 3:
@@ -2231,16 +2547,12 @@ Optimized prompt:
 
             try:
                 # Use exact same code as standard validation
-                from ..evaluation.unified_scoring import UnifiedScorer
-                scorer = UnifiedScorer(self.worker_llm, "apsf_validation")  # Same as standard validation
-                extracted_answer, target_answer, is_correct = scorer.extract_and_score(
-                    prediction, item, self.evaluator
-                )
+                extracted_answer, target_answer, is_correct = self._score_item(eval_data, i, prediction)
 
                 # Show detailed info for first 3 samples
                 if i < 3:
-                    normalized_extracted = scorer._normalize_choice_answer_apsf_style(extracted_answer)
-                    normalized_target = scorer._normalize_choice_answer_apsf_style(target_answer)
+                    normalized_extracted = self.scorer._normalize_choice_answer_apsf_style(extracted_answer)
+                    normalized_target = self.scorer._normalize_choice_answer_apsf_style(target_answer)
                     print(f" Normalized comparison: '{normalized_extracted}' vs '{normalized_target}'")
                     print(f" Intelligently extracted answer: '{extracted_answer}'")
                     print(f" Target answer: '{target_answer}'")
@@ -2271,22 +2583,20 @@ Optimized prompt:
         best_prompt = self.global_best_prompt_structure.compose()
         total = len(test_data)
         correct = 0
-        predictions = []
+        max_concurrency = self.dataset_config.get("max_concurrency", 1)
 
-        for i, item in enumerate(tqdm(test_data, desc="Testing Final Fusion Structure", leave=False)):
-            input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
-            question = item.get(input_key, '')
-            # Combine instruction with question directly
-            formatted_prompt = f"{best_prompt}\n\n{question}"
+        # Send the whole test split to the worker in one batched call
+        formatted_prompts = [self._format_eval_prompt(best_prompt, item)[1] for item in test_data]
+        predictions = self._generate_with_requeue(formatted_prompts, max_concurrency)
+        self._get_scoring_plan(test_data).prejudge(list(enumerate(predictions)))
 
-            prediction = self.worker_llm.generate(formatted_prompt)
-            predictions.append(prediction)
+        for i, item in enumerate(tqdm(test_data, desc="Testing Final Fusion Structure", leave=False)):
+            question, _ = self._format_eval_prompt(best_prompt, item)
+            prediction = predictions[i]
 
             # Per-sample display: detailed question, prompt, answer and matching process
             try:
-                from ..evaluation.unified_scoring import UnifiedScorer
-                scorer = UnifiedScorer(self.worker_llm, "apsf_test")
-                extracted_answer, target_answer, is_correct = scorer.extract_and_score(prediction, item, self.evaluator)
+                extracted_answer, target_answer, is_correct = self._score_item(test_data, i, prediction)
 
                 print(f"\n{'='*80}")
                 print(f" aPSF Test Sample {i+1}/{total}")
@@ -2377,6 +2687,66 @@ Optimized prompt:
         logging.info(f"   Worker LLM: {worker_stats['total_tokens']:,} tokens ({worker_stats['api_calls']} calls)")
         logging.info(f"   Architect LLM: {architect_stats['total_tokens']:,} tokens ({architect_stats['api_calls']} calls)")
         logging.info(f"   TOTAL (all steps): {total_tokens:,} tokens ({total_calls} API calls)")
+        if self.racing_stats['worker_calls_full'] > 0:
+            logging.info(f"   Candidate racing: {self.racing_stats['candidates_eliminated']} candidates eliminated, "
+                         f"{self.racing_stats['worker_calls_saved']}/{self.racing_stats['worker_calls_full']} worker calls saved")
+        if self.prompt_memo_stats['hits'] > 0:
+            logging.info(f"   Prompt evaluation memo: {self.prompt_memo_stats['hits']} hits, "
+                         f"{self.prompt_memo_stats['worker_calls_saved']} worker calls saved")
+        cache_hits = worker_stats.get('cache_hits', 0) + architect_stats.get('cache_hits', 0)
+        cache_misses = worker_stats.get('cache_misses', 0) + architect_stats.get('cache_misses', 0)
+        if cache_hits + cache_misses > 0:
+            logging.info(f"   Response cache: {cache_hits} hits / {cache_misses} misses "
+                         f"({cache_hits / (cache_hits + cache_misses) * 100:.1f}% hit rate)")
+            if cache_hits:
+                logging.info("   Note: token counts above exclude the responses served from the cache")
+        if self.requeue_stats['requeued_calls'] > 0:
+            logging.info(f"   Re-queued worker calls: {self.requeue_stats['requeued_calls']} "
+                         f"({self.requeue_stats['recovered']} recovered, {self.requeue_stats['unrecovered']} still failing)")
+        for role, llm in (("Worker", self.worker_llm), ("Architect", self.architect_llm)):
+            limiter = getattr(llm, 'rate_limiter', None)
+            if limiter is not None and limiter.stats['throttled_requests'] > 0:
+                logging.info(f"   {role} rate limiter ({limiter.name}): {limiter.stats['throttled_requests']}/"
+                             f"{limiter.stats['requests']} requests throttled, {limiter.stats['wait_seconds']:.1f}s waited")
+            stream_stats = getattr(llm, 'stream_stats', None)
+            if stream_stats and stream_stats['early_stops'] > 0:
+                logging.info(f"   {role} early stop: {stream_stats['early_stops']}/{stream_stats['streamed_calls']} streamed "
+                             f"completions cut after the final answer, ~{stream_stats['completion_tokens_saved']:,} "
+                             f"completion tokens saved")
+            hedge_policy = getattr(llm, 'hedge_policy', None)
+            if hedge_policy is not None and hedge_policy.stats['hedged'] > 0:
+                logging.info(f"   {role} hedged requests: {hedge_policy.stats['hedged']}/{hedge_policy.stats['requests']} "
+                             f"calls hedged, {hedge_policy.stats['hedge_wins']} won by the duplicate")
+            prefix_kv_cache = getattr(llm, 'prefix_kv_cache', None)
+            if prefix_kv_cache is not None:
+                prefix_stats = prefix_kv_cache.get_stats()
+                if prefix_stats['prefill_tokens_skipped'] > 0:
+                    logging.info(f"   {role} prefix KV cache: {prefix_stats['hits']} hits / {prefix_stats['misses']} misses, "
+                                 f"{prefix_stats['prefill_tokens_skipped']:,} prefill tokens skipped")
+            replica_pool = getattr(llm, 'replica_pool', None)
+            if role == "Worker" and 'length_profiler' in self.generation_kwargs:
+                budget_stats = self.generation_kwargs['length_profiler'].get_stats()
+                if budget_stats['budgeted_calls'] > 0:
+                    logging.info(f"   Worker max_tokens budget: {budget_stats['budgeted_calls']} budgeted calls, "
+                                 f"{budget_stats['truncation_retries']} truncation retries, "
+                                 f"{budget_stats['kept_truncated']} truncated after the answer")
+            if replica_pool is not None:
+                for replica in replica_pool.get_stats():
+                    latency = f"{replica['latency_ewma']:.2f}s" if replica['latency_ewma'] is not None else "n/a"
+                    logging.info(f"   {role} replica {replica['name']}: {replica['requests']} requests, "
+                                 f"{replica['failures']} failures, {replica['ejections']} ejections, latency {latency}"
+                                 f"{' (ejected)' if replica['ejected'] else ''}")
+        usage_lines = get_client_registry().format_usage_report()
+        if usage_lines:
+            logging.info("   Token usage by role / call site (process-wide):")
+            for line in usage_lines:
+                logging.info(f"     {line}")
+        analysis_cache = self.evaluator.get_step_analysis_cache_stats()
+        if analysis_cache['hits'] > 0:
+            logging.info(f"   Step-analysis cache: {analysis_cache['hits']} hits / {analysis_cache['misses']} misses, "
+                         f"~{analysis_cache['estimated_tokens_saved']:,} architect tokens saved")
+        for line in self.scorer.get_cascade_stats():
+            logging.info(f"   Extraction cascade - {line}")
         logging.info(f"   BEST ACHIEVED AT STEP: {self.global_best_step}")
         logging.info(f"   TOKENS AT BEST STEP: {self.global_best_tokens:,} tokens")
 
@@ -2462,7 +2832,7 @@ Optimized prompt:
             
             factor_scores = [
                 record['score'] for record in self.all_scores_history 
-                if 'factor' in record and record['factor'] == name
+                if 'factor' in record and record['factor'] == name and record.get('score') is not None
             ]
             
             factor_stat = {
@@ -1,4 +1,5 @@
 import os
+import sys
 import argparse
 import json
 import logging
@@ -8,8 +9,10 @@ from datetime import datetime
 from .optimization import Architect, Optimizer 
 from .data_loader import get_loader  # 
 from .evaluation import get_evaluator, BaseEvaluator  # 
-from .llm_apis import get_llm  # 
-from .config import DATASET_CONFIG, OPTIMIZATION_PARAMS, RESULTS_DIR, DATA_PATHS, DATA_SPLIT_CONFIG  # 
+from .evaluation.stop_detectors import build_stop_detector
+from .llm_apis import PrefixedPrompt, get_llm  #
+from .llm_apis.length_profiler import get_length_profiler
+from .config import DATASET_CONFIG, OPTIMIZATION_PARAMS, RESULTS_DIR, DATA_PATHS, DATA_SPLIT_CONFIG, EARLY_STOP_CONFIG, LENGTH_BUDGET_CONFIG  # 
 from .baselines import (
     run_apsf_nostructure,
     run_apsf_nofactor,
@@ -45,14 +48,16 @@ def set_random_seed(seed=None):
     random.seed(seed)
     import numpy as np
     np.random.seed(seed)
-    # Set torch seed if available
-    try:
-        import torch
-        torch.manual_seed(seed)
-        if torch.cuda.is_available():
-            torch.cuda.manual_seed_all(seed)
-    except ImportError:
-        pass
+    # Set torch seed if already loaded; torch is imported lazily with the first local model,
+    # which seeds it then (see llm_apis._create_llama_local)
+    if "torch" in sys.modules:
+        try:
+            import torch
+            torch.manual_seed(seed)
+            if torch.cuda.is_available():
+                torch.cuda.manual_seed_all(seed)
+        except ImportError:
+            pass
     
     logging.info(f"Random seed set to: {seed}")
 
@@ -449,7 +454,9 @@ def run_baseline_method(method_name: str, task_desc: str, val_data: List[Dict],
         print(f"\n Starting {method_display_name} {data_type} detailed evaluation", flush=True)
         print(f" Sample count: {len(data)}", flush=True)
 
-        for i, item in enumerate(data):
+        questions = []
+        formatted_prompts = []
+        for item in data:
             input_key = 'prompt' if 'prompt' in item else ('input' if 'input' in item else 'question')
             question = item.get(input_key, '')
 
@@ -458,7 +465,34 @@ def run_baseline_method(method_name: str, task_desc: str, val_data: List[Dict],
                 formatted_prompt = prompt_template.format(input=question)
             else:
                 # Combine instruction with question directly for pure instructions
-                formatted_prompt = f"{prompt_template}\n\n{question}"
+                formatted_prompt = PrefixedPrompt(prompt_template, question)
+
+            questions.append(question)
+            formatted_prompts.append(formatted_prompt)
+
+        # Generate all responses in one batched call (early stop / max_tokens budget when enabled)
+        generation_kwargs = {}
+        stop_detector = build_stop_detector(evaluator, EARLY_STOP_CONFIG) if worker_llm.supports_stop_detector else None
+        if stop_detector is not None:
+            generation_kwargs['stop_detector'] = stop_detector
+        if worker_llm.supports_length_profiler:
+            length_profiler = get_length_profiler(
+                config.get('dataset'), worker_llm.model_name, LENGTH_BUDGET_CONFIG,
+                answer_detector=build_stop_detector(evaluator, {**EARLY_STOP_CONFIG, "enabled": True})
+            )
+            if length_profiler is not None:
+                generation_kwargs['length_profiler'] = length_profiler
+        all_predictions = worker_llm.batch_generate(
+            formatted_prompts, max_concurrency=OPTIMIZATION_PARAMS.get("max_concurrency"), **generation_kwargs
+        )
+
+        # Compile the scoring plan for this split once
+        scoring_plan = UnifiedScorer(worker_llm, f"bbh_{data_type}").build_plan(data, evaluator) if do_scoring else None
+        if scoring_plan is not None:
+            scoring_plan.prejudge(list(enumerate(all_predictions)))
+
+        for i, item in enumerate(data):
+            question = questions[i]
 
             # Display question and current template
             print(f"\n{'='*80}", flush=True)
@@ -470,18 +504,13 @@ def run_baseline_method(method_name: str, task_desc: str, val_data: List[Dict],
             print(f"   {prompt_template}", flush=True)
             print(f"\n {method_display_name} response:", flush=True)
 
-            # Generate response
-            prediction = worker_llm.generate(formatted_prompt)
+            prediction = all_predictions[i]
             predictions.append(prediction)
             print(f"   {prediction}", flush=True)
 
             # Score if needed (only for test set)
             if do_scoring:
-                from .evaluation.unified_scoring import UnifiedScorer
-                scorer = UnifiedScorer(worker_llm, f"bbh_{data_type}")
-                extracted_answer, target_answer, is_correct = scorer.extract_and_score(
-                    prediction, item, evaluator
-                )
+                extracted_answer, target_answer, is_correct = scoring_plan.score(i, prediction)
 
                 print(f"\n Extracted answer: '{extracted_answer}'", flush=True)
                 print(f" Target answer: '{target_answer}'", flush=True)
@@ -1066,6 +1095,9 @@ def run_bbh_all_tasks_evaluation(method_name: str, config: Dict[str, Any], args,
                 "final_score": 0.0
             }
             bbh_checkpoint_manager.save_task_result(method_name, task_name, task_result)
+        finally:
+            # Tasks are loaded lazily, drop the finished one before loading the next
+            loader.release_task(task_name)
     
     # Calculate final results
     average_score = total_score / successful_tasks if successful_tasks > 0 else 0.0
@@ -1248,6 +1280,9 @@ def run_mmlu_all_subjects_evaluation(method_name: str, config: Dict[str, Any], a
                 "final_score": 0.0
             }
             mmlu_checkpoint_manager.save_task_result(method_name, category_name, category_result)
+        finally:
+            # Subjects are loaded lazily, drop the finished category before loading the next
+            loader.release_category(category_name)
 
     # Calculate final results
     average_score = total_score / successful_categories if successful_categories > 0 else 0.0